@@ -0,0 +1,30 @@
+import os
+import sys
+
+# Allow `python Differences/<script>.py` from the repo root to import src/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.processing.loading import load_processed, x_grid
+from src.analysis.divergence import top_divergent_regions, write_divergence_table
+
+def create_divergence_tables(window=50, top_k=3, top_n=1000):
+    """
+    Write the top_n most divergent temperature windows over all sample pairs for DSC and TGA
+    (up to top_k non-overlapping windows per pair), streamed so the full pair table is never built.
+    """
+    os.makedirs('Differences/divergence_tables', exist_ok=True)
+
+    for data_type in ['dsc', 'tga']:
+        print(f"Finding {data_type.upper()} divergent regions...")
+        interpolated_data, sample_names, metadata = load_processed(data_type)
+        x = x_grid(metadata, interpolated_data.shape[1])
+
+        table = top_divergent_regions(interpolated_data, x=x, window=window, top_k=top_k, top_n=top_n)
+
+        output_file = f'Differences/divergence_tables/{data_type.upper()}_divergent_regions.txt'
+        write_divergence_table(table, sample_names, output_file)
+        num_pairs = len(set(zip(table['idx1'].tolist(), table['idx2'].tolist())))
+        print(f"  {len(table)} windows from {num_pairs} pairs, window of {window} points ({x[window - 1] - x[0]:.2f}°C)")
+        print(f"  Saved {output_file}")
+
+if __name__ == "__main__":
+    create_divergence_tables()
@@ -1,32 +1,39 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import itertools
-from matplotlib.backends.backend_pdf import PdfPages
 import os
+import sys
+
+# Allow `python Differences/<script>.py` from the repo root to import src/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.processing.loading import load_processed, x_grid
+from src.analysis.clustering import load_clusters, iter_cluster_ordered_pairs
+from src.analysis.pairs import iter_all_pairs
+from src.analysis.pair_sampling import pairwise_summary
+from src.analysis.pair_cache import cached_pair_stats
+
+Y_LABELS = {
+    'dsc': 'DSC Signal',
+    'tga': 'Weight Retention',
+}
 
 def load_data_and_names(data_type):
-    """Load interpolated data and sample names for given data type."""
-    if data_type == 'dsc':
-        interpolated_data = np.load('processed_data/dsc/interpolated_dsc_data.npy')
-        sample_names_file = 'processed_data/dsc/dsc_sample_names.txt'
-        y_label = 'DSC Signal'
-    elif data_type == 'tga':
-        interpolated_data = np.load('processed_data/tga/interpolated_tga_data.npy')
-        sample_names_file = 'processed_data/tga/tga_sample_names.txt'
-        y_label = 'Weight Retention'
-    else:
+    """Load interpolated data, sample names and temperature grid for given data type (NumPy only, no plotting imports)."""
+    if data_type not in Y_LABELS:
         raise ValueError("data_type must be 'dsc' or 'tga'")
-    
-    sample_names = []
-    with open(sample_names_file, 'r') as f:
-        for line in f:
-            if ':' in line:
-                sample_names.append(line.split(': ')[1].strip())
-    
-    return interpolated_data, sample_names, y_label
+    interpolated_data, sample_names, metadata = load_processed(data_type)
+    x = x_grid(metadata, interpolated_data.shape[1])
+    return interpolated_data, sample_names, Y_LABELS[data_type], x
 
-def create_pairwise_summary_pdf():
-    """Generate a comprehensive PDF summary of pairwise differences for both DSC and TGA."""
+def create_pairwise_summary_pdf(approximate=False, rel_error=0.02, confidence=0.95):
+    """
+    Generate a comprehensive PDF summary of pairwise differences for both DSC and TGA.
+
+    With approximate=True the average difference curves are estimated from a stratified
+    sample of pairs (see src/analysis/pair_sampling.py) to within rel_error of their peak
+    at the given confidence, and drawn with their confidence intervals. The global
+    difference range used for the axis limits is exact in both modes.
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
     
     # Create output directory if it doesn't exist
     os.makedirs('Differences/summary_pdfs', exist_ok=True)
@@ -36,25 +43,28 @@ def create_pairwise_summary_pdf():
         print(f"Generating {data_type.upper()} pairwise summary...")
         
         # Load data
-        interpolated_data, sample_names, y_label = load_data_and_names(data_type)
-        
-        # Generate all pairs
-        sample_indices = list(range(len(sample_names)))
-        sample_pairs = list(itertools.combinations(sample_indices, 2))
-        
-        # Calculate global limits
-        all_diffs = []
-        all_abs_diffs = []
-        for idx1, idx2 in sample_pairs:
-            y1, y2 = interpolated_data[idx1], interpolated_data[idx2]
-            y_diff = y1 - y2
-            abs_diff = np.abs(y_diff)
-            all_diffs.extend(y_diff)
-            all_abs_diffs.extend(abs_diff)
+        interpolated_data, sample_names, y_label, x = load_data_and_names(data_type)
         
-        diff_min, diff_max = min(all_diffs), max(all_diffs)
-        abs_diff_max = max(all_abs_diffs)
+        # All pairs in blocks, walking within-cluster pairs first if the modality has been clustered
+        clusters = load_clusters(data_type)
+        if clusters is not None and clusters['sample_names'] == sample_names:
+            pair_blocks = iter_cluster_ordered_pairs(clusters['labels'], clusters['leaf_order'])
+        else:
+            pair_blocks = iter_all_pairs(len(sample_names))
+        num_pairs = len(sample_names) * (len(sample_names) - 1) // 2
         
+        # Global limits and average difference curves over all pairs
+        summary = pairwise_summary(interpolated_data, sample_names, exact=not approximate,
+                                   rel_error=rel_error, confidence=confidence)
+        diff_min, diff_max = summary['diff_min'], summary['diff_max']
+        abs_diff_max = summary['abs_diff_max']
+        if summary['exact']:
+            summary_note = 'Average curves: exact over all pairs'
+        else:
+            summary_note = (f"Average curves: estimated from {summary['num_sampled']} of {summary['num_pairs']} pairs "
+                            f"(stratified by material, {confidence:.0%} CI within {summary['rel_error']:.1%} of peak)")
+            print(f"  {summary_note}")
+
         # Create PDF
         pdf_filename = f'Differences/summary_pdfs/{data_type.upper()}_pairwise_summary.pdf'
         with PdfPages(pdf_filename) as pdf:
@@ -65,7 +75,7 @@ def create_pairwise_summary_pdf():
                    transform=ax.transAxes, fontsize=24, ha='center', va='center', fontweight='bold')
             ax.text(0.5, 0.5, f'Total Samples: {len(sample_names)}', 
                    transform=ax.transAxes, fontsize=16, ha='center', va='center')
-            ax.text(0.5, 0.4, f'Total Pairs: {len(sample_pairs)}', 
+            ax.text(0.5, 0.4, f'Total Pairs: {num_pairs}', 
                    transform=ax.transAxes, fontsize=16, ha='center', va='center')
             ax.text(0.5, 0.3, f'Data Points per Sample: {interpolated_data.shape[1]}', 
                    transform=ax.transAxes, fontsize=16, ha='center', va='center')
@@ -73,6 +83,8 @@ def create_pairwise_summary_pdf():
                    transform=ax.transAxes, fontsize=12, ha='center', va='center')
             ax.text(0.5, 0.1, f'Max Absolute Difference: {abs_diff_max:.6f}', 
                    transform=ax.transAxes, fontsize=12, ha='center', va='center')
+            ax.text(0.5, 0.03, summary_note, 
+                   transform=ax.transAxes, fontsize=10, ha='center', va='center')
             ax.set_xlim(0, 1)
             ax.set_ylim(0, 1)
             ax.axis('off')
@@ -83,27 +95,17 @@ def create_pairwise_summary_pdf():
             print("  Creating average difference curve page...")
             fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(16, 12))
             fig.suptitle(f'{data_type.upper()} Average Difference Analysis Across All Sample Pairs', fontsize=16, fontweight='bold')
+            if not summary['exact']:
+                fig.text(0.5, 0.95, summary_note, ha='center', fontsize=10)
             
-            # Calculate average difference and standard deviation at each data point
-            data_length = interpolated_data.shape[1]
-            all_diffs_array = np.zeros((len(sample_pairs), data_length))
-            all_abs_diffs_array = np.zeros((len(sample_pairs), data_length))
-            
-            for i, (idx1, idx2) in enumerate(sample_pairs):
-                y1, y2 = interpolated_data[idx1], interpolated_data[idx2]
-                all_diffs_array[i, :] = y1 - y2
-                all_abs_diffs_array[i, :] = np.abs(y1 - y2)
-            
-            # Calculate mean and std at each data point for differences
-            mean_diff_curve = np.mean(all_diffs_array, axis=0)
-            std_diff_curve = np.std(all_diffs_array, axis=0)
-            
-            # Calculate mean and std at each data point for absolute differences
-            mean_abs_diff_curve = np.mean(all_abs_diffs_array, axis=0)
-            std_abs_diff_curve = np.std(all_abs_diffs_array, axis=0)
+            # Mean and std at each data point for differences and absolute differences
+            mean_diff_curve = summary['mean_diff']
+            std_diff_curve = summary['std_diff']
+            mean_abs_diff_curve = summary['mean_abs_diff']
+            std_abs_diff_curve = summary['std_abs_diff']
             
             # Create x-axis
-            x_points = range(data_length)
+            x_points = x
             
             # Top plot: Mean difference curve
             ax1.plot(x_points, mean_diff_curve, color='blue', linewidth=2, label='Mean Difference')
@@ -120,8 +122,13 @@ def create_pairwise_summary_pdf():
                           mean_diff_curve - 2*std_diff_curve, 
                           mean_diff_curve + 2*std_diff_curve, 
                           alpha=0.1, color='blue', label='±2 Standard Deviations')
+            if not summary['exact']:
+                ax1.fill_between(x_points,
+                              mean_diff_curve - summary['mean_diff_ci'],
+                              mean_diff_curve + summary['mean_diff_ci'],
+                              color='navy', alpha=0.6, label=f'{confidence:.0%} CI of Mean')
             
-            ax1.set_xlabel('Data Point Index (0-2999)')
+            ax1.set_xlabel('Temperature (°C)')
             ax1.set_ylabel(f'{y_label} Difference')
             ax1.set_title('Average Difference Curve')
             ax1.legend()
@@ -151,8 +158,13 @@ def create_pairwise_summary_pdf():
                           mean_abs_diff_curve - 2*std_abs_diff_curve, 
                           mean_abs_diff_curve + 2*std_abs_diff_curve, 
                           alpha=0.1, color='red', label='±2 Standard Deviations')
+            if not summary['exact']:
+                ax2.fill_between(x_points,
+                              mean_abs_diff_curve - summary['mean_abs_diff_ci'],
+                              mean_abs_diff_curve + summary['mean_abs_diff_ci'],
+                              color='darkred', alpha=0.6, label=f'{confidence:.0%} CI of Mean')
             
-            ax2.set_xlabel('Data Point Index (0-2999)')
+            ax2.set_xlabel('Temperature (°C)')
             ax2.set_ylabel(f'Absolute {y_label} Difference')
             ax2.set_title('Average Absolute Difference Curve')
             ax2.legend()
@@ -172,64 +184,78 @@ def create_pairwise_summary_pdf():
             pdf.savefig(fig)
             plt.close()
             
-            # Process pairs - show interpolated data and difference plots on same page
+            # Process pairs block by block - show interpolated data and difference plots on same page.
+            # Per-pair statistics are read from the pair cache for pairs seen in earlier runs
             colors = plt.cm.tab10(np.linspace(0, 1, len(sample_names)))
-            
-            for pair_idx, (idx1, idx2) in enumerate(sample_pairs):
-                name1, name2 = sample_names[idx1], sample_names[idx2]
-                y1, y2 = interpolated_data[idx1], interpolated_data[idx2]
-                y_diff = y1 - y2
+            pair_idx = -1
+            for pair_block in pair_blocks:
+                pair_stats = cached_pair_stats(interpolated_data, pair_block[:, 0], pair_block[:, 1], x, verbose=True)
+                for block_idx, (idx1, idx2) in enumerate(pair_block.tolist()):
+                    pair_idx += 1
+                    name1, name2 = sample_names[idx1], sample_names[idx2]
+                    y1, y2 = interpolated_data[idx1], interpolated_data[idx2]
+                    y_diff = y1 - y2
                 
-                # Create figure with two subplots
-                fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(16, 12))
-                fig.suptitle(f'{data_type.upper()}: {name1} vs {name2}', fontsize=16, fontweight='bold')
+                    # Create figure with two subplots
+                    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(16, 12))
+                    fig.suptitle(f'{data_type.upper()}: {name1} vs {name2}', fontsize=16, fontweight='bold')
                 
-                # Top plot: Interpolated data comparison
-                ax1.plot(range(len(y1)), y1, color=colors[idx1], label=name1, linewidth=2)
-                ax1.plot(range(len(y2)), y2, color=colors[idx2], label=name2, linewidth=2)
-                ax1.set_xlabel('Data Point Index (0-2999)')
-                ax1.set_ylabel(y_label)
-                ax1.set_title('Interpolated Data Comparison')
-                ax1.legend()
-                ax1.grid(True, alpha=0.3)
+                    # Top plot: Interpolated data comparison
+                    ax1.plot(x, y1, color=colors[idx1], label=name1, linewidth=2)
+                    ax1.plot(x, y2, color=colors[idx2], label=name2, linewidth=2)
+                    ax1.set_xlabel('Temperature (°C)')
+                    ax1.set_ylabel(y_label)
+                    ax1.set_title('Interpolated Data Comparison')
+                    ax1.legend()
+                    ax1.grid(True, alpha=0.3)
                 
-                # Bottom plot: Difference analysis
-                ax2.plot(range(len(y_diff)), y_diff, color='red', linewidth=2, label='Difference')
-                ax2.axhline(y=0, color='black', linestyle='--', alpha=0.5)
-                ax2.set_xlabel('Data Point Index (0-2999)')
-                ax2.set_ylabel(f'{y_label} Difference ({name1} - {name2})')
-                ax2.set_title('Difference Analysis')
-                ax2.set_ylim(diff_min, diff_max)
-                ax2.legend()
-                ax2.grid(True, alpha=0.3)
+                    # Bottom plot: Difference analysis
+                    ax2.plot(x, y_diff, color='red', linewidth=2, label='Difference')
+                    ax2.axhline(y=0, color='black', linestyle='--', alpha=0.5)
+                    ax2.set_xlabel('Temperature (°C)')
+                    ax2.set_ylabel(f'{y_label} Difference ({name1} - {name2})')
+                    ax2.set_title('Difference Analysis')
+                    ax2.set_ylim(diff_min, diff_max)
+                    ax2.legend()
+                    ax2.grid(True, alpha=0.3)
                 
-                # Add statistics to both plots
-                mean_diff = np.mean(y_diff)
-                std_diff = np.std(y_diff)
-                max_abs_diff = np.max(np.abs(y_diff))
-                avg_abs_diff = np.mean(np.abs(y_diff))
+                    # Add statistics to both plots
+                    mean_diff = pair_stats['mean_diff'][block_idx]
+                    std_diff = pair_stats['std_diff'][block_idx]
+                    max_abs_diff = pair_stats['max_abs_diff'][block_idx]
+                    avg_abs_diff = pair_stats['mean_abs_diff'][block_idx]
                 
-                stats_text = f'Mean diff: {mean_diff:.6f}\nStd diff: {std_diff:.6f}\nMax abs diff: {max_abs_diff:.6f}\nAvg abs diff: {avg_abs_diff:.6f}'
+                    stats_text = f'Mean diff: {mean_diff:.6f}\nStd diff: {std_diff:.6f}\nMax abs diff: {max_abs_diff:.6f}\nAvg abs diff: {avg_abs_diff:.6f}'
                 
-                ax1.text(0.02, 0.98, stats_text, transform=ax1.transAxes, fontsize=10,
-                        verticalalignment='top', bbox=dict(boxstyle="round,pad=0.3", 
-                        facecolor="lightblue", alpha=0.8))
+                    ax1.text(0.02, 0.98, stats_text, transform=ax1.transAxes, fontsize=10,
+                            verticalalignment='top', bbox=dict(boxstyle="round,pad=0.3", 
+                            facecolor="lightblue", alpha=0.8))
                 
-                ax2.text(0.02, 0.98, stats_text, transform=ax2.transAxes, fontsize=10,
-                        verticalalignment='top', bbox=dict(boxstyle="round,pad=0.3", 
-                        facecolor="lightgreen", alpha=0.8))
+                    ax2.text(0.02, 0.98, stats_text, transform=ax2.transAxes, fontsize=10,
+                            verticalalignment='top', bbox=dict(boxstyle="round,pad=0.3", 
+                            facecolor="lightgreen", alpha=0.8))
                 
-                plt.tight_layout(rect=[0, 0, 1, 0.95])
-                pdf.savefig(fig)
-                plt.close()
+                    plt.tight_layout(rect=[0, 0, 1, 0.95])
+                    pdf.savefig(fig)
+                    plt.close()
                 
-                print(f"  Processed pair {pair_idx+1}/{len(sample_pairs)}: {name1} vs {name2}")
+                    print(f"  Processed pair {pair_idx+1}/{num_pairs}: {name1} vs {name2}")
         
         print(f"  Saved {pdf_filename}")
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pairwise difference summary PDFs for DSC and TGA")
+    parser.add_argument('--approximate', action='store_true',
+                        help="Estimate the average difference curves from a stratified pair sample")
+    parser.add_argument('--rel-error', type=float, default=0.02,
+                        help="Target CI half-width relative to the peak mean absolute difference")
+    parser.add_argument('--confidence', type=float, default=0.95)
+    args = parser.parse_args()
+
     print("Generating pairwise difference summary PDFs...")
-    create_pairwise_summary_pdf()
+    create_pairwise_summary_pdf(args.approximate, args.rel_error, args.confidence)
     print("Summary PDF generation complete!")
     print("\nGenerated files:")
     print("- Differences/summary_pdfs/DSC_pairwise_summary.pdf")
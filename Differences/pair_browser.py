@@ -0,0 +1,295 @@
+import numpy as np
+import os
+import sys
+
+# Allow `python Differences/<script>.py` from the repo root to import src/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.processing.loading import load_processed, x_grid
+from src.analysis.clustering import load_clusters, iter_cluster_ordered_pairs
+from src.analysis.decimation import decimate
+from src.analysis.tiled import PAIR_STATS, load_pair_stats
+from src.analysis.pair_cache import cached_pair_stats
+
+Y_LABELS = {
+    'dsc': 'DSC Signal',
+    'tga': 'Weight Retention',
+}
+STAT_DIGITS = {
+    'dsc': 4,
+    'tga': 6,
+}
+HELP_TEXT = ("right/enter: next   left: previous   home/end: first/last   "
+             "r: cycle ranking   jump box: 'A vs B', 'A', '#rank'")
+
+
+class PairBrowser:
+    """
+    One persistent window for stepping through sample pairs of a modality.
+
+    The figure and its artists are built once; moving to another pair only swaps the
+    data of the existing lines (decimated with min/max or LTTB) and the text of the
+    statistics boxes, which come from a table computed once for every pair. Those
+    artists are animated and blitted over a cached background, so axes, ticks and
+    grids are not redrawn on every step.
+    """
+
+    def __init__(self, modality, data, sample_names, x, stats=None, pair_order=None,
+                 decimation='minmax', max_points=1000):
+        self.modality = modality
+        self.data = np.asarray(data, dtype=np.float64)
+        self.names = list(sample_names)
+        self.rows = {name: i for i, name in enumerate(self.names)}
+        self.x = np.asarray(x, dtype=np.float64)
+        self.decimation = decimation
+        self.max_points = max_points
+        self.digits = STAT_DIGITS.get(modality, 6)
+
+        n = len(self.names)
+        self.idx1, self.idx2 = np.triu_indices(n, k=1)
+        if stats is None:
+            stats = load_pair_stats(modality, self.idx1, self.idx2)
+        if stats is None:
+            print(f"Computing statistics for {len(self.idx1)} {modality.upper()} pairs...")
+            stats = cached_pair_stats(self.data, self.idx1, self.idx2, self.x, verbose=True)
+        self.stats = stats
+
+        # Orderings the browser can cycle through: the default walk, then each stat descending
+        if pair_order is None:
+            default = np.arange(len(self.idx1))
+        else:
+            # An (m, 2) array or an iterable of such blocks (iter_cluster_ordered_pairs)
+            blocks = [pair_order] if isinstance(pair_order, np.ndarray) else pair_order
+            default = np.concatenate([self.pair_positions(block) for block in blocks] or [np.empty(0, dtype=np.intp)])
+        self.orderings = [('default order', default)]
+        for stat in ('rms_diff', 'max_abs_diff', 'mean_abs_diff'):
+            self.orderings.append((f'{stat} (largest first)', np.argsort(-self.stats[stat], kind='stable')))
+        self.ordering = 0
+        self.position = 0
+
+        self.diff_limit = float(np.nanmax(self.stats['max_abs_diff'])) if len(self.idx1) else 1.0
+        self.colors = None
+        self.fig = None
+        self._animated = []
+        self._background = None
+
+    def pair_positions(self, pairs):
+        """Positions in the triu pair table of (i, j) pairs (either order)."""
+        pairs = np.asarray(pairs, dtype=np.intp).reshape(-1, 2)
+        i, j = pairs.min(axis=1), pairs.max(axis=1)
+        n = len(self.names)
+        return i * n - i * (i + 1) // 2 + (j - i - 1)
+
+    @property
+    def order(self):
+        return self.orderings[self.ordering][1]
+
+    def current(self):
+        """Table position of the pair on screen."""
+        return int(self.order[self.position])
+
+    def build(self):
+        """Create the figure and every artist once."""
+        import matplotlib.pyplot as plt
+        from matplotlib.widgets import TextBox
+
+        self.colors = plt.cm.tab10(np.linspace(0, 1, max(len(self.names), 1)))
+        self.fig, axes = plt.subplots(2, 2, figsize=(16, 10))
+        y_label = Y_LABELS.get(self.modality, 'Signal')
+        self.title = self.fig.suptitle('', fontsize=16, fontweight='bold')
+
+        ax = axes[0, 0]
+        self.line1, = ax.plot([], [], linewidth=1.5)
+        self.line2, = ax.plot([], [], linewidth=1.5)
+        ax.set_xlim(self.x[0], self.x[-1])
+        finite = self.data[np.isfinite(self.data)]
+        if finite.size:
+            pad = 0.02 * (finite.max() - finite.min() or 1.0)
+            ax.set_ylim(finite.min() - pad, finite.max() + pad)
+        ax.set_xlabel('Temperature (°C)')
+        ax.set_ylabel(y_label)
+        ax.set_title(f'Interpolated {self.modality.upper()} Curves')
+        self.curve_legend = ax.legend([self.line1, self.line2], ['', ''])
+        ax.grid(True, alpha=0.3, which='both')
+
+        ax = axes[0, 1]
+        self.info = ax.text(0.5, 0.55, '', transform=ax.transAxes, fontsize=14, ha='center', va='center',
+                            bbox=dict(boxstyle="round,pad=0.5", facecolor="lightgray", alpha=0.8))
+        ax.text(0.5, 0.02, HELP_TEXT, transform=ax.transAxes, fontsize=8, ha='center', va='bottom', wrap=True)
+        ax.axis('off')
+
+        ax = axes[1, 0]
+        self.diff_line, = ax.plot([], [], color='red', linewidth=1.5, label='Difference')
+        ax.axhline(y=0, color='black', linestyle='--', alpha=0.5)
+        ax.set_xlim(self.x[0], self.x[-1])
+        ax.set_ylim(-self.diff_limit, self.diff_limit)
+        ax.set_xlabel('Temperature (°C)')
+        ax.set_ylabel(f'{y_label} Difference (first - second)')
+        ax.set_title(f'Difference Between {y_label} vs Temperature')
+        ax.legend(loc='lower right')
+        ax.grid(True, alpha=0.3, which='both')
+        self.diff_text = ax.text(0.05, 0.95, '', transform=ax.transAxes, fontsize=10, verticalalignment='top',
+                                 bbox=dict(boxstyle="round,pad=0.3", facecolor="lightblue", alpha=0.8))
+
+        ax = axes[1, 1]
+        self.abs_line, = ax.plot([], [], color='purple', linewidth=1.5, label='Absolute Difference')
+        ax.set_xlim(self.x[0], self.x[-1])
+        ax.set_ylim(0, self.diff_limit)
+        ax.set_xlabel('Temperature (°C)')
+        ax.set_ylabel(f'Absolute {y_label} Difference')
+        ax.set_title('Absolute Difference vs Temperature')
+        ax.legend(loc='upper right')
+        ax.grid(True, alpha=0.3, which='both')
+        self.abs_text = ax.text(0.05, 0.95, '', transform=ax.transAxes, fontsize=10, verticalalignment='top',
+                                bbox=dict(boxstyle="round,pad=0.3", facecolor="lightgreen", alpha=0.8))
+
+        self.fig.tight_layout(rect=[0, 0.05, 1, 0.95])
+        box_ax = self.fig.add_axes([0.25, 0.01, 0.5, 0.035])
+        self.jump_box = TextBox(box_ax, 'Jump to ')
+        self.jump_box.on_submit(self.jump)
+        self.fig.canvas.mpl_connect('key_press_event', self.on_key)
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+        self._animated = [self.title, self.line1, self.line2, self.curve_legend, self.info,
+                          self.diff_line, self.diff_text, self.abs_line, self.abs_text]
+        for artist in self._animated:
+            artist.set_animated(True)
+        self.update()
+        return self.fig
+
+    def update(self):
+        """Point the existing artists at the current pair."""
+        k = self.current()
+        i, j = int(self.idx1[k]), int(self.idx2[k])
+        name1, name2 = self.names[i], self.names[j]
+        y1, y2 = self.data[i], self.data[j]
+        y_diff = y1 - y2
+        d = self.digits
+
+        for line, y, idx, name in ((self.line1, y1, i, name1), (self.line2, y2, j, name2)):
+            line.set_data(*decimate(self.x, y, self.max_points, self.decimation))
+            line.set_color(self.colors[idx])
+        for text, name in zip(self.curve_legend.get_texts(), (name1, name2)):
+            text.set_text(f'{name} (interpolated)')
+        for handle, idx in zip(self.curve_legend.legend_handles, (i, j)):
+            handle.set_color(self.colors[idx])
+        self.diff_line.set_data(*decimate(self.x, y_diff, self.max_points, self.decimation))
+        self.abs_line.set_data(*decimate(self.x, np.abs(y_diff), self.max_points, self.decimation))
+
+        label, _ = self.orderings[self.ordering]
+        self.title.set_text(f'{self.modality.upper()}: {name1} vs {name2} - Difference Analysis')
+        self.info.set_text(f'Sample Pair:\n{name1}\nvs\n{name2}\n\n'
+                           f'{self.position + 1} / {len(self.order)} by {label}')
+        s = {stat: self.stats[stat][k] for stat in PAIR_STATS}
+        self.diff_text.set_text(f'{name1} - {name2}\nMean diff: {s["mean_diff"]:.{d}f}\n'
+                                f'Std diff: {s["std_diff"]:.{d}f}\nMax abs diff: {s["max_abs_diff"]:.{d}f}')
+        self.abs_text.set_text(f'|{name1} - {name2}|\nMean abs diff: {s["mean_abs_diff"]:.{d}f}\n'
+                               f'Max abs diff: {s["max_abs_diff"]:.{d}f}')
+        self.refresh()
+
+    def _on_draw(self, event):
+        """After a full redraw (resize, widgets), cache the static background and repaint on top."""
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        for artist in self._animated:
+            self.fig.draw_artist(artist)
+
+    def refresh(self):
+        """Blit the animated artists over the cached background (full redraw if unsupported)."""
+        canvas = self.fig.canvas
+        if self._background is None or not getattr(canvas, 'supports_blit', False):
+            canvas.draw_idle()
+            return
+        canvas.restore_region(self._background)
+        for artist in self._animated:
+            self.fig.draw_artist(artist)
+        canvas.blit(self.fig.bbox)
+
+    def go(self, position):
+        self.position = int(np.clip(position, 0, len(self.order) - 1))
+        self.update()
+
+    def on_key(self, event):
+        if self.jump_box.capturekeystrokes:
+            return  # typing into the jump box
+        if event.key in ('right', 'enter', 'return'):
+            if self.position == len(self.order) - 1:
+                print("Reached the end of all sample pairs.")
+            self.go(self.position + 1)
+        elif event.key == 'left':
+            self.go(self.position - 1)
+        elif event.key == 'home':
+            self.go(0)
+        elif event.key == 'end':
+            self.go(len(self.order) - 1)
+        elif event.key == 'r':
+            current = self.current()
+            self.ordering = (self.ordering + 1) % len(self.orderings)
+            self.position = int(np.flatnonzero(self.order == current)[0])  # stay on the same pair
+            self.update()
+
+    def find(self, query):
+        """
+        Resolve a jump query to a position in the current ordering.
+
+        '#12' or '12' -> rank 12 (1-based); 'A vs B' or 'A, B' -> that pair;
+        'A' -> the next pair containing sample A after the current one.
+        """
+        query = query.strip()
+        if query.lstrip('#').isdigit():
+            return int(query.lstrip('#')) - 1
+        for separator in (' vs ', ','):
+            if separator in query:
+                a, b = (part.strip() for part in query.split(separator, 1))
+                if a not in self.rows or b not in self.rows or a == b:
+                    raise KeyError(f"Unknown pair: {query}")
+                target = self.pair_positions([(self.rows[a], self.rows[b])])[0]
+                return int(np.flatnonzero(self.order == target)[0])
+        if query not in self.rows:
+            raise KeyError(f"Unknown sample: {query}")
+        row = self.rows[query]
+        ordered = self.order
+        hits = np.flatnonzero((self.idx1[ordered] == row) | (self.idx2[ordered] == row))
+        after = hits[hits > self.position]
+        return int(after[0] if after.size else hits[0])
+
+    def jump(self, query):
+        if not query.strip():
+            return
+        try:
+            self.go(self.find(query))
+        except KeyError as e:
+            print(e.args[0])
+        self.jump_box.set_val('')
+
+    def show(self):
+        import matplotlib.pyplot as plt
+
+        if self.fig is None:
+            self.build()
+        plt.show()
+
+
+def browse(modality, decimation='minmax', max_points=1000):
+    """Open the pair browser for one modality, walking within-cluster pairs first if clustered."""
+    data, sample_names, metadata = load_processed(modality)
+    x = x_grid(metadata, data.shape[1])
+    print(f"Loaded {len(sample_names)} {modality.upper()} samples with {data.shape[1]} data points each")
+
+    clusters = load_clusters(modality)
+    pair_order = None
+    if clusters is not None and clusters['sample_names'] == sample_names:
+        pair_order = iter_cluster_ordered_pairs(clusters['labels'], clusters['leaf_order'])
+    browser = PairBrowser(modality, data, sample_names, x, pair_order=pair_order,
+                          decimation=decimation, max_points=max_points)
+    print(f"Total number of sample pairs: {len(browser.idx1)}")
+    browser.show()
+    return browser
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Browse pairwise differences between samples")
+    parser.add_argument('modality', choices=sorted(Y_LABELS))
+    parser.add_argument('--decimation', choices=['minmax', 'lttb', 'none'], default='minmax')
+    parser.add_argument('--max-points', type=int, default=1000)
+    args = parser.parse_args()
+    browse(args.modality, None if args.decimation == 'none' else args.decimation, args.max_points)
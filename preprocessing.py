@@ -1,369 +1,214 @@
 import os
-import pandas as pd
 import numpy as np
 from src.processing.cleaning import convert_csv
-from src.processing.special_cleaning import tga_xy, normalize_tga
-from src.processing.cleaning import auto_trim, interprolate_data, select_trim
-import matplotlib.pyplot as plt
-
-# Create output directories for processed data
-output_dir = "processed_data"
-tga_output_dir = os.path.join(output_dir, "tga")
-dsc_output_dir = os.path.join(output_dir, "dsc")
-
-# Create directories if they don't exist
-os.makedirs(tga_output_dir, exist_ok=True)
-os.makedirs(dsc_output_dir, exist_ok=True)
-
-print(f"Created output directories:")
-print(f"  - TGA data: {tga_output_dir}")
-print(f"  - DSC data: {dsc_output_dir}")
-
-# ----------------------- TGA -----------------------
-
-# # Get all subdirectories in the raw_data folder
-# raw_data_path = "/Users/jessicaagyemang/Documents/raw_data/FTIR"
-# data_directories = []
-
-# if os.path.exists(raw_data_path):
-#     # Get all subdirectories
-#     for item in os.listdir(raw_data_path):
-#         item_path = os.path.join(raw_data_path, item)
-#         if os.path.isdir(item_path):
-#             data_directories.append(item_path)
-    
-#     if data_directories:
-#         print(f"Found {len(data_directories)} directories to process:")
-#         for directory in data_directories:
-#             print(f"  - {directory}")
-        
-#         # Call convert_csv function
-#         results = convert_csv(data_directories)
-#     else:
-#         print("No subdirectories found in raw_data folder")
-# else:
-#     print(f"Error: Directory {raw_data_path} does not exist")
-
-
-# Define the TGA folder path
-tga_folder = "/Users/jessicaagyemang/Documents/raw_data/TGA"
-# Call the tga_xy function
-if os.path.exists(tga_folder):
-    processed_data = tga_xy(tga_folder)
-    
-    # Sort the processed data alphanumerically by sample name
-    processed_data = sorted(processed_data, key=lambda df: df['sample'].iloc[0])
-    
-    print(f"Processed {len(processed_data)} TGA files")
-    print("\n=== Data Structure ===")
-    print(f"Type: {type(processed_data)}")
-    print(f"Length: {len(processed_data)}")
-    
-    if processed_data:
-        print(f"\nFirst DataFrame structure:")
-        print(f"Shape: {processed_data[0].shape}")
-        print(f"Columns: {list(processed_data[0].columns)}")
-        print(f"Data types: {processed_data[0].dtypes}")
-        
-        # Show examples for LDPE and HDPE samples
-        ldpe_samples = [df for df in processed_data if df['sample'].iloc[0].startswith('LDPE-')]
-        hdpe_samples = [df for df in processed_data if df['sample'].iloc[0].startswith('HDPE-')]
-        
-        # if ldpe_samples:
-        #     print(f"\n=== LDPE Sample Example ===")
-        #     print(f"Sample name: {ldpe_samples[0]['sample'].iloc[0]}")
-        #     print(f"Data shape: {ldpe_samples[0].shape}")
-        #     print("First 5 rows:")
-        #     print(ldpe_samples[0].head())
-        #     print("\nLast 5 rows:")
-        #     print(ldpe_samples[0].tail())
-        
-        # if hdpe_samples:
-        #     print(f"\n=== HDPE Sample Example ===")
-        #     print(f"Sample name: {hdpe_samples[0]['sample'].iloc[0]}")
-        #     print(f"Data shape: {hdpe_samples[0].shape}")
-        #     print("First 5 rows:")
-        #     print(hdpe_samples[0].head())
-        #     print("\nLast 5 rows:")
-        #     print(hdpe_samples[0].tail())
-        
-        # # Summary statistics
-        # print(f"\n=== Summary ===")
-        # print(f"Total LDPE samples: {len(ldpe_samples)}")
-        # print(f"Total HDPE samples: {len(hdpe_samples)}")
-        
+from src.processing.pipeline import run_pipeline
+# matplotlib is imported right before plotting so runs that never reach a plot skip it
+
+# Drop runs whose x range would shrink the shared grid for every sample (see src/processing/qc.py).
+# Off by default: excluded runs leave the library, which changes its rows and sample names
+QC_EXCLUDE_BEFORE_GRID = False
+
+# Normalization applied to each interpolated matrix and recorded in the metadata;
+# see NORMALIZATION_SCHEMES in src/processing/normalization.py
+TGA_NORMALIZATION = 'max'
+DSC_NORMALIZATION = 'none'
+
+# Processes decoding raw files that are not in the parse cache yet (None: one per CPU).
+# Worker processes re-import this script, so everything below stays under the
+# __main__ guard.
+RAW_READ_WORKERS = None
+
+if __name__ == "__main__":
+    # Create output directories for processed data
+    output_dir = "processed_data"
+    tga_output_dir = os.path.join(output_dir, "tga")
+    dsc_output_dir = os.path.join(output_dir, "dsc")
+
+    # Create directories if they don't exist
+    os.makedirs(tga_output_dir, exist_ok=True)
+    os.makedirs(dsc_output_dir, exist_ok=True)
+
+    print(f"Created output directories:")
+    print(f"  - TGA data: {tga_output_dir}")
+    print(f"  - DSC data: {dsc_output_dir}")
+
+    # ----------------------- TGA -----------------------
+
+    # # Get all subdirectories in the raw_data folder
+    # raw_data_path = "/Users/jessicaagyemang/Documents/raw_data/FTIR"
+    # data_directories = []
+
+    # if os.path.exists(raw_data_path):
+    #     # Get all subdirectories
+    #     for item in os.listdir(raw_data_path):
+    #         item_path = os.path.join(raw_data_path, item)
+    #         if os.path.isdir(item_path):
+    #             data_directories.append(item_path)
+
+    #     if data_directories:
+    #         print(f"Found {len(data_directories)} directories to process:")
+    #         for directory in data_directories:
+    #             print(f"  - {directory}")
+
+    #         # Call convert_csv function
+    #         results = convert_csv(data_directories)
+    #     else:
+    #         print("No subdirectories found in raw_data folder")
+    # else:
+    #     print(f"Error: Directory {raw_data_path} does not exist")
+
+
+    # Define the TGA folder path (a zip/tar archive of the runs works too)
+    tga_folder = "/Users/jessicaagyemang/Documents/raw_data/TGA"
+    # Parse, QC screen, auto-trim, interpolate, normalize and save in one memoized run
+    # (src/processing/pipeline.py); raw files unchanged since the last run are not re-parsed
+    if os.path.exists(tga_folder):
+        try:
+            tga_result = run_pipeline('tga', tga_folder, normalization=TGA_NORMALIZATION,
+                                      qc_screen=QC_EXCLUDE_BEFORE_GRID, data_dir=output_dir,
+                                      workers=RAW_READ_WORKERS)
+        except ValueError as e:
+            tga_result = None
+            print(f"No TGA data files found or processed: {e}")
+
+        if tga_result is not None:
+            interpolated_array = tga_result['data']
+            tga_x_grid = tga_result['x']
+            sample_names = tga_result['sample_names']
+
+            print(f"\nTGA Processing Summary:")
+            print(f"  - Number of samples: {len(sample_names)}")
+            print(f"  - Interpolation points: {interpolated_array.shape[1]}")
+            print(f"  - Temperature range: {tga_x_grid[0]:.1f}°C to {tga_x_grid[-1]:.1f}°C")
+            print(f"  - Normalization: '{TGA_NORMALIZATION}'")
+            print(f"  - Sample names: {sample_names}")
+            print(f"  - Saved to {tga_output_dir} (QC table: {os.path.join(tga_output_dir, 'tga_qc.txt')})")
+
+            # Show some statistics about the interpolated data
+            print(f"\nInterpolated data statistics:")
+            print(f"Min value across all samples: {np.nanmin(interpolated_array):.4f}")
+            print(f"Max value across all samples: {np.nanmax(interpolated_array):.4f}")
+            print(f"Mean value across all samples: {np.nanmean(interpolated_array):.4f}")
+
+            # Plot the interpolated data against the exact grid it was interpolated onto
+            import matplotlib.pyplot as plt
+            plt.figure(figsize=(10, 6))
+            for i, sample_name in enumerate(sample_names):
+                plt.plot(tga_x_grid, interpolated_array[i], label=sample_name, alpha=0.7)
+
+            plt.xlabel('Temperature (°C)')
+            plt.ylabel('Normalized Mass (Interpolated)')
+            plt.title('Interpolated TGA Curves for All Samples')
+            plt.legend(loc='best', fontsize='small', ncol=2)
+            plt.tight_layout()
+            plt.show()
+
+            print("\nTGA data processing complete! Check the interactive plot above.")
     else:
-        print("No TGA data files found or processed")
-
-    # Auto-trim the data to find overlapping range
-    if processed_data:
-        # Use auto_trim to find overlapping range across all samples
-        trimmed_data = auto_trim(processed_data, x_col='X')
-        
-        # Show summary of trimmed data
-        print(f"\n=== Trimmed Data Summary ===")
-        print(f"Total samples after trimming: {len(trimmed_data)}")
-        # Print the overall trimmed data range (overlapping X range)
-        if trimmed_data and not trimmed_data[0].empty:
-            overlap_min = trimmed_data[0]['X'].min()
-            overlap_max = trimmed_data[0]['X'].max()
-            print(f"Trimmed data X range (overlapping): {overlap_min:.1f}°C to {overlap_max:.1f}°C")
-        
-        if trimmed_data:
-            print(f"First trimmed DataFrame shape: {trimmed_data[0].shape}")
-            print("First 5 rows of trimmed data:")
-            print(trimmed_data[0].head())
-            print("\nLast 5 rows of trimmed data:")
-            print(trimmed_data[0].tail())
-
-            # # Show one example of LDPE and HDPE after trimming
-            # ldpe_trimmed = [df for df in trimmed_data if not df.empty and df['sample'].iloc[0].startswith('LDPE-')]
-            # hdpe_trimmed = [df for df in trimmed_data if not df.empty and df['sample'].iloc[0].startswith('HDPE-')]
-
-            # if ldpe_trimmed:
-            #     print("\n=== Example LDPE Trimmed Data ===")
-            #     print(f"Sample name: {ldpe_trimmed[0]['sample'].iloc[0]}")
-            #     print("First 5 rows:")
-            #     print(ldpe_trimmed[0].head())
-            #     print("\nLast 5 rows:")
-            #     print(ldpe_trimmed[0].tail())
-
-            # if hdpe_trimmed:
-            #     print("\n=== Example HDPE Trimmed Data ===")
-            #     print(f"Sample name: {hdpe_trimmed[0]['sample'].iloc[0]}")
-            #     print("First 5 rows:")
-            #     print(hdpe_trimmed[0].head())
-            #     print("\nLast 5 rows:")
-            #     print(hdpe_trimmed[0].tail())
-
-            # # Summary statistics
-            # print(f"\n=== Summary ===")
-            # print(f"Total LDPE samples: {len(ldpe_trimmed)}")
-            # print(f"Total HDPE samples: {len(hdpe_trimmed)}")
-
-            # Normalize the trimmed data
-            if trimmed_data:
-                normalized_data = []
-                
-                for df in trimmed_data:
-                    normalized_df = normalize_tga(df, y_col='Y')
-                    normalized_data.append(normalized_df)
-                
-                # Show summary of normalized data
-                print(f"\n=== Normalized Data Summary ===")
-                print(f"Total samples after normalization: {len(normalized_data)}")
-                
-                if normalized_data:
-                    print(f"First normalized DataFrame shape: {normalized_data[0].shape}")
-                    print("First 5 rows of normalized data:")
-                    print(normalized_data[0].head())
-                    print("\nLast 5 rows of normalized data:")
-                    print(normalized_data[0].tail())
-
-                    # Interpolate the normalized data to a common grid
-                    print(f"\n=== Interpolating Data ===")
-                    interpolated_array = interprolate_data(normalized_data, x_col='X', y_col='Y', N=3000)
-                    
-                    print(f"Interpolated data shape: {interpolated_array.shape}")
-                    print(f"Number of samples: {interpolated_array.shape[0]}")
-                    print(f"Number of interpolated points per sample: {interpolated_array.shape[1]}")
-                    
-                    # Show some statistics about the interpolated data
-                    print(f"\nInterpolated data statistics:")
-                    print(f"Min value across all samples: {np.nanmin(interpolated_array):.4f}")
-                    print(f"Max value across all samples: {np.nanmax(interpolated_array):.4f}")
-                    print(f"Mean value across all samples: {np.nanmean(interpolated_array):.4f}")
-                    
-                    # Get sample names for display
-                    sample_names = [df['sample'].iloc[0] for df in normalized_data]
-                    print(f"\nTGA Processing Summary:")
-                    print(f"  - Number of samples: {len(sample_names)}")
-                    print(f"  - Interpolation points: {interpolated_array.shape[1]}")
-                    print(f"  - Temperature range: {normalized_data[0]['X'].min():.1f}°C to {normalized_data[0]['X'].max():.1f}°C")
-                    print(f"  - Sample names: {sample_names}")
-                    
-                    # Plot the original normalized data
-                    # Sort by sample name (alphanumeric)
-                    # normalized_data_sorted = sorted(normalized_data, key=lambda df: df['sample'].iloc[0])
-                    # plt.figure(figsize=(10, 6))
-                    # for df in normalized_data_sorted:
-                    #     plt.plot(df['X'], df['Y'], label=df['sample'].iloc[0], alpha=0.7)
-
-                    # plt.xlabel('Temperature (°C)')
-                    # plt.ylabel('Normalized Mass')
-                    # plt.title('Normalized TGA Curves for All Samples')
-                    # plt.legend(loc='best', fontsize='small', ncol=2)
-                    # plt.tight_layout()
-                    # plt.show()
-                    
-                    # Plot the interpolated data
-                    # Get the x-axis values for the interpolated data
-                    x_interp = np.linspace(normalized_data[0]['X'].min(), normalized_data[0]['X'].max(), 3000)
-                    
-                    plt.figure(figsize=(10, 6))
-                    for i, sample_name in enumerate(sample_names):
-                        plt.plot(x_interp, interpolated_array[i], label=sample_name, alpha=0.7)
-
-                    plt.xlabel('Temperature (°C)')
-                    plt.ylabel('Normalized Mass (Interpolated)')
-                    plt.title('Interpolated TGA Curves for All Samples')
-                    plt.legend(loc='best', fontsize='small', ncol=2)
-                    plt.tight_layout()
-                    plt.show()
-                    
-                    print("\nTGA data processing complete! Check the interactive plot above.")
-else:
-    print(f"Error: TGA folder {tga_folder} does not exist")
-
-# ----------------------- DSC -----------------------
-
-# Define the DSC folder path
-dsc_folder = "/Users/jessicaagyemang/Documents/raw_data/DSC"
-# Check if the DSC folder exists
-if os.path.exists(dsc_folder):
-    # List files in DSC folder for debugging
-    dsc_files = [f for f in os.listdir(dsc_folder) if f.endswith('.csv')]
-    print(f"\n=== DSC Folder Contents ===")
-    print(f"Found {len(dsc_files)} CSV files in DSC folder:")
-    for f in dsc_files:
-        print(f"  - {f}")
-    print()
-    # Call the dsc_xy function to process DSC files
-    try:
-        from src.processing.special_cleaning import dsc_xy
-    except ImportError:
-        print("dsc_xy function not found in special_cleaning. Please implement or import it.")
-        dsc_xy = None
-
-    if dsc_xy is not None:
-        dsc_processed_data = dsc_xy(dsc_folder)
-
-        # Sort the processed data alphanumerically by sample name if not empty
-        if dsc_processed_data:
-            dsc_processed_data = sorted(dsc_processed_data, key=lambda df: df['sample'].iloc[0])
-            print(f"Processed {len(dsc_processed_data)} DSC files")
-            print("\n=== DSC Data Structure ===")
-            print(f"Type: {type(dsc_processed_data)}")
-            print(f"Length: {len(dsc_processed_data)}")
-            print(f"First DataFrame structure:")
-            print(f"Shape: {dsc_processed_data[0].shape}")
-            print(f"Columns: {list(dsc_processed_data[0].columns)}")
-            print(f"Data types: {dsc_processed_data[0].dtypes}")
-
-            # Trim the data to specific temperature range (60-180°C for DSC)
-            dsc_trimmed_data = []
-            for df in dsc_processed_data:
-                trimmed_df = select_trim(df, x_min=60, x_max=180, x_col='X', y_col='Y', sample_col='sample')
-                dsc_trimmed_data.append(trimmed_df)
-            print(f"\n=== Trimmed DSC Data Summary ===")
-            print(f"Total samples after trimming: {len(dsc_trimmed_data)}")
-            if dsc_trimmed_data and not dsc_trimmed_data[0].empty:
-                overlap_min = dsc_trimmed_data[0]['X'].min()
-                overlap_max = dsc_trimmed_data[0]['X'].max()
-                print(f"Trimmed DSC data X range (overlapping): {overlap_min:.1f}°C to {overlap_max:.1f}°C")
-            if dsc_trimmed_data:
-                print(f"First trimmed DSC DataFrame shape: {dsc_trimmed_data[0].shape}")
-                print("First 5 rows of trimmed DSC data:")
-                print(dsc_trimmed_data[0].head())
-                
-                # Interpolate the DSC data to a common grid
-                print(f"\n=== Interpolating DSC Data ===")
-                dsc_interpolated_array = interprolate_data(dsc_trimmed_data, x_col='X', y_col='Y', N=3000)
-                
-                print(f"Interpolated DSC data shape: {dsc_interpolated_array.shape}")
-                print(f"Number of samples: {dsc_interpolated_array.shape[0]}")
-                print(f"Number of interpolated points per sample: {dsc_interpolated_array.shape[1]}")
-                
-                # Show some statistics about the interpolated DSC data
-                print(f"\nInterpolated DSC data statistics:")
-                print(f"Min value across all samples: {np.nanmin(dsc_interpolated_array):.4f}")
-                print(f"Max value across all samples: {np.nanmax(dsc_interpolated_array):.4f}")
-                print(f"Mean value across all samples: {np.nanmean(dsc_interpolated_array):.4f}")
-                
-                # Save the DSC sample index mapping
-                dsc_sample_names = [df['sample'].iloc[0] for df in dsc_trimmed_data if not df.empty]
-                dsc_mapping_file = os.path.join(dsc_output_dir, "dsc_sample_index_mapping.txt")
-                with open(dsc_mapping_file, 'w') as f:
-                    f.write("Index\tSample Name\n")
-                    f.write("-" * 30 + "\n")
-                    for i, sample_name in enumerate(dsc_sample_names):
-                        f.write(f"{i}\t{sample_name}\n")
-                print(f"\nDSC sample index mapping saved to: {dsc_mapping_file}")
-                
-                # Save the interpolated DSC data
-                dsc_data_file = os.path.join(dsc_output_dir, "interpolated_dsc_data.npy")
-                np.save(dsc_data_file, dsc_interpolated_array)
-                print(f"Interpolated DSC data saved to: {dsc_data_file}")
-                
-                # Save metadata about the DSC data
-                dsc_metadata = {
-                    'num_samples': dsc_interpolated_array.shape[0],
-                    'num_points': dsc_interpolated_array.shape[1],
-                    'x_range': [dsc_trimmed_data[0]['X'].min(), dsc_trimmed_data[0]['X'].max()],
-                    'sample_names': dsc_sample_names,
-                    'data_type': 'DSC',
-                    'trim_range': [60, 180],  # Temperature range used for trimming
-                    'interpolation_points': 3000
-                }
-                
-                dsc_metadata_file = os.path.join(dsc_output_dir, "dsc_metadata.npz")
-                np.savez(dsc_metadata_file, **dsc_metadata)
-                print(f"DSC metadata saved to: {dsc_metadata_file}")
-                
-                # Save sample names as a separate text file for easy reading
-                dsc_samples_file = os.path.join(dsc_output_dir, "dsc_sample_names.txt")
-                with open(dsc_samples_file, 'w') as f:
-                    for i, sample_name in enumerate(dsc_sample_names):
-                        f.write(f"{i}: {sample_name}\n")
-                print(f"DSC sample names saved to: {dsc_samples_file}")
-                
-                # Plot the interpolated DSC data
-                x_interp_dsc = np.linspace(dsc_trimmed_data[0]['X'].min(), dsc_trimmed_data[0]['X'].max(), 3000)
-                
-                plt.figure(figsize=(10, 6))
-                for i, sample_name in enumerate(dsc_sample_names):
-                    plt.plot(x_interp_dsc, dsc_interpolated_array[i], label=sample_name, alpha=0.7)
-
-                plt.xlabel('Temperature (°C)')
-                plt.ylabel('Heat Flow (W/g) - Interpolated')
-                plt.title('Interpolated DSC Curves for All Samples')
-                plt.legend(loc='best', fontsize='small', ncol=2)
-                plt.tight_layout()
-                plt.show()
-                
-                print("\nDSC data processing complete! Check the interactive plot above.")
-        else:
-            print("No DSC data files found or processed")
+        print(f"Error: TGA folder {tga_folder} does not exist")
+
+    # ----------------------- DSC -----------------------
+
+    # Define the DSC folder path (a zip/tar archive of the runs works too)
+    dsc_folder = "/Users/jessicaagyemang/Documents/raw_data/DSC"
+    # Same memoized run, trimmed to 60-180°C (PIPELINE_DEFAULTS in src/processing/pipeline.py)
+    if os.path.exists(dsc_folder):
+        try:
+            dsc_result = run_pipeline('dsc', dsc_folder, trim=(60, 180), normalization=DSC_NORMALIZATION,
+                                      qc_screen=QC_EXCLUDE_BEFORE_GRID, data_dir=output_dir,
+                                      workers=RAW_READ_WORKERS)
+        except ValueError as e:
+            dsc_result = None
+            print(f"No DSC data files found or processed: {e}")
+
+        if dsc_result is not None:
+            dsc_interpolated_array = dsc_result['data']
+            dsc_x_grid = dsc_result['x']
+            dsc_sample_names = dsc_result['sample_names']
+
+            print(f"\nDSC Processing Summary:")
+            print(f"  - Number of samples: {len(dsc_sample_names)}")
+            print(f"  - Interpolation points: {dsc_interpolated_array.shape[1]}")
+            print(f"  - Temperature range: {dsc_x_grid[0]:.1f}°C to {dsc_x_grid[-1]:.1f}°C")
+            print(f"  - Normalization: '{DSC_NORMALIZATION}'")
+            print(f"  - Saved to {dsc_output_dir} (QC table: {os.path.join(dsc_output_dir, 'dsc_qc.txt')})")
+
+            # Show some statistics about the interpolated DSC data
+            print(f"\nInterpolated DSC data statistics:")
+            print(f"Min value across all samples: {np.nanmin(dsc_interpolated_array):.4f}")
+            print(f"Max value across all samples: {np.nanmax(dsc_interpolated_array):.4f}")
+            print(f"Mean value across all samples: {np.nanmean(dsc_interpolated_array):.4f}")
+
+            # Plot the interpolated DSC data
+            import matplotlib.pyplot as plt
+            plt.figure(figsize=(10, 6))
+            for i, sample_name in enumerate(dsc_sample_names):
+                plt.plot(dsc_x_grid, dsc_interpolated_array[i], label=sample_name, alpha=0.7)
+
+            plt.xlabel('Temperature (°C)')
+            plt.ylabel('Heat Flow (W/g) - Interpolated')
+            plt.title('Interpolated DSC Curves for All Samples')
+            plt.legend(loc='best', fontsize='small', ncol=2)
+            plt.tight_layout()
+            plt.show()
+
+            print("\nDSC data processing complete! Check the interactive plot above.")
     else:
-        print("dsc_xy function is not available.")
-else:
-    print(f"Error: DSC folder {dsc_folder} does not exist")
-
-# ----------------------- Summary -----------------------
-
-print(f"\n{'='*50}")
-print("PROCESSING SUMMARY")
-print(f"{'='*50}")
-
-# Check what was saved
-if os.path.exists(tga_output_dir):
-    tga_files = os.listdir(tga_output_dir)
-    print(f"\nTGA data saved in: {tga_output_dir}")
-    print("Files created:")
-    for file in tga_files:
-        file_path = os.path.join(tga_output_dir, file)
-        file_size = os.path.getsize(file_path)
-        print(f"  - {file} ({file_size} bytes)")
-
-if os.path.exists(dsc_output_dir):
-    dsc_files = os.listdir(dsc_output_dir)
-    print(f"\nDSC data saved in: {dsc_output_dir}")
-    print("Files created:")
-    for file in dsc_files:
-        file_path = os.path.join(dsc_output_dir, file)
-        file_size = os.path.getsize(file_path)
-        print(f"  - {file} ({file_size} bytes)")
-
-print(f"\n{'='*50}")
-print("Data files are ready for further analysis!")
-print(f"{'='*50}")
+        print(f"Error: DSC folder {dsc_folder} does not exist")
+
+    # ----------------------- FTIR / Rheology -----------------------
+
+    # Same processed layout, built chunk by chunk (see src/processing/spectral.py);
+    # folders that do not exist are skipped
+    from src.processing.spectral import process_spectral
+    spectral_folders = {
+        'ftir': "/Users/jessicaagyemang/Documents/raw_data/FTIR",
+        'rheology': "/Users/jessicaagyemang/Documents/raw_data/Rheology",
+    }
+    for modality, folder in spectral_folders.items():
+        if os.path.exists(folder):
+            try:
+                process_spectral(modality, folder, data_dir=output_dir)
+            except ValueError as e:
+                print(f"{modality.upper()} not processed: {e}")
+
+    # ----------------------- Cross-modality index -----------------------
+
+    # Record which samples have which modalities (and at which rows) so aligned
+    # multi-modal matrices can be gathered without re-joining the name files
+    from src.processing.alignment import build_sample_index
+    try:
+        sample_index = build_sample_index(('tga', 'dsc'), data_dir=output_dir)
+        print(f"\nCross-modality sample index saved to: {os.path.join(output_dir, 'sample_index.npz')}")
+        print(f"  - Samples with all modalities: {len(sample_index['common_names'])} of {len(sample_index['sample_names'])}")
+    except ValueError as e:
+        print(f"\nCross-modality sample index not built: {e}")
+
+    # ----------------------- Summary -----------------------
+
+    print(f"\n{'='*50}")
+    print("PROCESSING SUMMARY")
+    print(f"{'='*50}")
+
+    # Check what was saved
+    if os.path.exists(tga_output_dir):
+        tga_files = os.listdir(tga_output_dir)
+        print(f"\nTGA data saved in: {tga_output_dir}")
+        print("Files created:")
+        for file in tga_files:
+            file_path = os.path.join(tga_output_dir, file)
+            file_size = os.path.getsize(file_path)
+            print(f"  - {file} ({file_size} bytes)")
+
+    if os.path.exists(dsc_output_dir):
+        dsc_files = os.listdir(dsc_output_dir)
+        print(f"\nDSC data saved in: {dsc_output_dir}")
+        print("Files created:")
+        for file in dsc_files:
+            file_path = os.path.join(dsc_output_dir, file)
+            file_size = os.path.getsize(file_path)
+            print(f"  - {file} ({file_size} bytes)")
+
+    print(f"\n{'='*50}")
+    print("Data files are ready for further analysis!")
+    print(f"{'='*50}")
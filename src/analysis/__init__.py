@@ -0,0 +1,81 @@
+# analysis module
+
+"""
+This module provides vectorized analyses over the processed (interpolated) data library,
+such as pairwise comparisons between samples.
+
+Functions are resolved lazily on first attribute access, matching src.processing.
+"""
+
+import importlib
+
+# Map each public name to the submodule that defines it
+_LAZY_ATTRS = {
+    "pair_indices": ".pairs",
+    "iter_pair_blocks": ".pairs",
+    "pair_row_blocks": ".pairs",
+    "iter_all_pairs": ".pairs",
+    "divergent_regions": ".divergence",
+    "top_divergent_regions": ".divergence",
+    "write_divergence_table": ".divergence",
+    "condensed_distances": ".clustering",
+    "cluster_samples": ".clustering",
+    "save_clusters": ".clustering",
+    "load_clusters": ".clustering",
+    "cluster_ordered_pairs": ".clustering",
+    "iter_cluster_ordered_pairs": ".clustering",
+    "knn_graph": ".knn_graph",
+    "insert_samples": ".knn_graph",
+    "permute_graph": ".knn_graph",
+    "save_knn_graph": ".knn_graph",
+    "load_knn_graph": ".knn_graph",
+    "update_knn_graph": ".knn_graph",
+    "neighbours": ".knn_graph",
+    "pair_stats_tile": ".tiled",
+    "run_tiled_pairwise": ".tiled",
+    "assemble_pairwise": ".tiled",
+    "pair_stats_table": ".tiled",
+    "load_pair_stats": ".tiled",
+    "minmax_decimate": ".decimation",
+    "lttb": ".decimation",
+    "decimate": ".decimation",
+    "share_array": ".shared_pool",
+    "attach_array": ".shared_pool",
+    "parallel_ranges": ".shared_pool",
+    "parallel_pairwise": ".shared_pool",
+    "row_stats": ".distances",
+    "distance_block": ".distances",
+    "median_scale": ".distances",
+    "fused_distance_matrix": ".distances",
+    "load_fused_distances": ".distances",
+    "dtw_banded": ".shift_tolerant",
+    "keogh_envelope": ".shift_tolerant",
+    "lb_keogh": ".shift_tolerant",
+    "lag_distance": ".shift_tolerant",
+    "shift_tolerant_pairwise": ".shift_tolerant",
+    "dtw_nearest": ".shift_tolerant",
+    "dtw_knn_graph": ".shift_tolerant",
+    "PairStatsCache": ".pair_cache",
+    "cached_pair_stats": ".pair_cache",
+    "material_prefix": ".pair_sampling",
+    "diff_range": ".pair_sampling",
+    "pair_strata": ".pair_sampling",
+    "pairwise_summary": ".pair_sampling",
+    "QueryLibrary": ".query_service",
+    "serve": ".query_service",
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value  # cache so __getattr__ is only hit once per name
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,213 @@
+# Hierarchical clustering of samples from pairwise distances
+# scipy is an optional dependency and is only imported when a linkage is built.
+
+import os
+import numpy as np
+
+from src.processing.loading import processed_paths, load_processed
+from .distances import sq_euclidean_block
+from .pairs import pair_row_blocks
+
+
+def condensed_distances(data, block_size=512, dtype=np.float64):
+    """
+    Euclidean distances between all rows in condensed (upper-triangle) form.
+
+    Rows are processed in blocks using ||a-b||^2 = ||a||^2 + ||b||^2 - 2 a.b, so only
+    the n*(n-1)/2 condensed vector and one (block_size, n) tile are held in memory,
+    never the full square matrix.
+
+    Args:
+        data (np.ndarray): Matrix of shape (num_samples, num_points) without NaNs.
+        block_size (int): Number of rows per block.
+        dtype: dtype of the returned vector (float32 halves memory for large libraries).
+
+    Returns:
+        np.ndarray: 1D condensed distance vector in scipy.spatial.distance.pdist order.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    n = data.shape[0]
+    nan_rows = np.flatnonzero(np.isnan(data).any(axis=1))
+    if nan_rows.size:
+        raise ValueError(f"Cannot compute distances for rows containing NaN: {nan_rows.tolist()}")
+
+    sq_norms = np.einsum('ij,ij->i', data, data)
+    condensed = np.empty(n * (n - 1) // 2, dtype=dtype)
+    offset = 0
+    for i0 in range(0, n, block_size):
+        i1 = min(i0 + block_size, n)
+        tile = np.sqrt(sq_euclidean_block(data[i0:i1], data[i0:], sq_norms[i0:i1], sq_norms[i0:]))
+        # Keep only j > i; boolean selection is row-major, which matches condensed order
+        upper = np.arange(i0, n)[None, :] > np.arange(i0, i1)[:, None]
+        values = tile[upper]
+        condensed[offset:offset + values.size] = values
+        offset += values.size
+    return condensed
+
+
+def cluster_samples(data, method='average', n_clusters=None, distance_threshold=None, block_size=512):
+    """
+    Build a hierarchical clustering of the samples and cut it into flat clusters.
+
+    Args:
+        data (np.ndarray): Interpolated matrix of shape (num_samples, num_points).
+        method (str): Linkage method: 'single', 'average', 'complete' or 'ward'.
+        n_clusters (int, optional): Number of flat clusters to cut the tree into.
+        distance_threshold (float, optional): Cut height, used if n_clusters is not given.
+                                              If neither is set each sample is its own cluster.
+        block_size (int): Row block size for the distance computation.
+
+    Returns:
+        dict: 'labels' (cluster id per sample, 0-based), 'leaf_order' (dendrogram leaf
+              order of sample indices), 'linkage' (scipy linkage matrix) and 'method'.
+    """
+    try:
+        from scipy.cluster import hierarchy
+    except ImportError as e:
+        raise ImportError("cluster_samples requires scipy (pip install scipy)") from e
+
+    if method not in ('single', 'average', 'complete', 'ward'):
+        raise ValueError("method must be 'single', 'average', 'complete' or 'ward'")
+    n = np.asarray(data).shape[0]
+    if n < 2:
+        return {
+            'labels': np.zeros(n, dtype=np.intp),
+            'leaf_order': np.arange(n),
+            'linkage': np.empty((0, 4)),
+            'method': method,
+        }
+
+    distances = condensed_distances(data, block_size=block_size)
+    linkage = hierarchy.linkage(distances, method=method)
+    del distances
+
+    if n_clusters is not None:
+        labels = hierarchy.fcluster(linkage, t=n_clusters, criterion='maxclust')
+    elif distance_threshold is not None:
+        labels = hierarchy.fcluster(linkage, t=distance_threshold, criterion='distance')
+    else:
+        labels = np.arange(1, n + 1)
+
+    return {
+        'labels': np.asarray(labels, dtype=np.intp) - 1,
+        'leaf_order': hierarchy.leaves_list(linkage),
+        'linkage': linkage,
+        'method': method,
+    }
+
+
+def cluster_paths(modality, data_dir="processed_data"):
+    """Paths of the cluster files stored alongside a modality's processed data."""
+    modality_dir = processed_paths(modality, data_dir)['dir']
+    return {
+        'clusters': os.path.join(modality_dir, f"{modality}_clusters.npz"),
+        'labels': os.path.join(modality_dir, f"{modality}_cluster_labels.txt"),
+    }
+
+
+def save_clusters(modality, result, sample_names, data_dir="processed_data"):
+    """
+    Persist a clustering result next to processed_data/<modality>/.
+
+    Writes <modality>_clusters.npz (labels, leaf_order, linkage, method, sample_names)
+    and a readable <modality>_cluster_labels.txt listing samples in leaf order.
+    """
+    paths = cluster_paths(modality, data_dir)
+    np.savez(
+        paths['clusters'],
+        labels=result['labels'],
+        leaf_order=result['leaf_order'],
+        linkage=result['linkage'],
+        method=result['method'],
+        sample_names=np.asarray(sample_names),
+    )
+    with open(paths['labels'], 'w') as f:
+        f.write("Index\tSample Name\tCluster\n")
+        f.write("-" * 40 + "\n")
+        for i in result['leaf_order']:
+            f.write(f"{i}\t{sample_names[i]}\t{result['labels'][i]}\n")
+    return paths
+
+
+def load_clusters(modality, data_dir="processed_data"):
+    """
+    Load a saved clustering result, or None if the modality has not been clustered.
+    """
+    path = cluster_paths(modality, data_dir)['clusters']
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as npz:
+        return {
+            'labels': npz['labels'],
+            'leaf_order': npz['leaf_order'],
+            'linkage': npz['linkage'],
+            'method': npz['method'].item(),
+            'sample_names': npz['sample_names'].tolist(),
+        }
+
+
+def iter_cluster_ordered_pairs(labels, leaf_order=None, block_size=65536):
+    """
+    Yield all sample pairs in blocks, within-cluster pairs first.
+
+    Clusters are visited in the order they first appear in the dendrogram leaf order
+    and their pairs follow that leaf order, so similar samples are visited next to each
+    other; the between-cluster pairs come last, also in leaf order. Only one block of
+    about block_size pairs exists at a time, never the n*(n-1)/2 pair list.
+
+    Args:
+        labels (np.ndarray): Cluster label per sample.
+        leaf_order (np.ndarray, optional): Dendrogram leaf order; defaults to index order.
+        block_size (int): Pairs per yielded block.
+
+    Yields:
+        np.ndarray: (m, 2) arrays of sample index pairs (i, j) with i < j.
+    """
+    labels = np.asarray(labels)
+    n = labels.shape[0]
+    leaf_order = np.arange(n) if leaf_order is None else np.asarray(leaf_order)
+    leaf_labels = labels[leaf_order]
+    # Group leaf positions by label once; the stable sort keeps leaf order inside each
+    # cluster, so a group's first position is where the cluster first appears
+    grouped = np.argsort(leaf_labels, kind='stable')
+    _, starts, counts = np.unique(leaf_labels[grouped], return_index=True, return_counts=True)
+
+    def within():
+        for c in np.argsort(grouped[starts], kind='stable'):
+            if counts[c] < 2:
+                continue  # singletons have no within-cluster pairs
+            members = leaf_order[grouped[starts[c]:starts[c] + counts[c]]]
+            for a in range(len(members) - 1):
+                yield members[a], members[a + 1:]
+
+    def between():
+        for a in range(n - 1):
+            yield leaf_order[a], leaf_order[a + 1:][leaf_labels[a + 1:] != leaf_labels[a]]
+
+    yield from pair_row_blocks(within(), block_size)
+    yield from pair_row_blocks(between(), block_size)
+
+
+def cluster_ordered_pairs(labels, leaf_order=None):
+    """
+    All sample pairs ordered so that within-cluster pairs come first.
+
+    Same order as iter_cluster_ordered_pairs, as one array: this holds all
+    n*(n-1)/2 pairs in memory, so large libraries should iterate the blocks instead.
+
+    Returns:
+        np.ndarray: Array of shape (n*(n-1)/2, 2) of sample index pairs.
+    """
+    blocks = list(iter_cluster_ordered_pairs(labels, leaf_order))
+    return np.concatenate(blocks) if blocks else np.empty((0, 2), dtype=np.intp)
+
+
+if __name__ == "__main__":
+    import sys
+
+    modalities = sys.argv[1:] or ['tga', 'dsc']
+    for modality in modalities:
+        data, sample_names, _ = load_processed(modality)
+        result = cluster_samples(data, method='average', n_clusters=min(5, len(sample_names)))
+        paths = save_clusters(modality, result, sample_names)
+        print(f"{modality.upper()}: {len(np.unique(result['labels']))} clusters saved to {paths['clusters']}")
@@ -0,0 +1,92 @@
+# Curve decimation for fast plotting
+# A 3000-point curve drawn into a few hundred pixels wastes most of its vertices.
+# Both reducers keep the visual shape: min/max keeps the extremes of every bucket
+# (no peak is ever dropped), LTTB (largest-triangle-three-buckets) keeps the point
+# of each bucket that forms the largest triangle with its neighbours.
+
+import numpy as np
+
+
+def _bucket_edges(num_points, num_buckets):
+    return np.linspace(0, num_points, num_buckets + 1).astype(np.intp)
+
+
+def minmax_decimate(x, y, num_buckets=500):
+    """
+    Keep the minimum and maximum of y in each of num_buckets equal-width index buckets.
+
+    Points are returned in their original order, so the result draws as a line.
+
+    Args:
+        x, y (np.ndarray): 1D arrays of the same length.
+        num_buckets (int): Number of buckets; the output has at most 2 * num_buckets points.
+
+    Returns:
+        tuple: (x_out, y_out).
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n = len(y)
+    if n <= 2 * num_buckets:
+        return x, y
+    # Equal-size buckets via reshape; the tail that does not fill a bucket is kept as is
+    size = n // num_buckets
+    body = y[:size * num_buckets].reshape(num_buckets, size)
+    filled = np.where(np.isnan(body), np.nanmean(body) if np.isfinite(body).any() else 0.0, body)
+    offsets = np.arange(num_buckets) * size
+    lo = offsets + filled.argmin(axis=1)
+    hi = offsets + filled.argmax(axis=1)
+    keep = np.sort(np.concatenate([lo, hi, np.arange(size * num_buckets, n)]))
+    keep = keep[np.concatenate([[True], np.diff(keep) > 0])]
+    return x[keep], y[keep]
+
+
+def lttb(x, y, num_out=1000):
+    """
+    Largest-triangle-three-buckets downsampling to num_out points.
+
+    The first and last points are always kept; every bucket in between contributes the
+    point with the largest triangle area formed with the previously selected point and
+    the mean of the next bucket. The areas of a whole bucket are computed at once.
+
+    Args:
+        x, y (np.ndarray): 1D arrays of the same length (x increasing).
+        num_out (int): Number of output points (>= 3).
+
+    Returns:
+        tuple: (x_out, y_out).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if num_out >= n or num_out < 3:
+        return x, y
+    edges = _bucket_edges(n - 2, num_out - 2) + 1
+    # Mean of every bucket (the "next bucket" anchor); the last anchor is the final point
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    mean_x = np.append(sums_x / counts, x[-1])
+    mean_y = np.append(sums_y / counts, y[-1])
+
+    keep = np.empty(num_out, dtype=np.intp)
+    keep[0], keep[-1] = 0, n - 1
+    prev = 0
+    for b in range(num_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        area = np.abs((x[prev] - mean_x[b + 1]) * (y[lo:hi] - y[prev])
+                      - (x[prev] - x[lo:hi]) * (mean_y[b + 1] - y[prev]))
+        prev = lo + int(np.nanargmax(area)) if np.isfinite(area).any() else lo
+        keep[b + 1] = prev
+    return x[keep], y[keep]
+
+
+def decimate(x, y, max_points=1000, method='minmax'):
+    """Reduce a curve to about max_points points with 'minmax' or 'lttb' (None to skip)."""
+    if method is None:
+        return np.asarray(x), np.asarray(y)
+    if method == 'minmax':
+        return minmax_decimate(x, y, max(1, max_points // 2))
+    if method == 'lttb':
+        return lttb(x, y, max_points)
+    raise ValueError("method must be 'minmax', 'lttb' or None")
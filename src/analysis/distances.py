@@ -0,0 +1,173 @@
+# Distance kernels built on matrix products, and weighted multi-modal fusion
+# Every metric is expressed through a single a @ b.T (BLAS GEMM) plus cached
+# per-row statistics, e.g. ||a - b||^2 = ||a||^2 + ||b||^2 - 2 a.b, so no
+# (n, n, num_points) difference array is ever formed.
+
+import warnings
+
+import numpy as np
+
+METRICS = ('euclidean', 'sqeuclidean', 'rms', 'cosine', 'correlation')
+MEDIAN_SAMPLE_ROWS = 256
+
+
+def row_stats(data):
+    """
+    Per-row statistics reused by every distance block.
+
+    Args:
+        data (np.ndarray): Matrix of shape (num_samples, num_points).
+
+    Returns:
+        dict: 'sq_norms' (||x||^2), 'means', 'centered_sq_norms' (||x - mean||^2)
+              and 'num_points'.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    sq_norms = np.einsum('ij,ij->i', data, data)
+    means = data.mean(axis=1)
+    num_points = data.shape[1]
+    return {
+        'sq_norms': sq_norms,
+        'means': means,
+        'centered_sq_norms': np.maximum(sq_norms - num_points * means ** 2, 0.0),
+        'num_points': num_points,
+    }
+
+
+def sq_euclidean_block(a, b, a_sq_norms, b_sq_norms):
+    """Squared Euclidean distances between rows of a and b from one matrix product."""
+    d = a_sq_norms[:, None] + b_sq_norms[None, :] - 2.0 * (a @ b.T)
+    np.maximum(d, 0.0, out=d)
+    return d
+
+
+def distance_block(a, b, metric='euclidean', a_stats=None, b_stats=None):
+    """
+    Distances between every row of a and every row of b.
+
+    Args:
+        a, b (np.ndarray): Matrices with the same number of columns.
+        metric (str): 'euclidean', 'sqeuclidean', 'rms' (Euclidean / sqrt(num_points)),
+                      'cosine' (1 - cosine similarity) or 'correlation' (1 - Pearson r).
+        a_stats, b_stats (dict, optional): Cached row_stats of a and b.
+
+    Returns:
+        np.ndarray: (len(a), len(b)) distance matrix.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of {METRICS}")
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    a_stats = a_stats if a_stats is not None else row_stats(a)
+    b_stats = b_stats if b_stats is not None else row_stats(b)
+
+    if metric in ('euclidean', 'sqeuclidean', 'rms'):
+        d = sq_euclidean_block(a, b, a_stats['sq_norms'], b_stats['sq_norms'])
+        if metric == 'sqeuclidean':
+            return d
+        if metric == 'rms':
+            d /= a_stats['num_points']
+        return np.sqrt(d, out=d)
+
+    dots = a @ b.T
+    if metric == 'cosine':
+        denom = np.sqrt(a_stats['sq_norms'][:, None] * b_stats['sq_norms'][None, :])
+    else:
+        # Centered dot product without centering the data: a.b - N * mean_a * mean_b
+        dots = dots - a_stats['num_points'] * a_stats['means'][:, None] * b_stats['means'][None, :]
+        denom = np.sqrt(a_stats['centered_sq_norms'][:, None] * b_stats['centered_sq_norms'][None, :])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        similarity = np.where(denom > 0, dots / denom, 0.0)
+    return 1.0 - np.clip(similarity, -1.0, 1.0)
+
+
+def median_scale(data, metric='euclidean', stats=None, sample_rows=MEDIAN_SAMPLE_ROWS, seed=0):
+    """
+    Median off-diagonal distance of one modality, used to put modalities on a common scale.
+
+    Distances from up to sample_rows rows drawn across the whole matrix to every row
+    are reduced with nanmedian, so NaN rows (failed interpolation) are ignored.
+
+    Raises:
+        ValueError: If the median is NaN, infinite or zero (e.g. every row is NaN or
+                    all rows are identical), since dividing by it would corrupt D.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    stats = stats if stats is not None else row_stats(data)
+    n = data.shape[0]
+    rows = np.arange(n)
+    if n > sample_rows:
+        rows = np.sort(np.random.default_rng(seed).choice(n, size=sample_rows, replace=False))
+    a_stats = {k: (v[rows] if isinstance(v, np.ndarray) else v) for k, v in stats.items()}
+    block = distance_block(data[rows], data, metric, a_stats, stats)
+    off_diagonal = block[rows[:, None] != np.arange(n)[None, :]]
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN slice
+        scale = float(np.nanmedian(off_diagonal)) if off_diagonal.size else float('nan')
+    if not np.isfinite(scale) or scale == 0.0:
+        raise ValueError(f"Median {metric} distance is {scale}; pass an explicit scale for this modality")
+    return scale
+
+
+def fused_distance_matrix(matrices, weights=None, metrics='euclidean', scales=None, block_size=1024):
+    """
+    Weighted sum of per-modality distances over row-aligned modality matrices.
+
+        D = sum_m weights[m] * d_m(x_m, y_m) / scales[m]
+
+    Row statistics are computed once per modality and every block is one GEMM per
+    modality, so all modalities are fused in a single blocked pass.
+
+    Args:
+        matrices (dict): modality -> matrix, all with the same rows in the same order
+                         (e.g. from src.processing.alignment.load_aligned).
+        weights (dict, optional): modality -> weight; defaults to 1 for every modality.
+        metrics (str or dict): Metric for all modalities, or modality -> metric.
+        scales (dict, optional): modality -> divisor putting distances on a common scale;
+                                 'median' uses median_scale of that modality.
+        block_size (int): Rows per block.
+
+    Returns:
+        np.ndarray: (num_samples, num_samples) fused distance matrix.
+    """
+    modalities = list(matrices)
+    num_samples = {np.asarray(m).shape[0] for m in matrices.values()}
+    if len(num_samples) != 1:
+        raise ValueError("All modality matrices must have the same number of rows (align them first)")
+    n = num_samples.pop()
+    weights = {m: 1.0 for m in modalities} if weights is None else weights
+    metrics = {m: metrics for m in modalities} if isinstance(metrics, str) else metrics
+    scales = dict(scales or {})
+
+    data = {m: np.asarray(matrices[m], dtype=np.float64) for m in modalities}
+    stats = {m: row_stats(data[m]) for m in modalities}
+    for m in modalities:
+        if scales.get(m) == 'median' and weights.get(m, 0.0) != 0.0:
+            scales[m] = median_scale(data[m], metrics[m], stats[m])
+    fused = np.zeros((n, n))
+    for r0 in range(0, n, block_size):
+        r1 = min(r0 + block_size, n)
+        for m in modalities:
+            if weights.get(m, 0.0) == 0.0:
+                continue
+            a_stats = {k: (v[r0:r1] if isinstance(v, np.ndarray) else v) for k, v in stats[m].items()}
+            block = distance_block(data[m][r0:r1], data[m], metrics[m], a_stats, stats[m])
+            fused[r0:r1] += weights[m] * block / scales.get(m, 1.0)
+    np.fill_diagonal(fused, 0.0)
+    return fused
+
+
+def load_fused_distances(weights=None, metrics='euclidean', scales='median', modalities=('tga', 'dsc'),
+                         data_dir="processed_data", block_size=1024):
+    """
+    Fused TGA/DSC distances for samples present in every requested modality.
+
+    Returns:
+        tuple: (sample_names, fused distance matrix)
+    """
+    from src.processing.alignment import load_aligned
+
+    sample_names, aligned = load_aligned(modalities, data_dir)
+    if isinstance(scales, str):
+        scales = {m: scales for m in modalities}
+    return sample_names, fused_distance_matrix(aligned, weights, metrics, scales, block_size)
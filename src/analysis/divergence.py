@@ -0,0 +1,175 @@
+# Top-k divergent temperature windows for pairs of interpolated curves
+
+import numpy as np
+
+from .pairs import pair_indices, iter_pair_blocks, iter_all_pairs
+
+DIVERGENCE_DTYPE = np.dtype([
+    ('idx1', np.intp),
+    ('idx2', np.intp),
+    ('rank', np.intp),
+    ('start_index', np.intp),
+    ('end_index', np.intp),
+    ('x_start', np.float64),
+    ('x_end', np.float64),
+    ('mean_abs_diff', np.float64),
+    ('mean_diff', np.float64),
+])
+
+
+def _window_sums(values, window):
+    """
+    Sliding-window sums along axis 1 via a cumulative sum (shape (rows, N - window + 1)).
+
+    NaNs are summed as zero and counted separately, so a NaN only makes the windows
+    that contain it NaN instead of every window after it.
+    """
+    csum = np.zeros((values.shape[0], values.shape[1] + 1))
+    np.nancumsum(values, axis=1, out=csum[:, 1:])
+    nans = np.zeros(csum.shape, dtype=np.int64)
+    np.cumsum(np.isnan(values), axis=1, out=nans[:, 1:])
+    sums = csum[:, window:] - csum[:, :-window]
+    sums[nans[:, window:] - nans[:, :-window] > 0] = np.nan
+    return sums
+
+
+def _check_grid(data, x, window):
+    """Validate window and x against data and return x as floats (the index by default)."""
+    num_points = data.shape[1]
+    if not 1 <= window <= num_points:
+        raise ValueError(f"window must be between 1 and {num_points}")
+    if x is None:
+        x = np.arange(num_points, dtype=float)
+    x = np.asarray(x, dtype=float)
+    if x.shape != (num_points,):
+        raise ValueError("x must have one value per column of data")
+    return x
+
+
+def _block_regions(data, x, block1, block2, window, top_k):
+    """Top_k non-overlapping windows of one block of pairs, top_k rows per pair."""
+    table = np.zeros(len(block1) * top_k, dtype=DIVERGENCE_DTYPE)
+    table['idx1'] = np.repeat(block1, top_k)
+    table['idx2'] = np.repeat(block2, top_k)
+    table['rank'] = np.tile(np.arange(top_k), len(block1))
+
+    diff = data[block1] - data[block2]
+    abs_scores = _window_sums(np.abs(diff), window) / window
+    signed_scores = _window_sums(diff, window) / window
+    scores = np.where(np.isnan(abs_scores), -np.inf, abs_scores)
+    rows = np.arange(len(block1))
+    window_pos = np.arange(scores.shape[1])
+
+    for rank in range(top_k):
+        best = np.argmax(scores, axis=1)
+        valid = np.isfinite(scores[rows, best])
+        out = rows * top_k + rank
+        table['start_index'][out] = np.where(valid, best, -1)
+        table['end_index'][out] = np.where(valid, best + window - 1, -1)
+        table['x_start'][out] = np.where(valid, x[best], np.nan)
+        table['x_end'][out] = np.where(valid, x[best + window - 1], np.nan)
+        table['mean_abs_diff'][out] = np.where(valid, abs_scores[rows, best], np.nan)
+        table['mean_diff'][out] = np.where(valid, signed_scores[rows, best], np.nan)
+        # Suppress every window overlapping the one just chosen
+        overlap = np.abs(window_pos[None, :] - best[:, None]) < window
+        scores[overlap] = -np.inf
+    return table
+
+
+def _pair_blocks(num_samples, pairs, block_size):
+    """(idx1, idx2) blocks of the requested pairs; all pairs are enumerated block by block."""
+    if pairs is None:
+        for block in iter_all_pairs(num_samples, block_size):
+            yield block[:, 0], block[:, 1]
+    else:
+        for _, block1, block2 in iter_pair_blocks(*pair_indices(num_samples, pairs), block_size):
+            yield block1, block2
+
+
+def divergent_regions(data, x=None, pairs=None, window=50, top_k=3, block_size=256):
+    """
+    Find the top_k non-overlapping windows where each pair of curves differs most.
+
+    The score of a window is the mean absolute difference |y1 - y2| over `window`
+    consecutive grid points. All pairs in a block are scored at once with cumulative
+    sums, then the best windows are picked greedily, blanking out any window that
+    overlaps one already chosen.
+
+    The table has top_k rows for every pair; to keep only the most divergent windows
+    of a whole library use top_divergent_regions, which never holds all pairs.
+
+    Args:
+        data (np.ndarray): Interpolated matrix of shape (num_samples, num_points).
+        x (np.ndarray, optional): Grid values for each column (e.g. from
+                                  src.processing.loading.x_grid). Defaults to the index.
+        pairs (array-like, optional): Subset of (idx1, idx2) pairs; defaults to all pairs.
+        window (int): Window width in grid points.
+        top_k (int): Number of windows to report per pair.
+        block_size (int): Number of pairs processed per block.
+
+    Returns:
+        np.ndarray: Structured array with DIVERGENCE_DTYPE, top_k rows per pair
+                    ordered by pair then rank (0 = most divergent). Windows that
+                    could not be placed (curve too short or NaN) have index -1.
+    """
+    data = np.asarray(data)
+    x = _check_grid(data, x, window)
+    idx1, idx2 = pair_indices(data.shape[0], pairs)
+    table = np.zeros(len(idx1) * top_k, dtype=DIVERGENCE_DTYPE)
+    for start, block1, block2 in iter_pair_blocks(idx1, idx2, block_size):
+        table[start * top_k:(start + len(block1)) * top_k] = _block_regions(data, x, block1, block2, window, top_k)
+    return table
+
+
+def top_divergent_regions(data, x=None, pairs=None, window=50, top_k=3, top_n=1000, block_size=256):
+    """
+    The top_n most divergent windows over all pairs, in one streaming pass.
+
+    Each block of pairs is scored as in divergent_regions (top_k windows per pair),
+    then reduced with argpartition and merged into a running top_n, so memory stays
+    at O(block_size * num_points + top_n) instead of growing with the number of pairs.
+
+    Args:
+        data, x, pairs, window, top_k, block_size: As for divergent_regions.
+        top_n (int): Number of windows to keep across all pairs.
+
+    Returns:
+        np.ndarray: Structured array with DIVERGENCE_DTYPE of at most top_n placed
+                    windows, most divergent first ('rank' is still the rank within
+                    the pair).
+    """
+    if top_n < 1:
+        raise ValueError("top_n must be at least 1")
+    data = np.asarray(data)
+    x = _check_grid(data, x, window)
+    best = np.zeros(0, dtype=DIVERGENCE_DTYPE)
+    for block1, block2 in _pair_blocks(data.shape[0], pairs, block_size):
+        block = _block_regions(data, x, block1, block2, window, top_k)
+        candidates = np.concatenate([best, block[block['start_index'] >= 0]])
+        if len(candidates) > top_n:
+            keep = np.argpartition(-candidates['mean_abs_diff'], top_n - 1)[:top_n]
+            candidates = candidates[keep]
+        best = candidates
+    return best[np.argsort(-best['mean_abs_diff'], kind='stable')]
+
+
+def write_divergence_table(table, sample_names, output_file, x_unit='°C'):
+    """
+    Save a divergence table as tab-separated text with sample names resolved.
+
+    Args:
+        table (np.ndarray): Output of divergent_regions.
+        sample_names (list of str): Sample names in row order of the matrix.
+        output_file (str): Path of the .txt file to write.
+        x_unit (str): Unit label for the window bounds.
+    """
+    with open(output_file, 'w') as f:
+        f.write(f"Sample 1\tSample 2\tRank\tStart ({x_unit})\tEnd ({x_unit})\tMean Abs Diff\tMean Diff\n")
+        for row in table:
+            if row['start_index'] < 0:
+                continue
+            f.write(
+                f"{sample_names[row['idx1']]}\t{sample_names[row['idx2']]}\t{row['rank']}\t"
+                f"{row['x_start']:.2f}\t{row['x_end']:.2f}\t"
+                f"{row['mean_abs_diff']:.6f}\t{row['mean_diff']:.6f}\n"
+            )
@@ -0,0 +1,234 @@
+# k-nearest-neighbour similarity graphs over the interpolated matrices
+# Graphs are stored in CSR form (indptr/indices/distances) next to
+# processed_data/<modality>/ together with the name and content hash of every row,
+# and are extended with new samples wherever they land in the sorted sample list.
+
+import os
+import numpy as np
+
+from src.processing.loading import processed_paths, load_processed
+from src.processing.snapshots import row_hashes
+from .distances import sq_euclidean_block
+
+
+def _sq_distances(a, b, a_norms, b_norms):
+    """Squared Euclidean distances between rows of a and b via one matrix product."""
+    d = sq_euclidean_block(a, b, a_norms, b_norms)
+    # Rows with NaN (failed interpolation) are never anyone's neighbour
+    d[np.isnan(d)] = np.inf
+    return d
+
+
+def _merge_topk(best_d, best_i, cand_d, cand_i, k):
+    """Keep the k smallest of the current best and candidate columns, row by row."""
+    all_d = np.concatenate([best_d, cand_d], axis=1)
+    all_i = np.concatenate([best_i, cand_i], axis=1)
+    if all_d.shape[1] > k:
+        part = np.argpartition(all_d, k - 1, axis=1)[:, :k]
+        all_d = np.take_along_axis(all_d, part, axis=1)
+        all_i = np.take_along_axis(all_i, part, axis=1)
+    return all_d, all_i
+
+
+def _topk_against(queries, query_ids, data, norms, k, block_size):
+    """Top-k neighbours of `queries` among all rows of data, scanning column tiles."""
+    q_norms = np.einsum('ij,ij->i', queries, queries)
+    best_d = np.full((len(queries), 0), np.inf)
+    best_i = np.empty((len(queries), 0), dtype=np.int64)
+    for c0 in range(0, data.shape[0], block_size):
+        c1 = min(c0 + block_size, data.shape[0])
+        tile = _sq_distances(queries, data[c0:c1], q_norms, norms[c0:c1])
+        cols = np.arange(c0, c1)
+        tile[query_ids[:, None] == cols[None, :]] = np.inf  # no self loops
+        best_d, best_i = _merge_topk(best_d, best_i, tile, np.broadcast_to(cols, tile.shape), k)
+    return best_d, best_i
+
+
+def _sorted_rows(best_d, best_i):
+    order = np.argsort(best_d, axis=1, kind='stable')
+    return np.take_along_axis(best_d, order, axis=1), np.take_along_axis(best_i, order, axis=1)
+
+
+def _to_csr(best_d, best_i, k):
+    n = best_d.shape[0]
+    return {
+        'indptr': np.arange(n + 1, dtype=np.int64) * best_d.shape[1],
+        'indices': best_i.reshape(-1).astype(np.int64),
+        'distances': np.sqrt(best_d).reshape(-1),
+        'k': k,
+    }
+
+
+def knn_graph(data, k=10, block_size=1024):
+    """
+    Build a k-nearest-neighbour graph (Euclidean) over the rows of data.
+
+    Distances are computed tile by tile with a matrix product and reduced to the
+    running top-k with argpartition, so memory stays at O(block_size^2 + n*k).
+
+    Args:
+        data (np.ndarray): Interpolated matrix of shape (num_samples, num_points).
+        k (int): Neighbours per sample (capped at num_samples - 1).
+        block_size (int): Rows/columns per tile.
+
+    Returns:
+        dict: CSR arrays 'indptr', 'indices' (neighbour rows, nearest first),
+              'distances' and the requested 'k'.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    n = data.shape[0]
+    k_eff = max(0, min(k, n - 1))
+    norms = np.einsum('ij,ij->i', data, data)
+    best_d = np.empty((n, k_eff))
+    best_i = np.empty((n, k_eff), dtype=np.int64)
+    for r0 in range(0, n, block_size):
+        r1 = min(r0 + block_size, n)
+        d, i = _topk_against(data[r0:r1], np.arange(r0, r1), data, norms, k_eff, block_size)
+        best_d[r0:r1], best_i[r0:r1] = _sorted_rows(d, i)
+    return _to_csr(best_d, best_i, k)
+
+
+def insert_samples(graph, data, num_existing, block_size=1024):
+    """
+    Extend a kNN graph with the rows data[num_existing:].
+
+    New rows get their own top-k over the whole matrix; existing rows only compare
+    against the new rows and swap them in where they are closer than the current
+    neighbours. The cost is O(m * n) distances for m new samples instead of O(n^2).
+
+    Args:
+        graph (dict): Graph built over data[:num_existing].
+        data (np.ndarray): Full matrix with the new samples appended.
+        num_existing (int): Number of rows the graph was built for.
+        block_size (int): Rows/columns per tile.
+
+    Returns:
+        dict: Updated CSR graph over all rows of data.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    n = data.shape[0]
+    k = int(graph['k'])
+    width = graph['indptr'][1] - graph['indptr'][0] if num_existing else 0
+    if width < min(k, n - 1):
+        # The old graph had fewer than k samples to choose from; rebuild it
+        return knn_graph(data, k, block_size)
+    if n == num_existing:
+        return graph
+
+    norms = np.einsum('ij,ij->i', data, data)
+    new_ids = np.arange(num_existing, n)
+    best_d = (graph['distances'] ** 2).reshape(num_existing, width)
+    best_i = graph['indices'].reshape(num_existing, width).copy()  # the caller's graph is not modified
+
+    # Existing rows: merge in candidates from the new rows only
+    new_data, new_norms = data[num_existing:], norms[num_existing:]
+    for r0 in range(0, num_existing, block_size):
+        r1 = min(r0 + block_size, num_existing)
+        tile = _sq_distances(data[r0:r1], new_data, norms[r0:r1], new_norms)
+        d, i = _merge_topk(best_d[r0:r1], best_i[r0:r1], tile,
+                           np.broadcast_to(new_ids, tile.shape), width)
+        best_d[r0:r1], best_i[r0:r1] = _sorted_rows(d, i)
+
+    # New rows: full top-k over every row
+    new_d, new_i = _topk_against(new_data, new_ids, data, norms, width, block_size)
+    new_d, new_i = _sorted_rows(new_d, new_i)
+    return _to_csr(np.vstack([best_d, new_d]), np.vstack([best_i, new_i]), k)
+
+
+def permute_graph(graph, order):
+    """
+    Re-index a graph whose row r describes sample order[r] into plain row order.
+
+    Returns:
+        dict: CSR graph where row order[r] holds the neighbours of graph row r, with
+              neighbour indices mapped through order as well.
+    """
+    order = np.asarray(order, dtype=np.int64)
+    n = len(order)
+    width = int(graph['indptr'][1] - graph['indptr'][0]) if n else 0
+    indices = np.empty((n, width), dtype=np.int64)
+    distances = np.empty((n, width))
+    indices[order] = order[graph['indices'].reshape(n, width)]
+    distances[order] = graph['distances'].reshape(n, width)
+    return {**graph, 'indices': indices.reshape(-1), 'distances': distances.reshape(-1)}
+
+
+def knn_graph_path(modality, data_dir="processed_data"):
+    """Path of the stored kNN graph for a modality."""
+    return os.path.join(processed_paths(modality, data_dir)['dir'], f"{modality}_knn_graph.npz")
+
+
+def save_knn_graph(modality, graph, sample_names, data_dir="processed_data", hashes=None):
+    """
+    Write the CSR graph, the sample names it covers and the content hash of each row
+    (snapshots.row_hashes of the matrix, used by update_knn_graph) to <modality>_knn_graph.npz.
+    """
+    path = knn_graph_path(modality, data_dir)
+    graph = {key: value for key, value in graph.items() if key not in ('sample_names', 'row_hashes')}
+    if hashes is None:
+        hashes = row_hashes(load_processed(modality, data_dir)[0])
+    np.savez(path, sample_names=np.asarray(sample_names), row_hashes=np.asarray(hashes), **graph)
+    return path
+
+
+def load_knn_graph(modality, data_dir="processed_data"):
+    """
+    Load a stored kNN graph, or None if the modality has no graph yet.
+    """
+    path = knn_graph_path(modality, data_dir)
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as npz:
+        graph = {key: npz[key] for key in npz.files}
+    graph['k'] = int(graph['k'])
+    graph['sample_names'] = graph['sample_names'].tolist()
+    if 'row_hashes' in graph:  # absent in graphs saved before rows were hashed
+        graph['row_hashes'] = graph['row_hashes'].tolist()
+    return graph
+
+
+def neighbours(graph, row):
+    """Return (neighbour rows, distances) of one sample, nearest first."""
+    start, stop = graph['indptr'][row], graph['indptr'][row + 1]
+    return graph['indices'][start:stop], graph['distances'][start:stop]
+
+
+def update_knn_graph(modality, k=10, data_dir="processed_data", block_size=1024):
+    """
+    Bring the stored graph of a modality up to date with the processed data.
+
+    Rows are matched by sample name and content hash, wherever they now sit in the
+    (sorted) sample list. If every row of the stored graph is still present unchanged,
+    only the new samples are inserted; if a row was removed or its values changed,
+    the graph is rebuilt.
+
+    Returns:
+        dict: The saved graph.
+    """
+    data, sample_names, _ = load_processed(modality, data_dir)
+    hashes = row_hashes(data)
+    graph = load_knn_graph(modality, data_dir)
+    position = {key: i for i, key in enumerate(zip(sample_names, hashes))}
+    old_keys = list(zip(graph['sample_names'], graph.get('row_hashes', []))) if graph is not None else []
+    if graph is not None and graph['k'] == k and 'row_hashes' in graph and all(key in position for key in old_keys):
+        # Put the graph's rows first (in graph order) and the new rows after them,
+        # insert, then map the result back to the current row order
+        old_rows = [position[key] for key in old_keys]
+        known = set(old_rows)
+        order = np.array(old_rows + [i for i in range(len(sample_names)) if i not in known], dtype=np.int64)
+        print(f"{modality.upper()}: inserting {len(order) - len(old_rows)} new samples into kNN graph")
+        graph = insert_samples(graph, data[order], len(old_rows), block_size)
+        graph = permute_graph(graph, order)
+    else:
+        print(f"{modality.upper()}: building kNN graph over {len(sample_names)} samples (k={k})")
+        graph = knn_graph(data, k, block_size)
+    path = save_knn_graph(modality, graph, sample_names, data_dir, hashes)
+    print(f"  Saved {path}")
+    return graph
+
+
+if __name__ == "__main__":
+    import sys
+
+    for modality in sys.argv[1:] or ['tga', 'dsc']:
+        update_knn_graph(modality)
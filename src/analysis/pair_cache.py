@@ -0,0 +1,215 @@
+# Persistent content-addressed cache of per-pair difference statistics
+# A pair's PAIR_STATS depend only on the values of its two rows and on the grid,
+# so they are cached under the content hashes of both rows, in a store per grid
+# (.cache/pair_cache/<grid hash>/, outside processed_data/). Adding one sample to a
+# library of n leaves every old row hash unchanged: the next report reads
+# n*(n-1)/2 pairs from the cache and computes only the n new ones.
+#
+# Records are fixed-size binary (16-byte key + one float64 per stat) in immutable
+# segment files sorted by key. An insert merges the new records with every segment
+# still below SEGMENT_RECORDS, so a store holds full segments plus at most one small
+# one however many reports added to it. Lookups memory-map the segments and binary
+# search them, touching only the pages they hit. Reading a segment refreshes its
+# mtime; when the store outgrows max_bytes the least recently used segments are deleted.
+
+import hashlib
+import json
+import os
+import numpy as np
+
+from src.processing.loading import DEFAULT_CACHE_ROOT
+from .tiled import PAIR_STATS, pair_stats_table
+
+DEFAULT_CACHE_DIR = os.path.join(DEFAULT_CACHE_ROOT, "pair_cache")
+DEFAULT_MAX_BYTES = 1 << 30
+SEGMENT_RECORDS = 1 << 20
+
+# Key: 8-byte hashes of the two rows, smaller first; mean_diff is stored for that order
+RECORD = np.dtype([('key', 'S16'), ('stats', '<f8', (len(PAIR_STATS),))])
+_ANTISYMMETRIC = np.array([stat == 'mean_diff' for stat in PAIR_STATS])
+
+
+def row_digests(data):
+    """8-byte content hash of every row (float64 values), as an 'S8' array."""
+    data = np.asarray(data, dtype=np.float64)
+    return np.array([hashlib.blake2b(np.ascontiguousarray(row).tobytes(), digest_size=8).digest()
+                     for row in data], dtype='S8')
+
+
+def grid_digest(x):
+    """Hash of the grid and the statistics layout, naming the store the pairs live in."""
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    payload = x.tobytes() + json.dumps(list(PAIR_STATS)).encode()
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def pair_keys(digests, idx1, idx2):
+    """
+    Order-independent record keys of pairs, and whether each pair was flipped to build it.
+
+    Returns:
+        tuple: ('S16' keys, bool array True where row idx2 hashes before row idx1).
+    """
+    h1, h2 = digests[np.asarray(idx1)], digests[np.asarray(idx2)]
+    flipped = h2 < h1
+    first = np.where(flipped, h2, h1)
+    second = np.where(flipped, h1, h2)
+    keys = np.empty(len(first), dtype=[('a', 'S8'), ('b', 'S8')])
+    keys['a'], keys['b'] = first, second
+    return keys.view('S16').reshape(-1), flipped
+
+
+class PairStatsCache:
+    """
+    On-disk PAIR_STATS store for one grid.
+
+    Args:
+        x (np.ndarray): Grid of the rows that will be looked up.
+        cache_dir (str): Root directory of all pair stores.
+        max_bytes (int): Size above which least recently used segments are evicted.
+    """
+
+    def __init__(self, x, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.store = os.path.join(cache_dir, grid_digest(x))
+        self.max_bytes = max_bytes
+
+    def _segments(self):
+        if not os.path.isdir(self.store):
+            return []
+        return sorted(os.path.join(self.store, f) for f in os.listdir(self.store) if f.endswith('.bin'))
+
+    def lookup(self, keys):
+        """
+        Find keys in the store.
+
+        Returns:
+            tuple: (found mask, stats of shape (len(keys), len(PAIR_STATS)); rows of
+                   missing keys are NaN).
+        """
+        found = np.zeros(len(keys), dtype=bool)
+        stats = np.full((len(keys), len(PAIR_STATS)), np.nan)
+        for path in self._segments():
+            if found.all():
+                break
+            try:
+                records = np.memmap(path, dtype=RECORD, mode='r')
+            except (FileNotFoundError, ValueError):  # evicted or merged away by another process
+                continue
+            # Segments are written sorted by key
+            pending = np.flatnonzero(~found)
+            pos = np.searchsorted(records['key'], keys[pending])
+            pos = np.minimum(pos, len(records) - 1)
+            hit = records['key'][pos] == keys[pending]
+            if hit.any():
+                found[pending[hit]] = True
+                stats[pending[hit]] = records['stats'][pos[hit]]
+                os.utime(path)  # LRU: segments that serve hits stay young
+        return found, stats
+
+    def insert(self, keys, stats):
+        """
+        Add records to the store (sorted, duplicate keys dropped).
+
+        The records are merged with every existing segment of fewer than SEGMENT_RECORDS
+        records and written out as new segments of up to SEGMENT_RECORDS records; the
+        merged segments are then deleted.
+        """
+        if len(keys) == 0:
+            return
+        records = np.empty(len(keys), dtype=RECORD)
+        records['key'], records['stats'] = keys, stats
+        merged = []
+        for path in self._segments():
+            try:
+                if os.path.getsize(path) >= SEGMENT_RECORDS * RECORD.itemsize:
+                    continue
+                small = np.fromfile(path, dtype=RECORD)
+            except FileNotFoundError:  # merged or evicted by another process
+                continue
+            records = np.concatenate([records, small])
+            merged.append(path)
+        _, first = np.unique(records['key'], return_index=True)
+        records = records[first]
+        os.makedirs(self.store, exist_ok=True)
+        written = set()
+        for start in range(0, len(records), SEGMENT_RECORDS):
+            segment = records[start:start + SEGMENT_RECORDS]
+            name = hashlib.blake2b(segment['key'].tobytes(), digest_size=16).hexdigest()
+            path = os.path.join(self.store, f"{name}.bin")
+            tmp_path = f"{path}.tmp-{os.getpid()}"
+            segment.tofile(tmp_path)
+            os.replace(tmp_path, path)
+            written.add(path)
+        for path in merged:
+            if path not in written:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used segments until the store fits in max_bytes."""
+        sizes = []
+        for path in self._segments():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            sizes.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in sizes)
+        for _, size, path in sorted(sizes)[:-1]:  # never the newest segment
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def size(self):
+        """Bytes currently used by the store."""
+        return sum(os.path.getsize(path) for path in self._segments())
+
+
+def cached_pair_stats(data, idx1, idx2, x, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES,
+                      block_size=1024, verbose=False):
+    """
+    PAIR_STATS for the given pairs, read from the pair cache where possible.
+
+    Pairs whose two rows (by content) were seen before on the same grid are read from
+    the store; the others are computed with pair_stats_table and added to it.
+
+    Args:
+        data (np.ndarray): Matrix of shape (num_samples, num_points).
+        idx1, idx2 (np.ndarray): Row indices of each pair.
+        x (np.ndarray): Grid of the matrix (part of the cache key).
+        cache_dir (str): Root directory of the pair stores.
+        max_bytes (int): Size limit of the store for this grid.
+        block_size (int): Pairs per block when computing misses.
+        verbose (bool): Print how many pairs were cached and computed.
+
+    Returns:
+        dict: One array of len(idx1) per name in PAIR_STATS, as pair_stats_table.
+    """
+    idx1, idx2 = np.asarray(idx1, dtype=np.intp), np.asarray(idx2, dtype=np.intp)
+    cache = PairStatsCache(x, cache_dir, max_bytes)
+    keys, flipped = pair_keys(row_digests(data), idx1, idx2)
+    found, stats = cache.lookup(keys)
+
+    missing = np.flatnonzero(~found)
+    if len(missing):
+        computed = pair_stats_table(data, idx1[missing], idx2[missing], block_size)
+        computed = np.stack([computed[stat] for stat in PAIR_STATS], axis=1)
+        stats[missing] = computed
+        # Store in key order: flip the sign of mean_diff where the pair was reversed
+        stored = computed.copy()
+        stored[np.ix_(flipped[missing], _ANTISYMMETRIC)] *= -1
+        cache.insert(keys[missing], stored)
+
+    hits = np.flatnonzero(found & flipped)
+    stats[np.ix_(hits, _ANTISYMMETRIC)] *= -1
+    if verbose:
+        print(f"Pair statistics: {int(found.sum())} cached, {len(missing)} computed")
+    return {stat: stats[:, s] for s, stat in enumerate(PAIR_STATS)}
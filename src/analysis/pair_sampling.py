@@ -0,0 +1,219 @@
+# Approximate all-pairs difference summaries from a stratified pair sample
+# The overview page of the pairwise summary (mean and spread of y1 - y2 and |y1 - y2|
+# at every temperature) averages over all n*(n-1)/2 pairs. Here pairs are grouped
+# into strata by the material prefix of both samples (HDPE-/HDPE-, HDPE-/LDPE-, ...),
+# a random sample is drawn from every stratum in proportion to its size, and the
+# stratified means come with per-point confidence intervals. The sample grows
+# until the requested accuracy is reached. Pairs are addressed by their position
+# inside a stratum, so the full pair list is never built.
+#
+# The global difference range needs no sampling: the extremes of y_i - y_j over
+# i < j follow exactly from a running max/min down every column.
+
+from statistics import NormalDist
+import numpy as np
+
+from .pairs import iter_pair_blocks
+
+SUMMARY_CURVES = ('mean_diff', 'std_diff', 'mean_abs_diff', 'std_abs_diff')
+
+
+def material_prefix(sample_name):
+    """Material prefix of a sample name ('HDPE-12' -> 'HDPE'); '' if it has none."""
+    return sample_name.split('-', 1)[0] if '-' in sample_name else ''
+
+
+def diff_range(data):
+    """
+    Exact range of y_i - y_j over all pairs i < j and all points, in O(n * num_points).
+
+    Returns:
+        tuple: (diff_min, diff_max, abs_diff_max).
+    """
+    data = np.asarray(data, dtype=np.float64)
+    if data.shape[0] < 2:
+        return 0.0, 0.0, 0.0
+    # For each j, the largest / smallest y_i - y_j uses the running max / min of rows i < j
+    diff_max = float((np.maximum.accumulate(data[:-1], axis=0) - data[1:]).max())
+    diff_min = float((np.minimum.accumulate(data[:-1], axis=0) - data[1:]).min())
+    return diff_min, diff_max, max(diff_max, -diff_min)
+
+
+def _triu_pair(positions, n):
+    """(a, b) with a < b for positions in the row-major upper triangle of an n x n table."""
+    positions = np.asarray(positions, dtype=np.int64)
+    total = n * (n - 1) // 2
+    # Count pairs from the end: the row is found from the triangle number of the remainder
+    rest = total - 1 - positions
+    k = ((np.sqrt(8.0 * rest + 1.0) - 1.0) // 2).astype(np.int64)
+    k -= (k * (k + 1) // 2) > rest
+    k += ((k + 1) * (k + 2) // 2) <= rest
+    a = n - 2 - k
+    b = positions - (a * n - a * (a + 1) // 2) + a + 1
+    return a, b
+
+
+class _Stratum:
+    """All pairs between two groups of samples (or within one group), by position."""
+
+    def __init__(self, label, group_a, group_b=None):
+        self.label = label
+        self.group_a = np.sort(group_a)
+        self.group_b = None if group_b is None else np.sort(group_b)
+        if self.group_b is None:
+            self.size = len(self.group_a) * (len(self.group_a) - 1) // 2
+        else:
+            self.size = len(self.group_a) * len(self.group_b)
+
+    def pairs(self, positions):
+        """Sample index pairs (i, j), i < j, at the given positions."""
+        positions = np.asarray(positions, dtype=np.int64)
+        if self.group_b is None:
+            a, b = _triu_pair(positions, len(self.group_a))
+            return self.group_a[a], self.group_a[b]
+        i = self.group_a[positions // len(self.group_b)]
+        j = self.group_b[positions % len(self.group_b)]
+        return np.minimum(i, j), np.maximum(i, j)
+
+
+def pair_strata(sample_names, labels=None):
+    """
+    Split all pairs i < j into strata by the labels of both samples.
+
+    Args:
+        sample_names (list): Sample names.
+        labels (array-like, optional): Stratum label per sample (e.g. cluster labels);
+                                       defaults to the material prefix of each name.
+
+    Returns:
+        list of _Stratum: Non-empty strata, labelled 'A/B'.
+    """
+    labels = np.asarray([material_prefix(s) for s in sample_names] if labels is None else labels).astype(str)
+    groups = {label: np.flatnonzero(labels == label) for label in np.unique(labels)}
+    keys = sorted(groups)
+    strata = []
+    for p, key_a in enumerate(keys):
+        for key_b in keys[p:]:
+            if key_a == key_b:
+                stratum = _Stratum(f"{key_a}/{key_a}", groups[key_a])
+            else:
+                stratum = _Stratum(f"{key_a}/{key_b}", groups[key_a], groups[key_b])
+            if stratum.size:
+                strata.append(stratum)
+    return strata
+
+
+def _stratum_sums(data, stratum, positions, block_size):
+    """Per-point sums of d, d^2 and |d| over the pairs of a stratum at positions."""
+    num_points = data.shape[1]
+    sums = {'diff': np.zeros(num_points), 'sq': np.zeros(num_points), 'abs': np.zeros(num_points)}
+    idx1, idx2 = stratum.pairs(positions)
+    for _, block1, block2 in iter_pair_blocks(idx1, idx2, block_size):
+        diff = data[block1] - data[block2]
+        sums['diff'] += diff.sum(axis=0)
+        sums['sq'] += np.einsum('ij,ij->j', diff, diff)
+        sums['abs'] += np.abs(diff).sum(axis=0)
+    return sums
+
+
+def _allocate(strata, num_pairs, min_per_stratum):
+    """Proportional allocation of num_pairs over strata, at least min_per_stratum each."""
+    total = sum(s.size for s in strata)
+    return [int(min(s.size, max(min_per_stratum, round(num_pairs * s.size / total)))) for s in strata]
+
+
+def _estimate(data, strata, sizes, z, rng, block_size):
+    """Stratified estimates of the summary curves and the half-widths of their intervals."""
+    total = sum(s.size for s in strata)
+    num_points = data.shape[1]
+    est = {'diff': np.zeros(num_points), 'sq': np.zeros(num_points), 'abs': np.zeros(num_points)}
+    var_diff = np.zeros(num_points)
+    var_abs = np.zeros(num_points)
+    for stratum, n_h in zip(strata, sizes):
+        if n_h == stratum.size:
+            positions = np.arange(stratum.size)
+        else:
+            positions = np.sort(rng.choice(stratum.size, size=n_h, replace=False))
+        sums = _stratum_sums(data, stratum, positions, block_size)
+        weight = stratum.size / total
+        means = {name: value / n_h for name, value in sums.items()}
+        for name in est:
+            est[name] += weight * means[name]
+        if n_h < stratum.size and n_h > 1:
+            # Sample variance of the stratum, with the finite population correction
+            factor = weight ** 2 * (1.0 - n_h / stratum.size) / n_h / (n_h - 1)
+            var_diff += factor * np.maximum(sums['sq'] - n_h * means['diff'] ** 2, 0.0)
+            var_abs += factor * np.maximum(sums['sq'] - n_h * means['abs'] ** 2, 0.0)
+    return {
+        'mean_diff': est['diff'],
+        'std_diff': np.sqrt(np.maximum(est['sq'] - est['diff'] ** 2, 0.0)),
+        'mean_abs_diff': est['abs'],
+        'std_abs_diff': np.sqrt(np.maximum(est['sq'] - est['abs'] ** 2, 0.0)),
+        'mean_diff_ci': z * np.sqrt(var_diff),
+        'mean_abs_diff_ci': z * np.sqrt(var_abs),
+    }
+
+
+def pairwise_summary(data, sample_names, exact=False, rel_error=0.02, confidence=0.95, labels=None,
+                     initial_pairs=2000, max_pairs=None, min_per_stratum=30, seed=0, block_size=512):
+    """
+    Mean/std curves of y1 - y2 and |y1 - y2| over all pairs i < j, exact or sampled.
+
+    In approximate mode a stratified random sample of pairs is drawn (proportional
+    allocation over the strata of pair_strata) and enlarged until the confidence
+    interval of the mean absolute difference curve is within rel_error of its peak
+    at every point, or max_pairs is reached. Strata smaller than their allocation
+    are taken whole. The global range always comes exactly from diff_range.
+
+    Args:
+        data (np.ndarray): Interpolated matrix (num_samples, num_points).
+        sample_names (list): Sample names (used for material-prefix strata).
+        exact (bool): Visit every pair (intervals are then zero).
+        rel_error (float): Target CI half-width relative to max(mean_abs_diff).
+        confidence (float): Confidence level of the intervals.
+        labels (array-like, optional): Stratum label per sample instead of the prefix.
+        initial_pairs (int): Size of the first (pilot) sample.
+        max_pairs (int, optional): Upper limit on the number of sampled pairs.
+        min_per_stratum (int): Smallest sample drawn from any stratum.
+        seed (int): Seed of the pair sample.
+        block_size (int): Pairs differenced at once.
+
+    Returns:
+        dict: One curve per name in SUMMARY_CURVES, 'mean_diff_ci' and 'mean_abs_diff_ci'
+              (CI half-widths per point), 'diff_min', 'diff_max', 'abs_diff_max',
+              'num_pairs', 'num_sampled', 'strata' (label -> (pairs, sampled)),
+              'confidence', 'rel_error' (achieved) and 'exact'.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    strata = pair_strata(sample_names, labels)
+    total = sum(s.size for s in strata)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2.0)
+    rng = np.random.default_rng(seed)
+    max_pairs = total if max_pairs is None else min(int(max_pairs), total)
+
+    num_pairs = total if exact else min(initial_pairs, max_pairs)
+    while True:
+        sizes = [s.size for s in strata] if num_pairs >= total else _allocate(strata, num_pairs, min_per_stratum)
+        summary = _estimate(data, strata, sizes, z, rng, block_size)
+        peak = summary['mean_abs_diff'].max() if total else 0.0
+        achieved = float(summary['mean_abs_diff_ci'].max() / peak) if peak > 0 else 0.0
+        # Stop on the requested size, not the rounded allocation, which can stay below it
+        if achieved <= rel_error or num_pairs >= max_pairs:
+            break
+        # The half-width shrinks as 1/sqrt(n); aim a little past the target
+        grown = int(np.ceil(1.2 * sum(sizes) * (achieved / rel_error) ** 2))
+        num_pairs = min(max_pairs, max(grown, num_pairs + 1))
+
+    diff_min, diff_max, abs_diff_max = diff_range(data)
+    summary.update({
+        'diff_min': diff_min,
+        'diff_max': diff_max,
+        'abs_diff_max': abs_diff_max,
+        'num_pairs': total,
+        'num_sampled': int(sum(sizes)),
+        'strata': {s.label: (s.size, n_h) for s, n_h in zip(strata, sizes)},
+        'confidence': confidence,
+        'rel_error': achieved,
+        'exact': sum(sizes) == total,
+    })
+    return summary
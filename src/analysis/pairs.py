@@ -0,0 +1,75 @@
+# Pair enumeration helpers shared by the pairwise analysis stages
+
+import numpy as np
+
+
+def pair_indices(num_samples, pairs=None):
+    """
+    Return the sample pairs to analyse as two index arrays.
+
+    Args:
+        num_samples (int): Number of rows in the interpolated matrix.
+        pairs (array-like, optional): Explicit (idx1, idx2) pairs of shape (m, 2).
+                                      Defaults to all pairs idx1 < idx2, in the same
+                                      order as itertools.combinations.
+
+    Returns:
+        tuple: (idx1, idx2) 1D integer arrays of equal length.
+    """
+    if pairs is None:
+        return np.triu_indices(num_samples, k=1)
+    pairs = np.asarray(pairs, dtype=np.intp).reshape(-1, 2)
+    if pairs.size and (pairs.min() < 0 or pairs.max() >= num_samples):
+        raise ValueError(f"Pair indices must be in [0, {num_samples})")
+    return pairs[:, 0], pairs[:, 1]
+
+
+def iter_pair_blocks(idx1, idx2, block_size=256):
+    """
+    Yield (start, idx1_block, idx2_block) slices of a pair list.
+
+    Args:
+        idx1, idx2 (np.ndarray): Pair index arrays from pair_indices.
+        block_size (int): Number of pairs per block.
+    """
+    for start in range(0, len(idx1), block_size):
+        stop = start + block_size
+        yield start, idx1[start:stop], idx2[start:stop]
+
+
+def pair_row_blocks(rows, block_size=65536):
+    """
+    Group (i, partners) rows into blocks of pairs without building the full pair list.
+
+    Args:
+        rows (iterable): (i, partners) with one sample index and an array of the
+                         indices it is paired with, in the order pairs should come.
+        block_size (int): Pairs per block (a block ends after the row that fills it).
+
+    Yields:
+        np.ndarray: (m, 2) integer arrays of pairs, each ordered (smaller, larger).
+    """
+    firsts, seconds, size = [], [], 0
+    for i, partners in rows:
+        partners = np.asarray(partners, dtype=np.intp)
+        if not len(partners):
+            continue
+        firsts.append(np.full(len(partners), i, dtype=np.intp))
+        seconds.append(partners)
+        size += len(partners)
+        if size >= block_size:
+            yield _stack_pairs(firsts, seconds)
+            firsts, seconds, size = [], [], 0
+    if size:
+        yield _stack_pairs(firsts, seconds)
+
+
+def _stack_pairs(firsts, seconds):
+    i, j = np.concatenate(firsts), np.concatenate(seconds)
+    return np.stack([np.minimum(i, j), np.maximum(i, j)], axis=1)
+
+
+def iter_all_pairs(num_samples, block_size=65536):
+    """Yield all pairs i < j in itertools.combinations order, as (m, 2) blocks."""
+    rows = ((i, np.arange(i + 1, num_samples)) for i in range(num_samples - 1))
+    return pair_row_blocks(rows, block_size)
@@ -0,0 +1,319 @@
+# Local HTTP query service over the processed library
+# The TGA/DSC matrices, name lookups, kNN graphs and clusters are loaded once and kept
+# warm; results are cached in an LRU cache and everything is reloaded when one of
+# the files the service reads changes (caches and tiles elsewhere under
+# processed_data/ are not watched).
+#
+#   python -m src.analysis.query_service --port 8765
+#
+#   GET  /samples?modality=tga
+#   GET  /curve?modality=tga&sample=HDPE-PCR-15
+#   GET  /pair?modality=tga&a=HDPE-PCR-15&b=LDPE-EXP1
+#   GET  /neighbours?modality=tga&sample=HDPE-PCR-15&k=5
+#   GET  /cluster?modality=tga&sample=HDPE-PCR-15
+#   POST /batch   {"requests": [{"op": "curve", "modality": "tga", "sample": "..."}, ...]}
+
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+from src.processing.loading import DEFAULT_DATA_DIR, load_processed, processed_paths, x_grid
+from src.processing.snapshots import row_hashes, snapshot_dir
+from .clustering import cluster_paths, load_clusters
+from .knn_graph import knn_graph_path, load_knn_graph, neighbours
+from .tiled import pair_stats_tile
+
+MODALITIES = ('tga', 'dsc')
+
+# Parameters accepted by each op
+OPS = {
+    'samples': ('modality',),
+    'curve': ('modality', 'sample'),
+    'pair': ('modality', 'a', 'b'),
+    'neighbours': ('modality', 'sample', 'k'),
+    'cluster': ('modality', 'sample'),
+}
+
+
+def _watched_files(data_dir, modalities=MODALITIES):
+    """Files load_library reads: the core modality files, snapshot CURRENT, graphs and clusters."""
+    paths = []
+    for modality in modalities:
+        core = processed_paths(modality, data_dir)
+        paths.extend(core[key] for key in ('data', 'metadata', 'names'))
+        paths.append(os.path.join(snapshot_dir(modality, data_dir), "CURRENT"))
+        paths.append(knn_graph_path(modality, data_dir))
+        paths.append(cluster_paths(modality, data_dir)['clusters'])
+    return paths
+
+
+def _library_mtimes(data_dir, modalities=MODALITIES):
+    """Modification times of the watched files (None if missing), used to detect changes."""
+    mtimes = {}
+    for path in _watched_files(data_dir, modalities):
+        try:
+            mtimes[path] = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            mtimes[path] = None
+    return mtimes
+
+
+def load_library(data_dir=DEFAULT_DATA_DIR, modalities=MODALITIES):
+    """
+    Load every available modality with the indexes the service needs.
+
+    Returns:
+        dict: modality -> {'data', 'names', 'rows', 'x', 'norms', 'graph', 'clusters'}
+    """
+    library = {}
+    for modality in modalities:
+        try:
+            data, names, metadata = load_processed(modality, data_dir)
+        except FileNotFoundError:
+            continue
+        data = np.asarray(data, dtype=np.float64)
+        graph = load_knn_graph(modality, data_dir)
+        if graph is not None:
+            graph_names, graph_hashes = graph.pop('sample_names'), graph.pop('row_hashes', None)
+            if graph_names != names or (graph_hashes is not None and graph_hashes != row_hashes(data)):
+                graph = None  # stale graph for a different sample list or changed rows
+        clusters = load_clusters(modality, data_dir)
+        if clusters is not None and clusters['sample_names'] != names:
+            clusters = None
+        library[modality] = {
+            'data': data,
+            'names': names,
+            'rows': {name: i for i, name in enumerate(names)},
+            'x': x_grid(metadata, data.shape[1]) if 'x_range' in metadata else np.arange(data.shape[1], dtype=float),
+            # NaN for rows with failed points, which are then never returned as neighbours
+            'norms': np.einsum('ij,ij->i', data, data),
+            'graph': graph,
+            'clusters': clusters,
+        }
+    return library
+
+
+class QueryLibrary:
+    """
+    Warm, thread-safe view of the processed library with an LRU result cache.
+    """
+
+    def __init__(self, data_dir=DEFAULT_DATA_DIR, cache_size=4096):
+        self.data_dir = data_dir
+        self._lock = threading.Lock()
+        self._library = load_library(data_dir)
+        # Part of every cache key: a request still running on the old library after a
+        # reload caches its result under the old generation, which is never asked for again
+        self._generation = 0
+        self._mtimes = _library_mtimes(data_dir)
+        self._cached = lru_cache(maxsize=cache_size)(self._compute)
+
+    def reload_if_changed(self):
+        """Reload everything and clear the cache if any watched file changed."""
+        mtimes = _library_mtimes(self.data_dir)
+        if mtimes == self._mtimes:
+            return False
+        library = load_library(self.data_dir)
+        with self._lock:
+            self._library = library
+            self._generation += 1
+            self._mtimes = mtimes
+            self._cached.cache_clear()
+        print(f"Reloaded processed library from {self.data_dir}")
+        return True
+
+    def watch(self, interval=2.0):
+        """Start a daemon thread that polls processed_data/ for changes."""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reload_if_changed()
+                except Exception as e:  # keep serving the old library
+                    print(f"Warning: reload failed: {e}")
+
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+        return thread
+
+    def query(self, op, **params):
+        """Answer one request; params must be strings or ints from OPS[op]."""
+        if op not in OPS:
+            raise ValueError(f"Unknown op {op!r}; expected one of {tuple(OPS)}")
+        for name, value in params.items():
+            if name not in OPS[op]:
+                raise ValueError(f"Unknown parameter {name!r} for {op}; expected {OPS[op]}")
+            if not isinstance(value, (str, int)):
+                raise ValueError(f"Parameter {name!r} must be a string or an integer")
+        with self._lock:
+            generation = self._generation
+        return self._cached(generation, op, tuple(sorted(params.items())))
+
+    def batch(self, requests):
+        """Answer a list of {'op': ..., **params} requests, one result or error per entry."""
+        results = []
+        for request in requests:
+            try:
+                request = dict(request)
+                results.append({'result': self.query(request.pop('op'), **request)})
+            except (KeyError, ValueError, TypeError) as e:
+                results.append({'error': _error_message(e)})
+        return results
+
+    def _entry(self, modality):
+        with self._lock:
+            library = self._library
+        if modality not in library:
+            raise ValueError(f"Modality {modality!r} is not loaded")
+        return library[modality]
+
+    def _row(self, entry, sample):
+        if sample not in entry['rows']:
+            raise KeyError(f"Unknown sample {sample!r}")
+        return entry['rows'][sample]
+
+    def _compute(self, generation, op, params):
+        # generation only keys the cache; the library is read after it was taken, so a
+        # reload in between at worst answers from the newer library under a dead key
+        params = dict(params)
+        entry = self._entry(params.get('modality', 'tga'))
+
+        if op == 'samples':
+            return entry['names']
+
+        if op == 'curve':
+            row = self._row(entry, params['sample'])
+            return {'x': entry['x'].tolist(), 'y': _json_floats(entry['data'][row])}
+
+        if op == 'pair':
+            a, b = self._row(entry, params['a']), self._row(entry, params['b'])
+            stats = pair_stats_tile(entry['data'][a:a + 1], entry['data'][b:b + 1])
+            return {name: _json_float(value[0, 0]) for name, value in stats.items()}
+
+        if op == 'neighbours':
+            row = self._row(entry, params['sample'])
+            try:
+                k = int(params.get('k', 10))
+            except ValueError:
+                raise ValueError(f"k must be an integer, got {params['k']!r}") from None
+            if k < 1:
+                raise ValueError(f"k must be at least 1, got {k}")
+            k = min(k, len(entry['names']) - 1)
+            graph = entry['graph']
+            if graph is not None and k <= graph['indptr'][1] - graph['indptr'][0]:
+                idx, dist = neighbours(graph, row)
+                idx, dist = idx[:k], dist[:k]
+            else:
+                # Brute force against the warm matrix using the cached row norms;
+                # rows with NaN points are skipped, as in knn_graph
+                data = entry['data']
+                sq = entry['norms'] + entry['norms'][row] - 2.0 * (data @ data[row])
+                sq[np.isnan(sq)] = np.inf
+                sq[row] = np.inf
+                idx = np.argsort(sq)[:k]
+                dist = np.sqrt(np.maximum(sq[idx], 0.0))
+            keep = np.isfinite(dist)  # fewer than k samples without NaN points
+            idx, dist = idx[keep], dist[keep]
+            return [{'sample': entry['names'][i], 'distance': _json_float(d)} for i, d in zip(idx, dist)]
+
+        if op == 'cluster':
+            clusters = entry['clusters']
+            if clusters is None:
+                raise ValueError("No clustering saved for this modality")
+            row = self._row(entry, params['sample'])
+            label = int(clusters['labels'][row])
+            members = [entry['names'][i] for i in clusters['leaf_order'] if clusters['labels'][i] == label]
+            return {'cluster': label, 'members': members}
+
+        raise ValueError(f"Unknown op {op!r}")
+
+
+def _error_message(error):
+    # str(KeyError) adds quotes around the message
+    return str(error.args[0]) if error.args else str(error)
+
+
+def _json_float(value):
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+def _json_floats(values):
+    return [_json_float(v) for v in values]
+
+
+def make_handler(library):
+    """Build a request handler class bound to a QueryLibrary."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            op = url.path.strip('/')
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            try:
+                self._send(200, library.query(op, **params))
+            except KeyError as e:
+                self._send(404, {'error': _error_message(e)})
+            except (ValueError, TypeError) as e:  # TypeError: e.g. ?op=... clashing with op
+                self._send(400, {'error': str(e)})
+
+        def do_POST(self):
+            if urlparse(self.path).path.strip('/') != 'batch':
+                self._send(404, {'error': 'POST is only supported on /batch'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                self._send(200, library.batch(payload.get('requests', [])))
+            except (ValueError, AttributeError, TypeError) as e:
+                self._send(400, {'error': str(e)})
+
+        def log_message(self, format, *args):
+            pass  # keep the console quiet under dashboard load
+
+    return Handler
+
+
+def serve(data_dir=DEFAULT_DATA_DIR, host='127.0.0.1', port=8765, watch_interval=2.0, cache_size=4096):
+    """
+    Load the library once and serve queries until interrupted.
+    """
+    library = QueryLibrary(data_dir, cache_size=cache_size)
+    if watch_interval:
+        library.watch(watch_interval)
+    server = ThreadingHTTPServer((host, port), make_handler(library))
+    loaded = ", ".join(f"{m.upper()} ({len(e['names'])} samples)" for m, e in library._library.items())
+    print(f"Serving {loaded} on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query service over processed_data/.")
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--watch-interval', type=float, default=2.0)
+    parser.add_argument('--cache-size', type=int, default=4096)
+    args = parser.parse_args()
+    serve(args.data_dir, args.host, args.port, args.watch_interval, args.cache_size)
@@ -0,0 +1,155 @@
+# Process pool over a matrix placed once in shared memory
+# The interpolated matrix is copied into multiprocessing.shared_memory (or memory-
+# mapped from its .npy file) a single time; workers attach to it in their
+# initializer and only receive (start, stop) index ranges. Results are written
+# straight into a shared output buffer, so nothing large is pickled per task.
+
+import os
+from functools import partial
+import numpy as np
+from multiprocessing import shared_memory
+
+
+def _attach_shm(name):
+    """Attach to an existing segment created by share_array."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        # Pool workers share the parent's resource tracker, which already owns the
+        # segment, so attaching here does not register a second owner
+        return shared_memory.SharedMemory(name=name)
+
+
+def share_array(array):
+    """
+    Copy an array into a new shared memory segment.
+
+    Returns:
+        tuple: (shm, spec) where shm must be kept alive (and unlinked when done) by the
+               caller and spec is a small picklable description for attach_array.
+    """
+    array = np.ascontiguousarray(array)
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    return shm, {'kind': 'shm', 'name': shm.name, 'shape': array.shape, 'dtype': array.dtype.str}
+
+
+def attach_array(spec):
+    """
+    Open an array described by a spec from share_array, or a {'kind': 'npy', 'path': ...}
+    spec for a memory-mapped .npy file.
+
+    Returns:
+        tuple: (array, handle) where handle keeps the shared segment open (None for .npy).
+    """
+    if spec['kind'] == 'npy':
+        return np.load(spec['path'], mmap_mode=spec.get('mode', 'r')), None
+    shm = _attach_shm(spec['name'])
+    return np.ndarray(spec['shape'], dtype=np.dtype(spec['dtype']), buffer=shm.buf), shm
+
+
+# Per-process state set up by the pool initializer
+_WORKER = {}
+
+
+def _init_worker(data_spec, out_spec):
+    _WORKER['data'], _WORKER['data_handle'] = attach_array(data_spec)
+    _WORKER['out'], _WORKER['out_handle'] = attach_array(out_spec)
+
+
+def _run_range(task):
+    func, start, stop = task
+    func(_WORKER['data'], _WORKER['out'], start, stop)
+    return stop - start
+
+
+def parallel_ranges(func, data, num_items, out_shape, out_dtype=np.float64, chunk_size=64, workers=None):
+    """
+    Run func over [0, num_items) in chunks on a process pool with shared input/output.
+
+    func is called as func(data, out, start, stop) and must write its results into
+    out; it has to be a module-level function so workers can import it.
+
+    Args:
+        func (callable): Worker function as described above.
+        data (np.ndarray or str): Input matrix, or the path of a .npy file that workers
+                                  memory-map instead of copying to shared memory.
+        num_items (int): Number of work items (e.g. rows).
+        out_shape (tuple): Shape of the shared output buffer.
+        out_dtype: dtype of the output buffer.
+        chunk_size (int): Items per task.
+        workers (int, optional): Worker processes; 0 runs in this process.
+                                 Defaults to os.cpu_count().
+
+    Returns:
+        np.ndarray: A private copy of the output buffer.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    ranges = [(start, min(start + chunk_size, num_items)) for start in range(0, num_items, chunk_size)]
+
+    if workers == 0 or len(ranges) <= 1:
+        local = np.load(data, mmap_mode='r') if isinstance(data, str) else data
+        out = np.zeros(out_shape, dtype=out_dtype)
+        for start, stop in ranges:
+            func(local, out, start, stop)
+        return out
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    handles = []
+    try:
+        if isinstance(data, str):
+            data_spec = {'kind': 'npy', 'path': os.path.abspath(data)}
+        else:
+            data_shm, data_spec = share_array(data)
+            handles.append(data_shm)
+        out_shm, out_spec = share_array(np.zeros(out_shape, dtype=out_dtype))
+        handles.append(out_shm)
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(data_spec, out_spec)) as pool:
+            for _ in pool.map(_run_range, [(func, start, stop) for start, stop in ranges]):
+                pass
+        return np.ndarray(out_shape, dtype=out_dtype, buffer=out_shm.buf).copy()
+    finally:
+        for shm in handles:
+            shm.close()
+            shm.unlink()
+
+
+def _pairwise_rows(data, out, start, stop, stat):
+    from .tiled import pair_stats_tile
+
+    # Upper triangle only: rows start..stop against columns start..n; mirrored afterwards
+    out[start:stop, start:] = pair_stats_tile(data[start:stop], data[start:], stats=(stat,))[stat]
+
+
+SYMMETRIC_STATS = ('mean_abs_diff', 'max_abs_diff', 'rms_diff')
+
+
+def parallel_pairwise(data, stat='mean_abs_diff', chunk_size=32, workers=None):
+    """
+    Full (n, n) matrix of a symmetric pairwise difference statistic, computed in
+    parallel with the matrix shared across workers.
+
+    Only the requested statistic is computed, over the upper triangle; the lower
+    triangle is filled by symmetry.
+
+    Args:
+        data (np.ndarray or str): Interpolated matrix or path to its .npy file.
+        stat (str): 'mean_abs_diff', 'max_abs_diff' or 'rms_diff'.
+        chunk_size (int): Rows per task.
+        workers (int, optional): Worker processes (see parallel_ranges).
+
+    Returns:
+        np.ndarray: (n, n) matrix of the statistic.
+    """
+    if stat not in SYMMETRIC_STATS:
+        raise ValueError(f"stat must be one of {SYMMETRIC_STATS}")
+    num_samples = (np.load(data, mmap_mode='r') if isinstance(data, str) else data).shape[0]
+    out = parallel_ranges(partial(_pairwise_rows, stat=stat), data, num_samples, (num_samples, num_samples),
+                          chunk_size=chunk_size, workers=workers)
+    lower = np.tril_indices(num_samples, -1)
+    out[lower] = out.T[lower]
+    return out
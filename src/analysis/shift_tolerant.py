@@ -0,0 +1,229 @@
+# Shift-tolerant distances for thermal curves
+# Curves of the same material shifted by a few degrees (e.g. different heating
+# rates) look far apart under y1 - y2. This module provides banded DTW (Sakoe-Chiba
+# window), LB_Keogh lower bounds for pruning nearest-neighbour search, and
+# cross-correlation lag alignment, all vectorized over many pairs at once.
+
+import numpy as np
+
+from .pairs import pair_indices, iter_pair_blocks
+
+SHIFT_MODES = ('dtw', 'lag')
+
+
+def dtw_banded(a, b, radius):
+    """
+    DTW distance between a[p] and b[p] for every pair p, restricted to |i - j| <= radius.
+
+    The band is stored as (pairs, 2 * radius + 1) and each row of the DP is solved in
+    one shot: moves from the row above are a plain minimum, and the left-to-right
+    dependency within the row is a prefix minimum,
+        D[d] = S[d] + cummin_m<=d (V[m] - S[m-1]),
+    where S is the running sum of the row's costs and V the best predecessor above.
+    Only the previous row is kept, so memory is O(pairs * radius).
+
+    Args:
+        a, b (np.ndarray): Arrays of shape (num_pairs, num_points).
+        radius (int): Sakoe-Chiba window half-width in grid points.
+
+    Returns:
+        np.ndarray: DTW distances (sqrt of the summed squared differences), shape (num_pairs,).
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    num_pairs, n = a.shape
+    radius = int(max(0, min(radius, n - 1)))
+    width = 2 * radius + 1
+    offsets = np.arange(width) - radius  # j - i for each band column
+    b_padded = np.pad(b, ((0, 0), (radius, radius)))
+
+    prev = np.full((num_pairs, width), np.inf)
+    for i in range(n):
+        j = i + offsets
+        valid = (j >= 0) & (j < n)
+        cost = (a[:, i:i + 1] - b_padded[:, i:i + width]) ** 2
+        cost[:, ~valid] = 0.0
+
+        if i == 0:
+            above = np.full((num_pairs, width), np.inf)
+            above[:, radius] = 0.0  # path starts at (0, 0)
+        else:
+            shifted = np.full_like(prev, np.inf)
+            shifted[:, :-1] = prev[:, 1:]  # (i-1, j) sits one band column to the right
+            above = np.minimum(prev, shifted)
+        above[:, ~valid] = np.inf
+
+        running = np.cumsum(cost, axis=1)
+        before = np.zeros_like(running)
+        before[:, 1:] = running[:, :-1]
+        prev = running + np.minimum.accumulate(above - before, axis=1)
+        prev[:, ~valid] = np.inf
+    return np.sqrt(prev[:, radius])
+
+
+def keogh_envelope(data, radius):
+    """
+    Upper and lower LB_Keogh envelopes of each row: running max/min over +-radius points.
+
+    Returns:
+        tuple: (upper, lower), each with the same shape as data.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    windows_hi = np.pad(data, ((0, 0), (radius, radius)), mode='constant', constant_values=-np.inf)
+    windows_lo = np.pad(data, ((0, 0), (radius, radius)), mode='constant', constant_values=np.inf)
+    view_hi = np.lib.stride_tricks.sliding_window_view(windows_hi, 2 * radius + 1, axis=1)
+    view_lo = np.lib.stride_tricks.sliding_window_view(windows_lo, 2 * radius + 1, axis=1)
+    return view_hi.max(axis=2), view_lo.min(axis=2)
+
+
+def lb_keogh(queries, upper, lower, block_size=64):
+    """
+    LB_Keogh lower bounds of the banded DTW distance between every query and candidate.
+
+    Args:
+        queries (np.ndarray): Shape (num_queries, num_points).
+        upper, lower (np.ndarray): Candidate envelopes from keogh_envelope.
+        block_size (int): Queries per block.
+
+    Returns:
+        np.ndarray: Shape (num_queries, num_candidates).
+    """
+    queries = np.asarray(queries, dtype=np.float64)
+    bounds = np.empty((queries.shape[0], upper.shape[0]))
+    for q0 in range(0, queries.shape[0], block_size):
+        q = queries[q0:q0 + block_size, None, :]
+        excess = np.maximum(q - upper[None], 0.0) + np.maximum(lower[None] - q, 0.0)
+        bounds[q0:q0 + block_size] = np.sqrt(np.einsum('qcn,qcn->qc', excess, excess))
+    return bounds
+
+
+def lag_distance(a, b, max_lag):
+    """
+    Best shift of b against a for every pair, by minimum RMS difference over the overlap.
+
+    Args:
+        a, b (np.ndarray): Arrays of shape (num_pairs, num_points).
+        max_lag (int): Largest shift to try, in grid points.
+
+    Returns:
+        tuple: (distances, lags) where lags are in grid points; a positive lag means b
+               is delayed (shifted to higher x) relative to a.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    n = a.shape[1]
+    max_lag = int(max(0, min(max_lag, n - 2)))
+    best = np.full(a.shape[0], np.inf)
+    best_lag = np.zeros(a.shape[0], dtype=np.intp)
+    for lag in range(-max_lag, max_lag + 1):
+        if lag >= 0:
+            diff = a[:, :n - lag] - b[:, lag:]
+        else:
+            diff = a[:, -lag:] - b[:, :n + lag]
+        rms = np.sqrt(np.mean(diff ** 2, axis=1))
+        better = rms < best
+        best[better] = rms[better]
+        best_lag[better] = lag
+    return best, best_lag
+
+
+def shift_tolerant_pairwise(data, pairs=None, mode='dtw', radius=30, block_size=256):
+    """
+    Shift-tolerant distance for all pairs (or a subset), processed in blocks of pairs.
+
+    Args:
+        data (np.ndarray): Interpolated matrix of shape (num_samples, num_points).
+        pairs (array-like, optional): (idx1, idx2) pairs; defaults to all pairs.
+        mode (str): 'dtw' (banded DTW) or 'lag' (RMS after the best shift).
+        radius (int): DTW band / maximum lag in grid points. Divide a tolerance in °C
+                      by the grid spacing to convert it.
+        block_size (int): Pairs per block.
+
+    Returns:
+        tuple: (idx1, idx2, distances, lags) where lags is None for 'dtw'.
+    """
+    if mode not in SHIFT_MODES:
+        raise ValueError(f"mode must be one of {SHIFT_MODES}")
+    data = np.asarray(data, dtype=np.float64)
+    idx1, idx2 = pair_indices(data.shape[0], pairs)
+    distances = np.empty(len(idx1))
+    lags = np.empty(len(idx1), dtype=np.intp) if mode == 'lag' else None
+    for start, block1, block2 in iter_pair_blocks(idx1, idx2, block_size):
+        stop = start + len(block1)
+        if mode == 'dtw':
+            distances[start:stop] = dtw_banded(data[block1], data[block2], radius)
+        else:
+            distances[start:stop], lags[start:stop] = lag_distance(data[block1], data[block2], radius)
+    return idx1, idx2, distances, lags
+
+
+def dtw_nearest(queries, data, k=10, radius=30, batch_size=64, exclude=None):
+    """
+    k nearest rows of data to each query under banded DTW, pruned with LB_Keogh.
+
+    Candidates are visited in order of their lower bound and DTW is computed for a
+    batch at a time; the search for a query stops as soon as the next candidate's
+    lower bound exceeds the current k-th best DTW distance.
+
+    Args:
+        queries (np.ndarray): Shape (num_queries, num_points).
+        data (np.ndarray): Candidate matrix of shape (num_samples, num_points).
+        k (int): Neighbours per query.
+        radius (int): Sakoe-Chiba window half-width in grid points.
+        batch_size (int): Candidates evaluated per DTW batch.
+        exclude (array-like, optional): Row of data to skip for each query (e.g. itself).
+
+    Returns:
+        tuple: (indices, distances, evaluated) with indices/distances of shape
+               (num_queries, k) nearest first, and the number of exact DTW
+               evaluations per query. A query with fewer than k finite candidates
+               (rows with NaN points have an infinite bound) is padded with index -1
+               and distance inf.
+    """
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float64))
+    data = np.asarray(data, dtype=np.float64)
+    k = min(k, data.shape[0] - (0 if exclude is None else 1))
+    upper, lower = keogh_envelope(data, radius)
+    bounds = lb_keogh(queries, upper, lower)
+    if exclude is not None:
+        bounds[np.arange(len(queries)), np.asarray(exclude)] = np.inf
+
+    indices = np.full((len(queries), k), -1, dtype=np.intp)
+    distances = np.full((len(queries), k), np.inf)
+    evaluated = np.zeros(len(queries), dtype=np.intp)
+    for q, query in enumerate(queries):
+        order = np.argsort(bounds[q])
+        order = order[np.isfinite(bounds[q][order])]
+        best_d = np.empty(0)
+        best_i = np.empty(0, dtype=np.intp)
+        for b0 in range(0, len(order), batch_size):
+            batch = order[b0:b0 + batch_size]
+            if len(best_d) == k and bounds[q, batch[0]] >= best_d[-1]:
+                break
+            d = dtw_banded(np.broadcast_to(query, (len(batch), query.size)), data[batch], radius)
+            evaluated[q] += len(batch)
+            best_d = np.concatenate([best_d, d])
+            best_i = np.concatenate([best_i, batch])
+            keep = np.argsort(best_d, kind='stable')[:k]
+            best_d, best_i = best_d[keep], best_i[keep]
+        indices[q, :len(best_i)] = best_i
+        distances[q, :len(best_d)] = best_d
+    return indices, distances, evaluated
+
+
+def dtw_knn_graph(data, k=10, radius=30, batch_size=64):
+    """
+    kNN graph under banded DTW, in the same CSR layout as knn_graph.knn_graph.
+
+    Returns:
+        dict: 'indptr', 'indices', 'distances' and 'k'; can be saved with save_knn_graph.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    n = data.shape[0]
+    indices, distances, _ = dtw_nearest(data, data, k, radius, batch_size, exclude=np.arange(n))
+    return {
+        'indptr': np.arange(n + 1, dtype=np.int64) * indices.shape[1],
+        'indices': indices.reshape(-1).astype(np.int64),
+        'distances': distances.reshape(-1),
+        'k': k,
+    }
@@ -0,0 +1,287 @@
+# Out-of-core tiled pairwise statistics with checkpoint/resume
+# The upper triangle of the pair space is split into square tiles. Each tile is
+# computed by a worker process that memory-maps the interpolated matrix (only the
+# tile coordinates are sent to it) and is written to its own file as soon as it is
+# done, so an interrupted run resumes from the tiles already on disk.
+
+import json
+import os
+import numpy as np
+
+from src.processing.loading import processed_paths
+
+PAIR_STATS = ('mean_diff', 'std_diff', 'max_abs_diff', 'mean_abs_diff', 'rms_diff')
+
+
+def pair_stats_tile(a, b, stats=PAIR_STATS):
+    """
+    Difference statistics between every row of a and every row of b.
+
+    Mean, std and RMS of y1 - y2 come from row sums and one matrix product; the
+    max and mean absolute differences need the explicit difference and are built
+    one row of a at a time. Only the statistics named in stats are computed.
+
+    Args:
+        a (np.ndarray): Rows of shape (ta, num_points).
+        b (np.ndarray): Rows of shape (tb, num_points).
+        stats (sequence of str): Names from PAIR_STATS to compute.
+
+    Returns:
+        dict: One (ta, tb) array per name in stats.
+    """
+    unknown = [stat for stat in stats if stat not in PAIR_STATS]
+    if unknown:
+        raise ValueError(f"Unknown pair statistics {unknown}; expected names from {PAIR_STATS}")
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    num_points = a.shape[1]
+    result = {}
+    if 'mean_diff' in stats or 'std_diff' in stats:
+        mean_diff = a.mean(axis=1)[:, None] - b.mean(axis=1)[None, :]
+        result['mean_diff'] = mean_diff
+    if 'std_diff' in stats or 'rms_diff' in stats:
+        sq_a = np.einsum('ij,ij->i', a, a)
+        sq_b = np.einsum('ij,ij->i', b, b)
+        mean_sq = (sq_a[:, None] + sq_b[None, :] - 2.0 * (a @ b.T)) / num_points
+        np.maximum(mean_sq, 0.0, out=mean_sq)
+        if 'std_diff' in stats:
+            result['std_diff'] = np.sqrt(np.maximum(mean_sq - mean_diff ** 2, 0.0))
+        result['rms_diff'] = np.sqrt(mean_sq)
+
+    want_max, want_mean = 'max_abs_diff' in stats, 'mean_abs_diff' in stats
+    if want_max or want_mean:
+        max_abs = np.empty((a.shape[0], b.shape[0])) if want_max else None
+        mean_abs = np.empty((a.shape[0], b.shape[0])) if want_mean else None
+        for r in range(a.shape[0]):
+            abs_diff = np.abs(a[r] - b)
+            if want_max:
+                max_abs[r] = abs_diff.max(axis=1)
+            if want_mean:
+                mean_abs[r] = abs_diff.mean(axis=1)
+        result['max_abs_diff'], result['mean_abs_diff'] = max_abs, mean_abs
+
+    return {stat: result[stat] for stat in stats}
+
+
+def upper_triangle_tiles(num_samples, tile_size):
+    """
+    Tiles (bi, bj) with bi <= bj covering every pair i < j exactly once.
+    """
+    num_blocks = (num_samples + tile_size - 1) // tile_size
+    return [(bi, bj) for bi in range(num_blocks) for bj in range(bi, num_blocks)]
+
+
+def _tile_file(output_dir, bi, bj):
+    return os.path.join(output_dir, f"tile_{bi:05d}_{bj:05d}.npz")
+
+
+# Per-process state set up by the pool initializer
+_WORKER = {}
+
+
+def _init_worker(data_file, tile_size, output_dir):
+    _WORKER['data'] = np.load(data_file, mmap_mode='r')
+    _WORKER['tile_size'] = tile_size
+    _WORKER['output_dir'] = output_dir
+
+
+def compute_tile(data, bi, bj, tile_size, output_dir):
+    """
+    Compute one tile and write it atomically (temporary file + os.replace).
+    """
+    i0, j0 = bi * tile_size, bj * tile_size
+    a = data[i0:i0 + tile_size]
+    b = data[j0:j0 + tile_size]
+    stats = pair_stats_tile(a, b)
+    path = _tile_file(output_dir, bi, bj)
+    tmp_path = path[:-len('.npz')] + '.tmp.npz'
+    np.savez(tmp_path, **stats)
+    os.replace(tmp_path, path)
+    return bi, bj
+
+
+def _run_tile(tile):
+    bi, bj = tile
+    return compute_tile(_WORKER['data'], bi, bj, _WORKER['tile_size'], _WORKER['output_dir'])
+
+
+def _job_manifest(data_file, tile_size):
+    data = np.load(data_file, mmap_mode='r')
+    stat = os.stat(data_file)
+    return {
+        'data_file': os.path.abspath(data_file),
+        'data_size': stat.st_size,
+        'data_mtime': stat.st_mtime,
+        'shape': list(data.shape),
+        'tile_size': tile_size,
+        'stats': list(PAIR_STATS),
+    }
+
+
+def run_tiled_pairwise(data_file, output_dir, tile_size=256, workers=None):
+    """
+    Compute pairwise statistics for all pairs of rows of a .npy matrix, tile by tile.
+
+    Completed tiles are skipped, so calling this again after a crash or preemption
+    resumes where the previous run stopped. If the input file or tile size changed
+    since the tiles were written, the old tiles are discarded.
+
+    Args:
+        data_file (str): Path of the interpolated .npy matrix.
+        output_dir (str): Directory for the tile files and job manifest.
+        tile_size (int): Rows per tile side.
+        workers (int, optional): Worker processes; 0 runs in this process.
+                                 Defaults to os.cpu_count().
+
+    Returns:
+        str: output_dir, ready for assemble_pairwise.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = _job_manifest(data_file, tile_size)
+    manifest_file = os.path.join(output_dir, "manifest.json")
+    if os.path.exists(manifest_file):
+        with open(manifest_file, 'r') as f:
+            previous = json.load(f)
+        if previous != manifest:
+            print(f"Input or tile size changed since the last run; discarding tiles in {output_dir}")
+            for fname in os.listdir(output_dir):
+                if fname.startswith('tile_'):
+                    os.remove(os.path.join(output_dir, fname))
+    with open(manifest_file, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    num_samples = manifest['shape'][0]
+    tiles = upper_triangle_tiles(num_samples, tile_size)
+    pending = [t for t in tiles if not os.path.exists(_tile_file(output_dir, *t))]
+    print(f"{len(tiles)} tiles in total, {len(tiles) - len(pending)} already complete, {len(pending)} to compute")
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 0 or len(pending) <= 1:
+        data = np.load(data_file, mmap_mode='r')
+        for done, (bi, bj) in enumerate(pending, 1):
+            compute_tile(data, bi, bj, tile_size, output_dir)
+            print(f"  Tile {done}/{len(pending)} ({bi}, {bj}) done")
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(data_file, tile_size, output_dir)) as pool:
+            for done, (bi, bj) in enumerate(pool.map(_run_tile, pending), 1):
+                print(f"  Tile {done}/{len(pending)} ({bi}, {bj}) done")
+    return output_dir
+
+
+def assemble_pairwise(output_dir, stat='mean_abs_diff', out_file=None):
+    """
+    Assemble one statistic from the tiles into a square (n, n) matrix.
+
+    The matrix is antisymmetric for 'mean_diff' (entry [j, i] = -[i, j]) and
+    symmetric otherwise; the diagonal is 0. If out_file is given the result is
+    written to a memory-mapped .npy instead of being held in memory.
+
+    Returns:
+        np.ndarray: The (n, n) matrix (memory-mapped if out_file was given).
+    """
+    if stat not in PAIR_STATS:
+        raise ValueError(f"stat must be one of {PAIR_STATS}")
+    with open(os.path.join(output_dir, "manifest.json"), 'r') as f:
+        manifest = json.load(f)
+    num_samples, tile_size = manifest['shape'][0], manifest['tile_size']
+    if out_file is None:
+        result = np.zeros((num_samples, num_samples))
+    else:
+        result = np.lib.format.open_memmap(out_file, mode='w+', dtype=np.float64,
+                                           shape=(num_samples, num_samples))
+    sign = -1.0 if stat == 'mean_diff' else 1.0
+    for bi, bj in upper_triangle_tiles(num_samples, tile_size):
+        path = _tile_file(output_dir, bi, bj)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Missing tile {path}; run run_tiled_pairwise first")
+        with np.load(path) as npz:
+            block = npz[stat]
+        i0, j0 = bi * tile_size, bj * tile_size
+        i1, j1 = i0 + block.shape[0], j0 + block.shape[1]
+        result[i0:i1, j0:j1] = block
+        result[j0:j1, i0:i1] = sign * block.T
+    np.fill_diagonal(result, 0.0)
+    return result
+
+
+def pair_stats_table(data, idx1, idx2, block_size=1024):
+    """
+    PAIR_STATS for an explicit list of pairs, computed in blocks of pairs.
+
+    Args:
+        data (np.ndarray): Matrix of shape (num_samples, num_points).
+        idx1, idx2 (np.ndarray): Row indices of each pair.
+        block_size (int): Pairs per block.
+
+    Returns:
+        dict: One array of len(idx1) per name in PAIR_STATS.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    table = {stat: np.empty(len(idx1)) for stat in PAIR_STATS}
+    for p0 in range(0, len(idx1), block_size):
+        diff = data[idx1[p0:p0 + block_size]] - data[idx2[p0:p0 + block_size]]
+        abs_diff = np.abs(diff)
+        p1 = p0 + diff.shape[0]
+        table['mean_diff'][p0:p1] = diff.mean(axis=1)
+        table['std_diff'][p0:p1] = diff.std(axis=1)
+        table['max_abs_diff'][p0:p1] = abs_diff.max(axis=1)
+        table['mean_abs_diff'][p0:p1] = abs_diff.mean(axis=1)
+        table['rms_diff'][p0:p1] = np.sqrt(np.einsum('ij,ij->i', diff, diff) / diff.shape[1])
+    return table
+
+
+def load_pair_stats(modality, idx1, idx2, data_dir="processed_data"):
+    """
+    Read PAIR_STATS for the given pairs (idx1 < idx2) from completed tiles on disk.
+
+    Returns:
+        dict or None: One array per stat, or None if the tiles of
+                      processed_data/<modality>/pairwise_tiles/ are missing, incomplete
+                      or were computed from a different data file.
+    """
+    paths = processed_paths(modality, data_dir)
+    output_dir = os.path.join(paths['dir'], 'pairwise_tiles')
+    manifest_file = os.path.join(output_dir, "manifest.json")
+    if not os.path.exists(manifest_file) or not os.path.exists(paths['data']):
+        return None
+    with open(manifest_file, 'r') as f:
+        manifest = json.load(f)
+    if manifest != _job_manifest(paths['data'], manifest['tile_size']):
+        return None
+    tile_size = manifest['tile_size']
+    tiles = upper_triangle_tiles(manifest['shape'][0], tile_size)
+    if not all(os.path.exists(_tile_file(output_dir, *t)) for t in tiles):
+        return None
+
+    idx1, idx2 = np.asarray(idx1), np.asarray(idx2)
+    table = {stat: np.empty(len(idx1)) for stat in PAIR_STATS}
+    bi, bj = idx1 // tile_size, idx2 // tile_size
+    for tile in tiles:
+        in_tile = np.flatnonzero((bi == tile[0]) & (bj == tile[1]))
+        if in_tile.size == 0:
+            continue
+        rows, cols = idx1[in_tile] - tile[0] * tile_size, idx2[in_tile] - tile[1] * tile_size
+        with np.load(_tile_file(output_dir, *tile)) as npz:
+            for stat in PAIR_STATS:
+                table[stat][in_tile] = npz[stat][rows, cols]
+    return table
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Tiled pairwise difference statistics with resume.")
+    parser.add_argument('modality', choices=['tga', 'dsc'])
+    parser.add_argument('--data-dir', default='processed_data')
+    parser.add_argument('--tile-size', type=int, default=256)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    paths = processed_paths(args.modality, args.data_dir)
+    output_dir = os.path.join(paths['dir'], 'pairwise_tiles')
+    run_tiled_pairwise(paths['data'], output_dir, tile_size=args.tile_size, workers=args.workers)
+    print(f"Tiles saved to: {output_dir}")
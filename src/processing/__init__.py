@@ -4,18 +4,82 @@
 """
 This module provides data cleaning and processing functions for all data modalities.
 Each function is implemented in its respective file for modularity.
+
+Functions are resolved lazily on first attribute access (PEP 562), so importing the
+package does not pull in pandas or any other heavy dependency until it is needed.
 """
 
-# Import all cleaning functions from the modules
-from .cleaning import convert_csv, auto_trim, select_trim, interprolate_data
-from .special_cleaning import tga_xy, normalize_tga, dsc_xy
+import importlib
+
+# Map each public function to the submodule that defines it
+_LAZY_ATTRS = {
+    "convert_csv": ".cleaning",
+    "select_trim": ".cleaning",
+    "auto_trim": ".cleaning",
+    "interprolate_data": ".cleaning",
+    "tga_xy": ".special_cleaning",
+    "normalize_tga": ".special_cleaning",
+    "dsc_xy": ".special_cleaning",
+    "processed_paths": ".loading",
+    "load_sample_names": ".loading",
+    "load_metadata": ".loading",
+    "load_processed": ".loading",
+    "save_processed": ".loading",
+    "derived_paths": ".loading",
+    "x_grid": ".loading",
+    "build_sample_index": ".alignment",
+    "load_sample_index": ".alignment",
+    "gather_rows": ".alignment",
+    "load_aligned": ".alignment",
+    "cumulative_trapezoid": ".features",
+    "dtg": ".features",
+    "tga_features": ".features",
+    "dsc_baseline": ".features",
+    "dsc_features": ".features",
+    "extract_features": ".features",
+    "target_grid": ".regrid",
+    "interpolation_weights": ".regrid",
+    "regrid": ".regrid",
+    "load_regridded": ".regrid",
+    "read_raw_table": ".raw_reading",
+    "raw_xy": ".raw_reading",
+    "load_raw_xy": ".raw_reading",
+    "raw_xy_frames": ".raw_reading",
+    "spectral_grid": ".spectral",
+    "interpolate_curve": ".spectral",
+    "process_spectral": ".spectral",
+    "publish_snapshot": ".snapshots",
+    "load_snapshot": ".snapshots",
+    "current_version": ".snapshots",
+    "list_snapshots": ".snapshots",
+    "diff_snapshots": ".snapshots",
+    "prune_snapshots": ".snapshots",
+    "is_archive": ".archive_reading",
+    "archive_members": ".archive_reading",
+    "iter_archive_members": ".archive_reading",
+    "load_archive_xy": ".archive_reading",
+    "archive_xy_frames": ".archive_reading",
+    "normalize": ".normalization",
+    "stored_normalization": ".normalization",
+    "load_normalized": ".normalization",
+    "curve_on_grid": ".watcher",
+    "RawFolderWatcher": ".watcher",
+    "stage_key": ".pipeline",
+    "run_pipeline": ".pipeline",
+}
+
 # Add all functions to __all__
-__all__ = [
-    "convert_csv",
-    "tga_xy",
-    "select_trim",
-    "normalize_tga",
-    "auto_trim",
-    "interprolate_data",
-    "dsc_xy",
-]
\ No newline at end of file
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value  # cache so __getattr__ is only hit once per name
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,156 @@
+# Cross-modality sample index: which sample has which modalities, at which row
+# Only NumPy is needed; the index is built once from the *_sample_names.txt files.
+# It stores a hash of each modality's name list, so load_aligned can tell when a
+# modality was republished with other names and the saved rows no longer apply.
+
+import hashlib
+import os
+import numpy as np
+
+from .loading import DEFAULT_DATA_DIR, processed_paths, load_processed, load_sample_names
+
+
+def sample_index_path(data_dir=DEFAULT_DATA_DIR):
+    """Path of the persisted cross-modality sample index."""
+    return os.path.join(data_dir, "sample_index.npz")
+
+
+def names_hash(sample_names):
+    """Hex digest of an ordered list of sample names."""
+    return hashlib.blake2b("\n".join(str(name) for name in sample_names).encode(), digest_size=16).hexdigest()
+
+
+def build_sample_index(modalities=('tga', 'dsc'), data_dir=DEFAULT_DATA_DIR, save=True):
+    """
+    Join the sample names of several modalities into one index.
+
+    Args:
+        modalities (sequence of str): Modalities to include; missing ones are skipped.
+        data_dir (str): Root of the processed data directory.
+        save (bool): Write the index to <data_dir>/sample_index.npz and a readable
+                     sample_index.txt.
+
+    Returns:
+        dict: 'sample_names' (sorted union of names), 'modalities', 'rows' (int array of
+              shape (num_names, num_modalities), -1 where a sample lacks a modality),
+              'common_names' (samples present in every modality), one
+              'gather_<modality>' row array per modality aligned to common_names
+              and one 'names_hash_<modality>' (names_hash of its names).
+    """
+    names_by_modality = {}
+    for modality in modalities:
+        names_file = processed_paths(modality, data_dir)['names']
+        if os.path.exists(names_file):
+            names_by_modality[modality] = load_sample_names(names_file)
+        else:
+            print(f"Warning: No sample names for {modality} at {names_file}. Skipping...")
+    if not names_by_modality:
+        raise ValueError("No modalities with processed sample names found.")
+    index = _index_from_names(names_by_modality)
+
+    if save:
+        np.savez(sample_index_path(data_dir), **index)
+        with open(os.path.join(data_dir, "sample_index.txt"), 'w') as f:
+            f.write("Sample Name\t" + "\t".join(m.upper() for m in index['modalities']) + "\n")
+            f.write("-" * 40 + "\n")
+            for name, sample_rows in zip(index['sample_names'], index['rows']):
+                cells = [str(r) if r >= 0 else '-' for r in sample_rows]
+                f.write(f"{name}\t" + "\t".join(cells) + "\n")
+    return index
+
+
+def _index_from_names(names_by_modality):
+    """Sample index dict (see build_sample_index) from {modality: ordered sample names}."""
+    included = list(names_by_modality)
+    all_names = sorted(set().union(*names_by_modality.values()))
+    position = {name: i for i, name in enumerate(all_names)}
+
+    rows = np.full((len(all_names), len(included)), -1, dtype=np.int64)
+    for m, modality in enumerate(included):
+        for row, name in enumerate(names_by_modality[modality]):
+            if rows[position[name], m] != -1:
+                print(f"Warning: Duplicate sample name {name} in {modality}; keeping first row")
+                continue
+            rows[position[name], m] = row
+
+    common = np.all(rows >= 0, axis=1)
+    index = {
+        'sample_names': np.asarray(all_names),
+        'modalities': np.asarray(included),
+        'rows': rows,
+        'common_names': np.asarray(all_names)[common],
+    }
+    for m, modality in enumerate(included):
+        index[f'gather_{modality}'] = rows[common, m]
+        index[f'names_hash_{modality}'] = np.asarray(names_hash(names_by_modality[modality]))
+    return index
+
+
+def load_sample_index(data_dir=DEFAULT_DATA_DIR):
+    """
+    Load the persisted cross-modality sample index as a dict of arrays.
+    """
+    with np.load(sample_index_path(data_dir), allow_pickle=False) as npz:
+        return {key: npz[key] for key in npz.files}
+
+
+def gather_rows(index, modalities, require_all=True):
+    """
+    Row arrays that align several modalities by sample name.
+
+    When `modalities` covers every modality in the index and require_all is True the
+    precomputed gather_<modality> arrays are returned directly; otherwise they are
+    derived from the rows table.
+
+    Args:
+        index (dict): Output of build_sample_index/load_sample_index.
+        modalities (sequence of str): Modalities to align.
+        require_all (bool): Only keep samples present in all requested modalities.
+                            If False, rows are -1 where a sample lacks a modality.
+
+    Returns:
+        tuple: (sample_names, {modality: row array}) with one entry per aligned sample.
+    """
+    included = list(index['modalities'])
+    missing = [m for m in modalities if m not in included]
+    if missing:
+        raise ValueError(f"Modalities not in sample index: {missing}")
+
+    if require_all and set(modalities) == set(included):
+        return index['common_names'], {m: index[f'gather_{m}'] for m in modalities}
+
+    columns = [included.index(m) for m in modalities]
+    rows = index['rows'][:, columns]
+    keep = np.all(rows >= 0, axis=1) if require_all else np.any(rows >= 0, axis=1)
+    return index['sample_names'][keep], {m: rows[keep, k] for k, m in enumerate(modalities)}
+
+
+def load_aligned(modalities=('tga', 'dsc'), data_dir=DEFAULT_DATA_DIR, mmap_mode=None):
+    """
+    Load interpolated matrices for several modalities with rows aligned by sample.
+
+    Each matrix is gathered with a single fancy-index, so row i of every returned
+    matrix belongs to sample_names[i]. The saved sample index is only used if its
+    names hashes match the names loaded with the matrices; otherwise (a modality was
+    republished since, or the index predates the hashes) the index is rebuilt in
+    memory from those names.
+
+    Returns:
+        tuple: (sample_names, {modality: aligned matrix})
+    """
+    loaded = {m: load_processed(m, data_dir, mmap_mode=mmap_mode)[:2] for m in modalities}
+    names_by_modality = {m: names for m, (_, names) in loaded.items()}
+
+    index = None
+    if os.path.exists(sample_index_path(data_dir)):
+        index = load_sample_index(data_dir)
+        stale = [m for m, names in names_by_modality.items()
+                 if f'names_hash_{m}' not in index or str(index[f'names_hash_{m}']) != names_hash(names)]
+        if stale:
+            print(f"Warning: Sample index is out of date for {', '.join(stale)}; rebuilding it from the loaded names")
+            index = None
+    if index is None:
+        index = _index_from_names(names_by_modality)
+    sample_names, gathers = gather_rows(index, modalities)
+    aligned = {modality: loaded[modality][0][rows] for modality, rows in gathers.items()}
+    return sample_names.tolist(), aligned
@@ -0,0 +1,196 @@
+# Raw instrument runs read straight from zip/tar archives
+# Instrument runs are often shipped as one archive per campaign. Instead of
+# extracting them to disk, members are streamed out of the archive (tar archives
+# in a single sequential pass, so .tar.gz/.tar.bz2/.tar.xz are never seeked) and
+# their bytes are handed to the raw_reading parsers, decoded in parallel worker
+# processes. Member paths inside the archive are ignored: the HDPE-/LDPE- prefix
+# rules and os.path.splitext sample names apply to the member's base name, exactly
+# as for files in a raw folder.
+#
+# Worker processes are started with the platform default (spawn on macOS and
+# Windows), which re-imports the calling script: scripts that pass workers > 1 must
+# keep their top-level code under `if __name__ == "__main__":`, as preprocessing.py
+# does. load_raw_xy and run_pipeline decode in the calling process unless given workers.
+#
+#   from src.processing.archive_reading import archive_xy_frames
+#   tga_data = archive_xy_frames('runs_2024.tar.gz', 'tga')
+
+import os
+import tarfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from .raw_reading import RAW_EXTENSIONS, raw_xy
+
+
+def is_archive(path):
+    """True if path is an existing zip or tar file."""
+    if not os.path.isfile(path):
+        return False
+    return zipfile.is_zipfile(path) or tarfile.is_tarfile(path)
+
+
+def _member_fname(member_name):
+    """Base name of an archive member, or None for directories, hidden and resource-fork entries."""
+    fname = os.path.basename(member_name.rstrip('/'))
+    if not fname or fname.startswith('.') or '__MACOSX' in member_name.split('/'):
+        return None
+    if os.path.splitext(fname)[1].lower() not in RAW_EXTENSIONS:
+        return None
+    return fname
+
+
+def archive_members(archive_path):
+    """
+    Raw members of an archive, one per sample name, in archive order.
+
+    As with raw_files, an original raw file is preferred over a CSV produced by
+    convert_csv for the same sample. Reading the member list of a compressed tar
+    requires one pass over the archive.
+
+    Returns:
+        list of str: Member names (full paths inside the archive).
+    """
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as zf:
+            names = [info.filename for info in zf.infolist() if not info.is_dir()]
+    else:
+        with tarfile.open(archive_path, mode='r|*') as tf:
+            names = [member.name for member in tf if member.isfile()]
+    chosen = {}
+    for name in names:
+        fname = _member_fname(name)
+        if fname is None:
+            continue
+        stem = os.path.splitext(fname)[0]
+        if stem not in chosen or chosen[stem].lower().endswith('.csv'):
+            chosen[stem] = name
+    return list(chosen.values())
+
+
+def iter_archive_members(archive_path, members=None):
+    """
+    Stream (member name, bytes) pairs out of an archive without extracting it.
+
+    Args:
+        archive_path (str): Zip or tar archive (any compression tarfile supports).
+        members (iterable of str, optional): Member names to read; defaults to every
+                                             raw member, found in the same single pass.
+
+    Yields:
+        tuple: (member_name, content) in archive order.
+    """
+    wanted = None if members is None else set(members)
+
+    def selected(name):
+        return _member_fname(name) is not None if wanted is None else name in wanted
+
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as zf:
+            for info in zf.infolist():
+                if not info.is_dir() and selected(info.filename):
+                    yield info.filename, zf.read(info)
+        return
+    # Stream mode: members are read in one forward pass over the (decompressed) archive
+    with tarfile.open(archive_path, mode='r|*') as tf:
+        for member in tf:
+            if member.isfile() and selected(member.name):
+                yield member.name, tf.extractfile(member).read()
+
+
+def parallel_map(func, jobs, workers=None, max_pending=None):
+    """
+    Yield func(job) for every job, in order, computed by a pool of worker processes.
+
+    Jobs are drawn from the iterable only as results are consumed, so at most
+    max_pending jobs (default 4 * workers) are held in memory at once.
+
+    Args:
+        func (callable): Module-level function (workers import it).
+        jobs (iterable): Arguments, one per call.
+        workers (int, optional): Processes (default os.cpu_count()); 0 or 1 runs in
+                                 the calling process. With more than one worker the
+                                 calling script needs a __main__ guard (see the module comment).
+        max_pending (int, optional): Jobs submitted ahead of the results consumed.
+    """
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    if workers <= 1:
+        yield from map(func, jobs)
+        return
+    max_pending = max_pending or 4 * workers
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for job in jobs:
+            pending.append(pool.submit(func, job))
+            if len(pending) >= max_pending:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+def _decode_member(args):
+    """Parse one archive member's bytes into (sample_name, x, y), an error message or None."""
+    member_name, content, modality = args
+    fname = os.path.basename(member_name)
+    try:
+        xy = raw_xy(fname, modality, content)
+    except (ValueError, ImportError) as e:
+        return f"Warning: Error processing {member_name}: {str(e)}"
+    if xy is None or len(xy[0]) == 0:
+        return None
+    return member_name, xy[0], xy[1]
+
+
+def load_archive_xy(archive_path, modality, workers=None, max_pending=None):
+    """
+    Read every recognised raw member of an archive straight to X/Y arrays.
+
+    The archive is read sequentially in the calling process while members are decoded
+    by a pool of worker processes; at most max_pending members are held in memory at
+    once, so large archives stream in bounded memory. Every raw member is decoded in
+    that one pass; samples present both as an original and as a converted CSV keep
+    the original, as with archive_members.
+
+    Args:
+        archive_path (str): Zip or tar archive of raw instrument files.
+        modality (str): 'tga' or 'dsc'.
+        workers (int, optional): Decoding processes (default os.cpu_count()); 0 or 1
+                                 decodes in the calling process. With more than one
+                                 worker the calling script needs a __main__ guard
+                                 (see the module comment).
+        max_pending (int, optional): Members read ahead of decoding (default 4 * workers).
+
+    Returns:
+        list: (sample_name, x, y) tuples in archive order, as load_raw_xy.
+    """
+    jobs = ((name, content, modality) for name, content in iter_archive_members(archive_path))
+    return _collect(parallel_map(_decode_member, jobs, workers, max_pending))
+
+
+def _collect(results):
+    """Print decode warnings and keep one (sample_name, x, y) per sample name."""
+    chosen = {}
+    for result in results:
+        if isinstance(result, str):
+            print(result)
+            continue
+        if result is None:
+            continue
+        member_name, x, y = result
+        stem = os.path.splitext(os.path.basename(member_name))[0]
+        if stem not in chosen or chosen[stem][0].lower().endswith('.csv'):
+            chosen[stem] = (member_name, x, y)
+    return [(stem, x, y) for stem, (_, x, y) in chosen.items()]
+
+
+def archive_xy_frames(archive_path, modality, workers=None):
+    """
+    Drop-in replacement for tga_xy/dsc_xy that reads the runs inside an archive.
+
+    Returns:
+        list of pd.DataFrame: One DataFrame per member with 'X', 'Y' and 'sample' columns.
+    """
+    import pandas as pd
+
+    return [pd.DataFrame({'X': x, 'Y': y, 'sample': name})
+            for name, x, y in load_archive_xy(archive_path, modality, workers)]
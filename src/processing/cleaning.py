@@ -2,10 +2,9 @@
 
 
 # FUNCT1 check if data is in .csv format, if not convert to .csv function (if not already). All sample data is saved in a folder titled with relevant modality. 
+# pandas and glob are only needed by convert_csv and are imported there, so that
+# importing this module for the trimming/interpolation helpers stays cheap.
 import os
-import pandas as pd
-import glob
-from pathlib import Path
 import numpy as np
 
 def convert_csv(data_directories):
@@ -19,6 +18,9 @@ def convert_csv(data_directories):
     Returns:
         dict: Summary of conversion results for each directory
     """
+    import glob
+    import pandas as pd
+
     conversion_summary = {}
     
     for directory in data_directories:
@@ -52,7 +54,7 @@ def convert_csv(data_directories):
                         data = None
                         
                         if file_ext in ['.txt', '.dpt', '.dat']:
-                            data = pd.read_csv(file_path, delim_whitespace=True, header=None, encoding="latin-1", skiprows=2)
+                            data = pd.read_csv(file_path, sep=r'\s+', header=None, encoding="latin-1", skiprows=2)
                         
                         elif file_ext in ['.xls', '.xlsx']:
                             data = pd.read_excel(file_path, header=None)
@@ -176,7 +178,7 @@ def auto_trim(dfs, x_col='X'):
 
 
 
-def interprolate_data(dfs, x_col='X', y_col='Y', N=3000):
+def interprolate_data(dfs, x_col='X', y_col='Y', N=3000, return_grid=False):
     """
     Interpolates each DataFrame's y_col to N points over the common x range.
     Returns a 2D NumPy array: shape (num_samples, N), each row is a sample's interpolated y-values.
@@ -186,9 +188,11 @@ def interprolate_data(dfs, x_col='X', y_col='Y', N=3000):
         x_col (str): Name of the x column.
         y_col (str): Name of the y column.
         N (int): Number of points to interpolate to (default 3000).
+        return_grid (bool): Also return the x grid the data was interpolated onto.
 
     Returns:
         np.ndarray: 2D array of shape (num_samples, N) with interpolated y-values.
+                    If return_grid is True, a tuple (array, x_grid) instead.
     """
     # Find overlapping x range
     min_xs = []
@@ -223,4 +227,6 @@ def interprolate_data(dfs, x_col='X', y_col='Y', N=3000):
             continue
         y_interp = np.interp(x_new, x, y)
         interpolated.append(y_interp)
+    if return_grid:
+        return np.vstack(interpolated), x_new
     return np.vstack(interpolated)
@@ -0,0 +1,185 @@
+# Feature extraction on the interpolated matrices (DTG, onset/peak temperatures,
+# DSC baseline subtraction and melting enthalpy)
+# Every function works on the whole (num_samples, num_points) matrix at once.
+
+import os
+import numpy as np
+
+from .loading import DEFAULT_DATA_DIR, processed_paths, load_processed, x_grid
+
+
+def cumulative_trapezoid(y, x):
+    """
+    Cumulative trapezoidal integral of each row of y over x (first column is 0).
+
+    Args:
+        y (np.ndarray): Array of shape (num_samples, num_points).
+        x (np.ndarray): Grid of shape (num_points,).
+
+    Returns:
+        np.ndarray: Array of the same shape as y.
+    """
+    y = np.asarray(y, dtype=float)
+    areas = 0.5 * (y[:, 1:] + y[:, :-1]) * np.diff(x)[None, :]
+    result = np.zeros_like(y)
+    np.cumsum(areas, axis=1, out=result[:, 1:])
+    return result
+
+
+def dtg(data, x):
+    """
+    Derivative thermogravimetry curves dm/dT for every sample.
+
+    Central differences in the interior and one-sided differences at the ends
+    (np.gradient along axis 1). Mass loss gives negative values.
+
+    Args:
+        data (np.ndarray): Normalized TGA matrix of shape (num_samples, num_points).
+        x (np.ndarray): Temperature grid (°C).
+
+    Returns:
+        np.ndarray: dm/dT matrix with the same shape as data (1/°C).
+    """
+    return np.gradient(np.asarray(data, dtype=float), x, axis=1)
+
+
+def tga_features(data, x, dtg_data=None):
+    """
+    Peak and onset temperatures of the main mass-loss step for every sample.
+
+    The peak is the temperature of the fastest mass loss (minimum of dm/dT). The
+    onset is where the tangent at the peak crosses the initial mass plateau.
+
+    Args:
+        data (np.ndarray): Normalized TGA matrix of shape (num_samples, num_points).
+        x (np.ndarray): Temperature grid (°C).
+        dtg_data (np.ndarray, optional): Precomputed dtg(data, x).
+
+    Returns:
+        dict: 'peak_temperature', 'peak_rate' (dm/dT at the peak), 'onset_temperature',
+              'initial_mass' and 'residual_mass', each of shape (num_samples,).
+    """
+    data = np.asarray(data, dtype=float)
+    if dtg_data is None:
+        dtg_data = dtg(data, x)
+    rows = np.arange(data.shape[0])
+
+    # NaN rows (failed interpolation) give NaN features instead of index 0
+    filled = np.where(np.isnan(dtg_data), np.inf, dtg_data)
+    peak_idx = np.argmin(filled, axis=1)
+    valid = np.isfinite(filled[rows, peak_idx])
+
+    peak_rate = dtg_data[rows, peak_idx]
+    peak_temperature = x[peak_idx]
+    initial_mass = data[:, 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        onset_temperature = peak_temperature + (initial_mass - data[rows, peak_idx]) / peak_rate
+    onset_temperature = np.where(peak_rate < 0, onset_temperature, np.nan)
+
+    return {
+        'peak_temperature': np.where(valid, peak_temperature, np.nan),
+        'peak_rate': np.where(valid, peak_rate, np.nan),
+        'onset_temperature': np.where(valid, onset_temperature, np.nan),
+        'initial_mass': initial_mass,
+        'residual_mass': data[:, -1],
+    }
+
+
+def dsc_baseline(data, x, edge_points=50):
+    """
+    Linear baselines through the mean of the first and last edge_points of each curve.
+
+    Args:
+        data (np.ndarray): DSC matrix of shape (num_samples, num_points).
+        x (np.ndarray): Temperature grid (°C).
+        edge_points (int): Number of points averaged at each end to anchor the baseline.
+
+    Returns:
+        np.ndarray: Baseline matrix with the same shape as data.
+    """
+    data = np.asarray(data, dtype=float)
+    x0, x1 = x[:edge_points].mean(), x[-edge_points:].mean()
+    y0 = data[:, :edge_points].mean(axis=1)
+    y1 = data[:, -edge_points:].mean(axis=1)
+    slope = (y1 - y0) / (x1 - x0)
+    return y0[:, None] + slope[:, None] * (x[None, :] - x0)
+
+
+def dsc_features(data, x, edge_points=50, heating_rate=10.0, endotherm='down'):
+    """
+    Baseline-corrected DSC curves, melting peak and melting enthalpy for every sample.
+
+    Args:
+        data (np.ndarray): DSC heat flow matrix (W/g) of shape (num_samples, num_points).
+        x (np.ndarray): Temperature grid (°C).
+        edge_points (int): Points averaged at each end for the linear baseline.
+        heating_rate (float): Heating rate in °C/min, used to convert the area to J/g.
+        endotherm (str): 'down' if melting shows as a negative heat flow peak, else 'up'.
+
+    Returns:
+        tuple: (corrected, features) where corrected is the baseline-subtracted matrix
+               with endotherms made positive, and features is a dict of 'peak_temperature',
+               'peak_height' (W/g) and 'melting_enthalpy' (J/g), each of shape (num_samples,).
+    """
+    if endotherm not in ('down', 'up'):
+        raise ValueError("endotherm must be 'down' or 'up'")
+    data = np.asarray(data, dtype=float)
+    corrected = data - dsc_baseline(data, x, edge_points)
+    if endotherm == 'down':
+        corrected = -corrected
+
+    rows = np.arange(data.shape[0])
+    filled = np.where(np.isnan(corrected), -np.inf, corrected)
+    peak_idx = np.argmax(filled, axis=1)
+    valid = np.isfinite(filled[rows, peak_idx])
+
+    # Area in W/g * °C; divide by heating rate in °C/s to get J/g
+    area = cumulative_trapezoid(corrected, x)[:, -1]
+    melting_enthalpy = area / (heating_rate / 60.0)
+
+    features = {
+        'peak_temperature': np.where(valid, x[peak_idx], np.nan),
+        'peak_height': np.where(valid, corrected[rows, peak_idx], np.nan),
+        'melting_enthalpy': melting_enthalpy,
+    }
+    return corrected, features
+
+
+def extract_features(modality, data_dir=DEFAULT_DATA_DIR, **kwargs):
+    """
+    Compute and save the feature arrays for one modality.
+
+    TGA writes tga_dtg.npy and tga_features.npz; DSC writes
+    dsc_baseline_corrected.npy and dsc_features.npz, next to the interpolated data.
+    Extra keyword arguments are passed to dsc_features.
+
+    Returns:
+        dict: The per-sample feature arrays that were saved.
+    """
+    modality = modality.lower()
+    data, sample_names, metadata = load_processed(modality, data_dir)
+    x = x_grid(metadata, data.shape[1])
+    modality_dir = processed_paths(modality, data_dir)['dir']
+
+    if modality == 'tga':
+        curves = dtg(data, x)
+        features = tga_features(data, x, dtg_data=curves)
+        curves_file = os.path.join(modality_dir, "tga_dtg.npy")
+    elif modality == 'dsc':
+        curves, features = dsc_features(data, x, **kwargs)
+        curves_file = os.path.join(modality_dir, "dsc_baseline_corrected.npy")
+    else:
+        raise ValueError("modality must be 'tga' or 'dsc'")
+
+    np.save(curves_file, curves)
+    features_file = os.path.join(modality_dir, f"{modality}_features.npz")
+    np.savez(features_file, sample_names=np.asarray(sample_names), **features)
+    print(f"{modality.upper()} features saved to: {features_file} ({curves_file})")
+    return features
+
+
+if __name__ == "__main__":
+    import sys
+
+    for modality in sys.argv[1:] or ['tga', 'dsc']:
+        extract_features(modality)
@@ -0,0 +1,220 @@
+# Loaders for the processed data library (processed_data/<modality>/)
+# Only NumPy is imported here so worker processes and CLI queries can read the
+# processed arrays without paying for pandas or matplotlib.
+
+import os
+import numpy as np
+
+DEFAULT_DATA_DIR = "processed_data"
+# Rebuildable caches live outside processed_data/, so writing them never looks like a
+# change to the library (the query service reloads when the library changes)
+DEFAULT_CACHE_ROOT = ".cache"
+
+
+def processed_paths(modality, data_dir=DEFAULT_DATA_DIR):
+    """
+    Build the file paths used for one modality in the processed data layout.
+
+    Args:
+        modality (str): Modality name, e.g. 'tga' or 'dsc'.
+        data_dir (str): Root of the processed data directory.
+
+    Returns:
+        dict: Paths keyed by 'dir', 'data', 'metadata', 'names' and 'mapping'.
+    """
+    modality = modality.lower()
+    modality_dir = os.path.join(data_dir, modality)
+    return {
+        'dir': modality_dir,
+        'data': os.path.join(modality_dir, f"interpolated_{modality}_data.npy"),
+        'metadata': os.path.join(modality_dir, f"{modality}_metadata.npz"),
+        'names': os.path.join(modality_dir, f"{modality}_sample_names.txt"),
+        'mapping': os.path.join(modality_dir, f"{modality}_sample_index_mapping.txt"),
+    }
+
+
+def load_sample_names(names_file):
+    """
+    Read a '<index>: <sample name>' text file as written by preprocessing.py.
+
+    Args:
+        names_file (str): Path to the *_sample_names.txt file.
+
+    Returns:
+        list of str: Sample names in row order.
+    """
+    sample_names = []
+    with open(names_file, 'r') as f:
+        for line in f:
+            if ':' in line:
+                sample_names.append(line.split(': ', 1)[1].strip())
+    return sample_names
+
+
+def load_metadata(metadata_file):
+    """
+    Read a *_metadata.npz file into a plain dict.
+    0-d arrays are unwrapped to Python scalars/strings.
+
+    Args:
+        metadata_file (str): Path to the .npz metadata file.
+
+    Returns:
+        dict: Metadata values keyed by name.
+    """
+    metadata = {}
+    with np.load(metadata_file, allow_pickle=True) as npz:
+        for key in npz.files:
+            value = npz[key]
+            metadata[key] = value.item() if value.ndim == 0 else value
+    return metadata
+
+
+def derived_paths(modality, data_dir=DEFAULT_DATA_DIR):
+    """Files computed from a modality's rows (features, QC table), stale once the rows change."""
+    modality_dir = processed_paths(modality, data_dir)['dir']
+    curves = "tga_dtg.npy" if modality == 'tga' else f"{modality}_baseline_corrected.npy"
+    names = (f"{modality}_features.npz", f"{modality}_qc.txt", curves)
+    return [os.path.join(modality_dir, name) for name in names]
+
+
+def load_processed(modality, data_dir=DEFAULT_DATA_DIR, mmap_mode=None, version=None):
+    """
+    Load the interpolated matrix, sample names and metadata for one modality.
+
+    When the modality has snapshots (see snapshots.py) the version named by CURRENT is
+    read, so a publish running at the same time can never mix rows and names of two
+    versions; metadata['snapshot_version'] names it, and passing it back as version=
+    keeps reading that version while newer ones are published. mmap_mode memory-maps
+    snapshot versions too (see load_snapshot; only 'r' and 'c' are accepted there).
+
+    Args:
+        modality (str): Modality name, e.g. 'tga' or 'dsc'.
+        data_dir (str): Root of the processed data directory.
+        mmap_mode (str, optional): Passed to np.load, e.g. 'r' to memory-map the
+                                   matrix instead of reading it into memory.
+        version (int, optional): Snapshot version to read instead of CURRENT.
+
+    Returns:
+        tuple: (data, sample_names, metadata) where data is a 2D array of shape
+               (num_samples, num_points), sample_names is a list of str and
+               metadata is a dict (empty if no metadata file exists).
+    """
+    from .snapshots import current_version, load_snapshot
+
+    if version is not None or current_version(modality, data_dir) is not None:
+        return load_snapshot(modality, version, data_dir, mmap_mode=mmap_mode)
+    paths = processed_paths(modality, data_dir)
+    data = np.load(paths['data'], mmap_mode=mmap_mode)
+    sample_names = load_sample_names(paths['names'])
+    if len(sample_names) != data.shape[0]:
+        raise ValueError(
+            f"Sample count mismatch for {modality}: {len(sample_names)} names vs {data.shape[0]} data samples"
+        )
+    metadata = load_metadata(paths['metadata']) if os.path.exists(paths['metadata']) else {}
+    return data, sample_names, metadata
+
+
+def x_grid(metadata, num_points=None):
+    """
+    Temperature axis of the interpolated matrix.
+
+    Uses the exact grid stored in metadata['x_grid'] when present, otherwise
+    reconstructs it from x_range (libraries written before the grid was stored),
+    log-spaced if metadata['x_scale'] is 'log'.
+
+    Args:
+        metadata (dict): Metadata as returned by load_metadata/load_processed.
+        num_points (int, optional): Number of grid points; defaults to metadata['num_points'].
+
+    Returns:
+        np.ndarray: 1D array of x values (°C, or the modality's x_unit) for each column of the matrix.
+    """
+    if 'x_grid' in metadata and (num_points is None or len(metadata['x_grid']) == num_points):
+        return np.asarray(metadata['x_grid'], dtype=float)
+    if num_points is None:
+        num_points = int(metadata['num_points'])
+    x_min, x_max = np.asarray(metadata['x_range'], dtype=float)
+    if metadata.get('x_scale') == 'log':
+        return np.geomspace(x_min, x_max, num_points)
+    return np.linspace(x_min, x_max, num_points)
+
+
+def _replace_atomically(path, write):
+    """Write to a temporary file next to path with write(f), then os.replace it in."""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def save_processed(modality, data, sample_names, metadata, data_dir=DEFAULT_DATA_DIR, snapshot=True):
+    """
+    Publish a modality: a new snapshot version, then the files of the processed layout.
+
+    The snapshot version (see snapshots.py) is the publish itself: it becomes visible
+    to load_processed in one atomic swap of CURRENT. The same four files as
+    preprocessing.py (matrix, metadata, sample names and index mapping) are then
+    rewritten as a plain copy, each replaced atomically but one after another, for
+    tools that read them directly. 'num_samples', 'num_points' and 'sample_names' in
+    the metadata are updated to match data.
+
+    Derived files of the modality (derived_paths) are deleted when the published rows
+    differ from the previous ones, and the cross-modality sample index when the sample
+    names change; they are rebuilt by the tools that write them.
+
+    A matrix too large to hold in memory can be written chunk by chunk into a .npy file
+    next to the final one (np.lib.format.open_memmap) and passed by path; it is then
+    renamed into place instead of copied.
+
+    snapshot=False writes only the files, and is ignored once the modality has
+    snapshots (load_processed would otherwise keep serving the old version).
+
+    Args:
+        modality (str): Modality name, e.g. 'tga' or 'dsc'.
+        data (np.ndarray or str): Matrix of shape (num_samples, num_points), or the path
+                                  of a finished .npy file on the same filesystem.
+        sample_names (list of str): One name per row.
+        metadata (dict): Metadata to store.
+        data_dir (str): Root of the processed data directory.
+        snapshot (bool): Publish a snapshot version (always, once one exists).
+
+    Returns:
+        dict: The paths written (as processed_paths).
+    """
+    from .snapshots import current_version, publish_snapshot
+
+    paths = processed_paths(modality, data_dir)
+    os.makedirs(paths['dir'], exist_ok=True)
+    data_file = data if isinstance(data, str) else None
+    shape = np.load(data_file, mmap_mode='r').shape if data_file else np.shape(data)
+    metadata = dict(metadata)
+    metadata.pop('snapshot_version', None)  # set by load_snapshot, not part of the content
+    metadata.update(num_samples=shape[0], num_points=shape[1], sample_names=list(sample_names))
+    previous_names = load_sample_names(paths['names']) if os.path.exists(paths['names']) else None
+
+    parent = current_version(modality, data_dir)
+    changed = True
+    if snapshot or parent is not None:
+        changed = publish_snapshot(modality, data_file or data, sample_names, metadata, data_dir) != parent
+
+    mapping = "Index\tSample Name\n" + "-" * 30 + "\n" + "".join(f"{i}\t{name}\n" for i, name in enumerate(sample_names))
+    names = "".join(f"{i}: {name}\n" for i, name in enumerate(sample_names))
+    _replace_atomically(paths['mapping'], lambda f: f.write(mapping.encode()))
+    _replace_atomically(paths['metadata'], lambda f: np.savez(f, **metadata))
+    _replace_atomically(paths['names'], lambda f: f.write(names.encode()))
+    if data_file:
+        os.replace(data_file, paths['data'])
+    else:
+        _replace_atomically(paths['data'], lambda f: np.save(f, np.asarray(data)))
+
+    if changed:
+        from .alignment import sample_index_path
+
+        stale = derived_paths(modality, data_dir)
+        if previous_names != list(sample_names):
+            stale += [sample_index_path(data_dir), os.path.join(data_dir, "sample_index.txt")]
+        for path in stale:
+            if os.path.exists(path):
+                os.remove(path)
+    return paths
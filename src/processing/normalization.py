@@ -0,0 +1,115 @@
+# Batched normalization of interpolated matrices
+# Every scheme is one vectorized operation on the (num_samples, num_points) matrix,
+# so a whole library can be renormalized in memory without re-running the pipeline.
+# The scheme applied by preprocessing.py is stored under 'normalization' in the
+# modality's metadata.
+
+import warnings
+import numpy as np
+
+from .loading import DEFAULT_DATA_DIR, load_processed, x_grid
+from .features import dsc_baseline
+
+NORMALIZATION_SCHEMES = ('none', 'max', 'minmax', 'initial', 'area', 'zscore', 'snv', 'baseline')
+
+# Names written by older versions of preprocessing.py
+_LEGACY_NAMES = {'mass_normalized': 'max'}
+
+# Schemes that give the same result whatever positive per-row scale the input had,
+# so they can be applied exactly on top of stored max-normalized TGA data ('none'
+# cannot: it would need the raw curves back)
+SCALE_INVARIANT = ('max', 'minmax', 'initial', 'area', 'snv')
+
+# Schemes where each row depends only on itself, so new rows can be normalized
+# without touching the rest of the library ('zscore' is column-wise)
+ROW_WISE = ('none', 'max', 'minmax', 'initial', 'area', 'snv', 'baseline')
+
+
+def _safe(denominator):
+    """Replace zero divisors by 1 so constant rows/columns do not become inf/NaN."""
+    return np.where(denominator == 0, 1.0, denominator)
+
+
+def normalize(data, scheme='max', x=None, anchor_points=10):
+    """
+    Normalize every row of an interpolated matrix in one vectorized call.
+
+    Schemes:
+        'none'     : unchanged copy.
+        'max'      : y / max(y) (as normalize_tga, preserves residual mass).
+        'minmax'   : (y - min) / (max - min), each row spans 0-1.
+        'initial'  : y / mean of the first anchor_points (initial-mass normalization).
+        'area'     : y / |integral of y dx| (trapezoid rule on x).
+        'zscore'   : each temperature point standardized across samples (column-wise,
+                     ignoring NaN entries).
+        'snv'      : standard normal variate, each row centred and scaled by its own std.
+        'baseline' : subtract the linear baseline through the mean of the first and last
+                     anchor_points (as features.dsc_baseline).
+
+    Args:
+        data (np.ndarray): Matrix of shape (num_samples, num_points).
+        scheme (str): One of NORMALIZATION_SCHEMES.
+        x (np.ndarray, optional): Grid, used by 'area' and 'baseline'; defaults to 0..N-1.
+        anchor_points (int): Points averaged by 'initial' and 'baseline'.
+
+    Returns:
+        np.ndarray: Normalized float64 matrix (NaNs propagate per row).
+    """
+    scheme = _LEGACY_NAMES.get(scheme, scheme)
+    if scheme not in NORMALIZATION_SCHEMES:
+        raise ValueError(f"scheme must be one of {NORMALIZATION_SCHEMES}")
+    data = np.array(data, dtype=np.float64)
+    if x is None:
+        x = np.arange(data.shape[1], dtype=np.float64)
+
+    if scheme == 'none':
+        return data
+    if scheme == 'max':
+        return data / _safe(data.max(axis=1, keepdims=True))
+    if scheme == 'minmax':
+        low = data.min(axis=1, keepdims=True)
+        return (data - low) / _safe(data.max(axis=1, keepdims=True) - low)
+    if scheme == 'initial':
+        return data / _safe(data[:, :anchor_points].mean(axis=1, keepdims=True))
+    if scheme == 'area':
+        area = 0.5 * ((data[:, 1:] + data[:, :-1]) * np.diff(x)[None, :]).sum(axis=1, keepdims=True)
+        return data / _safe(np.abs(area))
+    if scheme == 'zscore':
+        # Column statistics over the finite entries, so one NaN row does not blank every column
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN columns stay NaN
+            mean = np.nanmean(data, axis=0, keepdims=True)
+            std = np.nanstd(data, axis=0, keepdims=True)
+        return (data - mean) / _safe(std)
+    if scheme == 'snv':
+        return (data - data.mean(axis=1, keepdims=True)) / _safe(data.std(axis=1, keepdims=True))
+    return data - dsc_baseline(data, x, edge_points=anchor_points)
+
+
+def stored_normalization(metadata):
+    """Scheme recorded in a modality's metadata ('none' if nothing was recorded)."""
+    scheme = metadata.get('normalization', 'none')
+    return _LEGACY_NAMES.get(scheme, scheme)
+
+
+def load_normalized(modality, scheme, data_dir=DEFAULT_DATA_DIR, anchor_points=10):
+    """
+    Load a modality and renormalize it in memory under another scheme.
+
+    The stored matrix is the input, so for TGA (stored as 'max') only the schemes in
+    SCALE_INVARIANT reproduce what normalizing the raw curves would have given;
+    'zscore' and 'baseline' are applied to the max-normalized curves. 'none' returns
+    the stored curves unchanged, labelled with the stored scheme.
+
+    Returns:
+        tuple: (data, sample_names, metadata) with metadata['normalization'] set to the
+               new scheme and metadata['stored_normalization'] to the one on disk.
+    """
+    data, sample_names, metadata = load_processed(modality, data_dir)
+    x = x_grid(metadata, data.shape[1])
+    metadata = dict(metadata)
+    metadata['stored_normalization'] = stored_normalization(metadata)
+    scheme = _LEGACY_NAMES.get(scheme, scheme)
+    # The raw curves are not stored, so 'none' leaves (and labels) the data as stored
+    metadata['normalization'] = metadata['stored_normalization'] if scheme == 'none' else scheme
+    return normalize(data, scheme, x=x, anchor_points=anchor_points), sample_names, metadata
@@ -0,0 +1,332 @@
+# Memoized preprocessing pipeline
+# The steps of preprocessing.py are modelled as a chain of stages
+#     parse -> trim -> interpolate -> normalize -> save
+# and every stage output is cached on disk under a content-addressed key: the hash
+# of the stage name, its parameters and the keys of its inputs. Raw files (or the
+# members of a zip/tar archive) are hashed by content and parsed one file at a time,
+# so changing the DSC trim window or the number of grid points only re-runs the
+# stages downstream of the change. preprocessing.py runs TGA and DSC through here.
+#
+#   from src.processing.pipeline import run_pipeline
+#   for n in (1000, 2000, 3000):
+#       run_pipeline('dsc', 'raw_data/DSC', num_points=n, save=False)
+
+import hashlib
+import json
+import os
+import numpy as np
+
+from .cleaning import auto_trim, interprolate_data, select_trim
+from .archive_reading import is_archive, iter_archive_members, parallel_map
+from .loading import (DEFAULT_CACHE_ROOT, DEFAULT_DATA_DIR, processed_paths, load_metadata, load_sample_names,
+                      save_processed)
+from .normalization import normalize
+from .qc import raw_extents, screen_extents, qc_scores, write_qc_table
+from .raw_reading import RAW_LAYOUTS, WHITESPACE_SKIPROWS, raw_files, raw_xy
+
+# Bump when a stage's behaviour changes so old cache entries are not reused
+CACHE_VERSION = 2
+DEFAULT_CACHE_DIR = os.path.join(DEFAULT_CACHE_ROOT, "stage_cache")
+
+# Parameters used by preprocessing.py for each modality
+PIPELINE_DEFAULTS = {
+    'tga': {'trim': 'auto', 'num_points': 3000, 'normalization': 'max', 'data_type': 'TGA'},
+    'dsc': {'trim': (60, 180), 'num_points': 3000, 'normalization': 'none', 'data_type': 'DSC'},
+}
+
+
+def stage_key(stage, params, inputs=()):
+    """Content-addressed key of a stage output: hash of stage, parameters and input keys."""
+    payload = json.dumps({'stage': stage, 'version': CACHE_VERSION, 'params': params, 'inputs': list(inputs)},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _entry_path(cache_dir, stage, key):
+    return os.path.join(cache_dir, stage, key[:2], f"{key}.npz")
+
+
+def _cache_get(cache_dir, stage, key):
+    path = _entry_path(cache_dir, stage, key)
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as npz:
+        return {name: npz[name] for name in npz.files}
+
+
+def _cache_put(cache_dir, stage, key, arrays):
+    path = _entry_path(cache_dir, stage, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def _pack_curves(names, curves, **extra):
+    """Store a list of (x, y) curves as concatenated arrays plus offsets."""
+    lengths = [len(x) for x, _ in curves]
+    return {
+        'names': np.asarray(names, dtype=str),
+        'offsets': np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+        'x': np.concatenate([x for x, _ in curves]) if curves else np.empty(0),
+        'y': np.concatenate([y for _, y in curves]) if curves else np.empty(0),
+        **extra,
+    }
+
+
+def _unpack_frames(entry):
+    """Rebuild the per-sample DataFrames the cleaning functions expect."""
+    import pandas as pd
+
+    offsets = entry['offsets']
+    return [
+        pd.DataFrame({'X': entry['x'][a:b], 'Y': entry['y'][a:b], 'sample': str(name)})
+        for name, a, b in zip(entry['names'], offsets[:-1], offsets[1:])
+    ]
+
+
+def _pack_frames(dfs, **extra):
+    return _pack_curves([df['sample'].iloc[0] for df in dfs],
+                        [(df['X'].to_numpy(float), df['Y'].to_numpy(float)) for df in dfs], **extra)
+
+
+class _Run:
+    """Cache bookkeeping for one pipeline run."""
+
+    def __init__(self, modality, cache_dir, verbose):
+        self.modality = modality
+        self.cache_dir = cache_dir
+        self.verbose = verbose
+        self.hits = {}
+
+    def stage(self, stage, key, compute):
+        entry = _cache_get(self.cache_dir, stage, key)
+        self.hits[stage] = entry is not None
+        if entry is None:
+            entry = compute()
+            _cache_put(self.cache_dir, stage, key, entry)
+        if self.verbose:
+            print(f"{self.modality.upper()} {stage}: {'cached' if self.hits[stage] else 'computed'} ({key[:12]})")
+        return entry
+
+
+def _raw_sources(raw_folder):
+    """
+    (file name, bytes) of every raw file of a folder or raw member of an archive.
+
+    Archives are read in one pass, so a sample present both as an original and as a
+    converted CSV yields both; run_pipeline keeps the original.
+    """
+    if is_archive(raw_folder):
+        for name, content in iter_archive_members(raw_folder):
+            yield os.path.basename(name), content
+        return
+    for path in raw_files(raw_folder):
+        with open(path, 'rb') as f:
+            yield os.path.basename(path), f.read()
+
+
+def _parse_key(fname, content, modality):
+    """Cache key of one raw file's parse: the hash of its bytes and the modality layouts."""
+    digest = hashlib.sha256(content).hexdigest()
+    prefix = next((p for p in RAW_LAYOUTS[modality] if fname.startswith(p)), None)
+    return stage_key('parse_file', {'modality': modality, 'ext': os.path.splitext(fname)[1].lower(),
+                                    'layout': RAW_LAYOUTS[modality].get(prefix),
+                                    'whitespace_skiprows': WHITESPACE_SKIPROWS}, [digest])
+
+
+def _decode(job):
+    """
+    Parse one raw file's bytes (run in worker processes by parse_files).
+
+    Returns:
+        tuple: (fname, key, entry, warning, cacheable); a missing Excel reader is
+               not cacheable, so the file is retried once the reader is installed.
+    """
+    fname, content, modality, key = job
+    empty = {'x': np.empty(0), 'y': np.empty(0)}
+    try:
+        xy = raw_xy(fname, modality, content)
+    except ImportError as e:
+        return fname, key, empty, f"Warning: Error processing {fname}: {e}", False
+    except ValueError as e:
+        return fname, key, empty, f"Warning: Error processing {fname}: {e}", True
+    return fname, key, ({'x': xy[0], 'y': xy[1]} if xy is not None else empty), None, True
+
+
+def parse_files(sources, modality, cache_dir=DEFAULT_CACHE_DIR, workers=0):
+    """
+    Parse (file name, bytes) sources through the per-file parse cache.
+
+    Files seen before (same bytes) are read from the cache; the others are decoded in
+    the calling process, or by `workers` processes (archive_reading.parallel_map),
+    and added to it.
+
+    Yields:
+        tuple: (file name, key, entry, hit); decoded files first, then cache hits.
+    """
+    hits = []
+
+    def misses():
+        for fname, content in sources:
+            key = _parse_key(fname, content, modality)
+            entry = _cache_get(cache_dir, 'parse_file', key)
+            if entry is None:
+                yield fname, content, modality, key
+            else:
+                hits.append((fname, key, entry, True))
+
+    for fname, key, entry, warning, cacheable in parallel_map(_decode, misses(), workers):
+        if warning is not None:
+            print(warning)
+        if cacheable:
+            _cache_put(cache_dir, 'parse_file', key, entry)
+        yield fname, key, entry, False
+    yield from hits
+
+
+def run_pipeline(modality, raw_folder, trim=None, num_points=None, normalization=None, qc_screen=False,
+                 data_dir=DEFAULT_DATA_DIR, cache_dir=DEFAULT_CACHE_DIR, save=True, verbose=True, workers=0):
+    """
+    Run parse -> trim -> interpolate -> normalize -> save for one modality with memoization.
+
+    Args:
+        modality (str): 'tga' or 'dsc'.
+        raw_folder (str): Folder (or zip/tar archive) of raw instrument files.
+        trim: 'auto' (auto_trim to the common x range) or (x_min, x_max) for select_trim;
+              defaults to PIPELINE_DEFAULTS (TGA 'auto', DSC (60, 180)).
+        num_points (int, optional): Interpolation points (default 3000).
+        normalization (str, optional): Scheme from normalization.NORMALIZATION_SCHEMES.
+        qc_screen (bool): Drop runs failing qc.screen_extents before the grid is chosen;
+                          the excluded names are printed on every run (verbose).
+                          Off by default, since it changes the rows of the library.
+        data_dir (str): Root of the processed data directory written by the save stage.
+        cache_dir (str): Stage cache directory.
+        save (bool): Publish the result to data_dir (skipped if it is already up to date).
+        verbose (bool): Print whether each stage was cached or computed.
+        workers (int, optional): Processes decoding raw files not in the parse cache
+                                 (0: the calling process, None: one per CPU).
+
+    Returns:
+        dict: 'data', 'x', 'sample_names', 'key' (final stage key) and 'cached'
+              (stage -> whether it was a cache hit).
+    """
+    defaults = PIPELINE_DEFAULTS[modality]
+    trim = defaults['trim'] if trim is None else trim
+    trim = trim if trim == 'auto' else [float(v) for v in trim]
+    num_points = defaults['num_points'] if num_points is None else int(num_points)
+    normalization = defaults['normalization'] if normalization is None else normalization
+    run = _Run(modality, cache_dir, verbose)
+
+    # parse: one cache entry per raw file, combined in sample-name order; an original
+    # raw file is preferred over a CSV converted from it, as in raw_files
+    chosen = {}
+    num_parsed = 0
+    for fname, key, entry, hit in parse_files(_raw_sources(raw_folder), modality, cache_dir, workers):
+        num_parsed += not hit
+        stem = os.path.splitext(fname)[0]
+        if stem not in chosen or chosen[stem][0].lower().endswith('.csv'):
+            chosen[stem] = (fname, key, entry)
+    parsed = {stem: (key, entry) for stem, (_, key, entry) in chosen.items() if len(entry['x'])}
+    names = sorted(parsed)
+    parse_key = stage_key('parse', {'modality': modality}, [(name, parsed[name][0]) for name in names])
+    run.hits['parse'] = num_parsed == 0
+    if verbose:
+        print(f"{modality.upper()} parse: {len(names)} samples, {num_parsed} file(s) parsed ({parse_key[:12]})")
+
+    # trim (+ pre-grid QC screen), in the same order as preprocessing.py
+    def compute_trim():
+        import pandas as pd
+
+        dfs = [pd.DataFrame({'X': parsed[n][1]['x'], 'Y': parsed[n][1]['y'], 'sample': n}) for n in names]
+        if trim != 'auto':
+            dfs = [select_trim(df, x_min=trim[0], x_max=trim[1]) for df in dfs]
+        extents = raw_extents(dfs, x_col='X')
+        excluded = []
+        if qc_screen and len(dfs):
+            keep = screen_extents(extents)
+            excluded = [str(name) for name in np.asarray(names)[~keep]]
+            dfs = [df for df, ok in zip(dfs, keep) if ok]
+            extents = extents[keep]
+        if trim == 'auto':
+            dfs = auto_trim(dfs, x_col='X')
+        nonempty = np.array([not df.empty for df in dfs], dtype=bool)
+        return _pack_frames([df for df, ok in zip(dfs, nonempty) if ok], extents=extents[nonempty],
+                            excluded=np.asarray(excluded, dtype=str))
+    trim_key = stage_key('trim', {'trim': trim, 'qc_screen': qc_screen}, [parse_key])
+    trimmed = run.stage('trim', trim_key, compute_trim)
+    if verbose:
+        for name in trimmed.get('excluded', []):
+            print(f"QC: excluding {name} before choosing the {modality.upper()} grid")
+
+    def compute_interpolate():
+        data, x = interprolate_data(_unpack_frames(trimmed), x_col='X', y_col='Y', N=num_points, return_grid=True)
+        return {'data': data, 'x': x, 'names': trimmed['names']}
+    interp_key = stage_key('interpolate', {'num_points': num_points}, [trim_key])
+    interpolated = run.stage('interpolate', interp_key, compute_interpolate)
+
+    def compute_normalize():
+        data = normalize(interpolated['data'], normalization, x=interpolated['x'])
+        return {'data': data, 'x': interpolated['x'], 'names': interpolated['names']}
+    norm_key = stage_key('normalize', {'scheme': normalization}, [interp_key])
+    normalized = run.stage('normalize', norm_key, compute_normalize)
+
+    sample_names = normalized['names'].tolist()
+    if save:
+        paths = processed_paths(modality, data_dir)
+        current = load_metadata(paths['metadata']) if os.path.exists(paths['metadata']) else {}
+        run.hits['save'] = current.get('pipeline_key') == norm_key and os.path.exists(paths['data'])
+        if not run.hits['save']:
+            previous = load_sample_names(paths['names']) if os.path.exists(paths['names']) else None
+            if verbose and previous is not None and previous != sample_names:
+                kept, before = set(sample_names), set(previous)
+                removed = [name for name in previous if name not in kept]
+                added = [name for name in sample_names if name not in before]
+                print(f"{modality.upper()} save: {len(sample_names)} samples (was {len(previous)}); "
+                      f"removed {removed or 'none'}, added {added or 'none'}")
+            metadata = {
+                'x_range': [normalized['x'][0], normalized['x'][-1]],
+                'x_grid': normalized['x'],
+                'x_unit': 'C',
+                'data_type': defaults['data_type'],
+                'normalization': normalization,
+                'interpolation_points': num_points,
+                'pipeline_key': norm_key,
+            }
+            if trim != 'auto':
+                metadata['trim_range'] = trim
+            save_processed(modality, normalized['data'], sample_names, metadata, data_dir)
+            scores = qc_scores(trimmed['extents'], normalized['data'], monotonic_decreasing=(modality == 'tga'))
+            write_qc_table(scores, sample_names, os.path.join(paths['dir'], f"{modality}_qc.txt"))
+        if verbose:
+            print(f"{modality.upper()} save: {'up to date' if run.hits['save'] else 'written to ' + paths['dir']}")
+
+    return {
+        'data': normalized['data'],
+        'x': normalized['x'],
+        'sample_names': sample_names,
+        'key': norm_key,
+        'cached': run.hits,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Memoized TGA/DSC preprocessing")
+    parser.add_argument('modality', choices=sorted(PIPELINE_DEFAULTS))
+    parser.add_argument('raw_folder')
+    parser.add_argument('--trim', nargs=2, type=float, metavar=('X_MIN', 'X_MAX'))
+    parser.add_argument('--auto-trim', action='store_true')
+    parser.add_argument('--num-points', type=int)
+    parser.add_argument('--normalization')
+    parser.add_argument('--no-save', action='store_true')
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--workers', type=int, default=0, help="Processes decoding raw files")
+    args = parser.parse_args()
+
+    run_pipeline(args.modality, args.raw_folder, trim='auto' if args.auto_trim else args.trim,
+                 num_points=args.num_points, normalization=args.normalization,
+                 data_dir=args.data_dir, cache_dir=args.cache_dir, save=not args.no_save, workers=args.workers)
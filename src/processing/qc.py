@@ -0,0 +1,158 @@
+# Quality-control screening for raw runs and interpolated matrices
+# Scores are computed for all samples at once from the raw x extents and the
+# interpolated matrix, so one bad file can be spotted (and optionally dropped)
+# before it shrinks the shared grid for the whole cohort.
+
+import warnings
+import numpy as np
+
+QC_COLUMNS = [
+    'x_min', 'x_max', 'raw_points', 'coverage', 'nan_fraction',
+    'monotonic_violation', 'noise', 'noise_ratio', 'median_distance', 'median_distance_z',
+]
+
+DEFAULT_THRESHOLDS = {
+    'min_coverage': 0.95,          # fraction of the cohort's consensus x window a run must span
+    'min_raw_points': 10,          # raw points needed for a meaningful interpolation
+    'max_nan_fraction': 0.0,       # any NaN in the interpolated row fails
+    'max_monotonic_violation': 0.01,  # TGA only: fraction of grid steps where mass rises noticeably
+    'max_noise_ratio': 10.0,       # noise level relative to the cohort median
+    'max_median_distance_z': 5.0,  # robust z-score of the RMS distance to the median curve
+}
+
+
+def raw_extents(dfs, x_col='X'):
+    """
+    Collect the x range and point count of each raw DataFrame.
+
+    Args:
+        dfs (list of pd.DataFrame): Cleaned per-sample DataFrames (e.g. from tga_xy).
+        x_col (str): Name of the x column.
+
+    Returns:
+        np.ndarray: Array of shape (num_samples, 3) holding x_min, x_max and the
+                    number of points (NaN extents for empty frames).
+    """
+    extents = np.full((len(dfs), 3), np.nan)
+    for i, df in enumerate(dfs):
+        extents[i, 2] = len(df)
+        if not df.empty:
+            x = df[x_col].to_numpy()
+            extents[i, 0] = x.min()
+            extents[i, 1] = x.max()
+    return extents
+
+
+def _robust_z(values):
+    """Robust z-score using the median and MAD, ignoring NaNs."""
+    median = np.nanmedian(values)
+    mad = np.nanmedian(np.abs(values - median)) * 1.4826
+    if not np.isfinite(mad) or mad == 0:
+        return np.zeros_like(values)
+    return (values - median) / mad
+
+
+def coverage_scores(extents):
+    """
+    Fraction of the consensus x window (median x_min to median x_max) each run covers.
+    """
+    x_min, x_max = extents[:, 0], extents[:, 1]
+    lo, hi = np.nanmedian(x_min), np.nanmedian(x_max)
+    if not hi > lo:
+        return np.where(np.isnan(x_min), 0.0, 1.0)
+    covered = np.clip(np.minimum(x_max, hi) - np.maximum(x_min, lo), 0.0, None) / (hi - lo)
+    return np.nan_to_num(covered, nan=0.0)
+
+
+def screen_extents(extents, thresholds=None):
+    """
+    Pre-grid screen: which runs are safe to include when choosing the shared x range.
+
+    Args:
+        extents (np.ndarray): Output of raw_extents.
+        thresholds (dict, optional): Overrides for DEFAULT_THRESHOLDS.
+
+    Returns:
+        np.ndarray: Boolean keep-mask of shape (num_samples,).
+    """
+    limits = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    return (coverage_scores(extents) >= limits['min_coverage']) & (extents[:, 2] >= limits['min_raw_points'])
+
+
+def qc_scores(extents, interpolated, monotonic_decreasing=False, thresholds=None):
+    """
+    Score every sample and decide whether it passes QC.
+
+    Args:
+        extents (np.ndarray): Output of raw_extents, one row per interpolated row.
+        interpolated (np.ndarray): Interpolated matrix of shape (num_samples, num_points).
+        monotonic_decreasing (bool): Check that curves do not rise (TGA mass loss).
+        thresholds (dict, optional): Overrides for DEFAULT_THRESHOLDS.
+
+    Returns:
+        dict: One array per name in QC_COLUMNS plus 'passed' (bool) and 'reasons'
+              (list of comma-separated failure reasons, '' when passed).
+    """
+    limits = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    data = np.asarray(interpolated, dtype=float)
+    if data.shape[0] != extents.shape[0]:
+        raise ValueError("extents and interpolated must have the same number of samples")
+
+    nan_fraction = np.isnan(data).mean(axis=1)
+    # All-NaN rows (failed interpolation) would warn on every nan-reduction below
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        span = np.nanmax(data, axis=1) - np.nanmin(data, axis=1)
+        span = np.where(span > 0, span, 1.0)
+
+        steps = np.diff(data, axis=1)
+        if monotonic_decreasing:
+            # Rises larger than 0.1% of the curve's span count as violations
+            monotonic_violation = (steps > 1e-3 * span[:, None]).mean(axis=1)
+        else:
+            monotonic_violation = np.zeros(data.shape[0])
+
+        # Noise: spread of second differences relative to the curve's span
+        noise = np.nanstd(np.diff(steps, axis=1), axis=1) / span
+        noise_median = np.nanmedian(noise)
+        median_curve = np.nanmedian(data, axis=0)
+        median_distance = np.sqrt(np.nanmean((data - median_curve[None, :]) ** 2, axis=1))
+
+    scores = {
+        'x_min': extents[:, 0],
+        'x_max': extents[:, 1],
+        'raw_points': extents[:, 2],
+        'coverage': coverage_scores(extents),
+        'nan_fraction': nan_fraction,
+        'monotonic_violation': monotonic_violation,
+        'noise': noise,
+        'noise_ratio': noise / noise_median if noise_median > 0 else np.zeros_like(noise),
+        'median_distance': median_distance,
+        'median_distance_z': _robust_z(median_distance),
+    }
+
+    checks = [
+        ('low_coverage', scores['coverage'] < limits['min_coverage']),
+        ('few_points', scores['raw_points'] < limits['min_raw_points']),
+        ('nan', nan_fraction > limits['max_nan_fraction']),
+        ('non_monotonic', monotonic_violation > limits['max_monotonic_violation']),
+        ('noisy', scores['noise_ratio'] > limits['max_noise_ratio']),
+        ('outlier', scores['median_distance_z'] > limits['max_median_distance_z']),
+    ]
+    failed = np.stack([mask for _, mask in checks], axis=1)
+    scores['passed'] = ~failed.any(axis=1)
+    scores['reasons'] = [
+        ",".join(name for (name, _), bad in zip(checks, row) if bad) for row in failed
+    ]
+    return scores
+
+
+def write_qc_table(scores, sample_names, output_file):
+    """
+    Save QC scores as a tab-separated table with a header row.
+    """
+    with open(output_file, 'w') as f:
+        f.write("Sample Name\t" + "\t".join(QC_COLUMNS) + "\tpassed\treasons\n")
+        for i, sample_name in enumerate(sample_names):
+            values = "\t".join(f"{scores[col][i]:.6g}" for col in QC_COLUMNS)
+            f.write(f"{sample_name}\t{values}\t{int(scores['passed'][i])}\t{scores['reasons'][i]}\n")
@@ -0,0 +1,243 @@
+# Direct raw-file -> X/Y reading, without the intermediate CSV text stage
+# convert_csv writes every .txt/.dpt/.dat/.xls/.xlsx file back out as CSV text only
+# for tga_xy/dsc_xy to parse it again. The readers here parse the raw file once into
+# a float table (rows as convert_csv would have written them, non-numeric cells NaN)
+# and apply the same per-prefix column layouts as tga_xy/dsc_xy.
+
+import csv
+import io
+import os
+import numpy as np
+
+WHITESPACE_EXTENSIONS = ('.txt', '.dpt', '.dat')
+EXCEL_EXTENSIONS = ('.xls', '.xlsx')
+RAW_EXTENSIONS = ('.csv',) + WHITESPACE_EXTENSIONS + EXCEL_EXTENSIONS
+
+# Rows skipped by convert_csv for whitespace files (instrument header)
+WHITESPACE_SKIPROWS = 2
+
+# Per-prefix layouts of the (converted) tables, as used by tga_xy and dsc_xy:
+# prefix -> (rows to skip, x column, y column, minimum number of columns).
+# The empty prefix matches every file: FTIR exports are (wavenumber, absorbance) and
+# rheology frequency sweeps (angular frequency, storage modulus G', ...); header
+# rows are non-numeric and dropped with the NaN rows.
+RAW_LAYOUTS = {
+    'tga': {
+        'HDPE-': (3, 1, 2, 3),
+        'LDPE-': (3, 3, 2, 4),
+    },
+    'dsc': {
+        'HDPE-': (0, 0, 1, 2),
+        'LDPE-': (10, 1, 2, 3),
+    },
+    'ftir': {
+        '': (0, 0, 1, 2),
+    },
+    'rheology': {
+        '': (0, 0, 1, 2),
+    },
+}
+
+
+def _to_float(token):
+    if isinstance(token, str):
+        token = token.strip().strip('"')
+    try:
+        return float(token)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _pad_rows(rows):
+    """Stack ragged rows of floats into a NaN-padded 2D array."""
+    width = max((len(r) for r in rows), default=0)
+    table = np.full((len(rows), width), np.nan)
+    for i, row in enumerate(rows):
+        table[i, :len(row)] = row
+    return table
+
+
+def _parse_lines(lines, delimiter=None):
+    """
+    Parse text lines into a float table, one row per line.
+
+    CSV lines (delimiter ',') are split with the csv module, so quoted numbers such as
+    "40" are read like pandas reads them. Blank lines become all-NaN rows, so row
+    positions match the raw file and per-prefix skiprows count raw lines, as
+    pd.read_csv(skiprows=...) does. Leading header rows are converted token by token;
+    a rectangular numeric body is converted in one call, otherwise token by token.
+    """
+    rows = list(csv.reader(lines)) if delimiter == ',' else [line.split(delimiter) for line in lines]
+    start = 0
+    while start < len(rows):
+        tokens = [t for t in rows[start] if t.strip()]
+        if tokens and not np.isnan([_to_float(t) for t in tokens]).any():
+            break
+        start += 1
+
+    head = [[_to_float(t) for t in row] for row in rows[:start]]
+    body = None
+    if start < len(rows):
+        try:
+            body = np.array(rows[start:], dtype=np.float64)
+            if body.ndim != 2:
+                raise ValueError("ragged rows")
+        except ValueError:
+            body = _pad_rows([[_to_float(t) for t in row] for row in rows[start:]])
+    if body is None:
+        return _pad_rows(head)
+    if not head:
+        return body
+    head = _pad_rows(head)
+    width = max(head.shape[1], body.shape[1])
+    table = np.full((head.shape[0] + body.shape[0], width), np.nan)
+    table[:head.shape[0], :head.shape[1]] = head
+    table[head.shape[0]:, :body.shape[1]] = body
+    return table
+
+
+def _iter_excel_rows(file_path, content=None):
+    """Stream the rows of the first worksheet without loading the workbook into a DataFrame."""
+    if file_path.lower().endswith('.xlsx'):
+        try:
+            import openpyxl
+        except ImportError as e:
+            raise ImportError("Reading .xlsx files requires openpyxl (pip install openpyxl)") from e
+        source = file_path if content is None else io.BytesIO(content)
+        workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+        try:
+            for row in workbook.worksheets[0].iter_rows(values_only=True):
+                yield row
+        finally:
+            workbook.close()
+    else:
+        try:
+            import xlrd
+        except ImportError as e:
+            raise ImportError("Reading .xls files requires xlrd (pip install xlrd)") from e
+        workbook = xlrd.open_workbook(file_path, file_contents=content, on_demand=True)
+        try:
+            sheet = workbook.sheet_by_index(0)
+            for i in range(sheet.nrows):
+                yield sheet.row_values(i)
+        finally:
+            workbook.release_resources()
+
+
+def read_raw_table(file_path, content=None):
+    """
+    Read a raw instrument file into a float table.
+
+    Rows match what convert_csv would have written to the CSV file: whitespace files
+    lose their first WHITESPACE_SKIPROWS lines and their blank lines, Excel files keep
+    every row of the first sheet. CSV files keep one row per raw line (blank lines are
+    all-NaN rows) so skiprows lines up with pandas. Non-numeric cells are NaN and
+    short rows are NaN-padded.
+
+    Args:
+        file_path (str): Path to a .csv, .txt, .dpt, .dat, .xls or .xlsx file. Only the
+                         name is used when content is given.
+        content (bytes, optional): File contents (e.g. an archive member) to parse
+                                   instead of reading file_path.
+
+    Returns:
+        np.ndarray: 2D float array.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in EXCEL_EXTENSIONS:
+        return _pad_rows([[_to_float(v) for v in row] for row in _iter_excel_rows(file_path, content)])
+    if ext not in ('.csv',) + WHITESPACE_EXTENSIONS:
+        raise ValueError(f"Unsupported raw file type: {ext}")
+    if content is None:
+        with open(file_path, encoding="latin-1") as f:
+            lines = f.read().splitlines()
+    else:
+        lines = content.decode("latin-1").splitlines()
+    if ext == '.csv':
+        return _parse_lines(lines, delimiter=',')
+    # convert_csv drops blank lines after skipping the instrument header
+    return _parse_lines([line for line in lines[WHITESPACE_SKIPROWS:] if line.strip()])
+
+
+def raw_xy(file_path, modality, content=None):
+    """
+    Extract cleaned X/Y arrays from one raw file using the modality's prefix layout.
+
+    Args:
+        file_path (str): Raw file whose name starts with a known prefix (HDPE-/LDPE-).
+        modality (str): 'tga' or 'dsc'.
+        content (bytes, optional): File contents, if not read from file_path.
+
+    Returns:
+        tuple or None: (x, y) float arrays with non-numeric/NaN rows dropped, or None if
+                       the prefix is not recognised or the file has too few columns.
+    """
+    fname = os.path.basename(file_path)
+    layout = next((spec for prefix, spec in RAW_LAYOUTS[modality].items() if fname.startswith(prefix)), None)
+    if layout is None:
+        return None
+    skiprows, x_col, y_col, min_cols = layout
+    table = read_raw_table(file_path, content)[skiprows:]
+    if table.shape[0] == 0 or table.shape[1] < min_cols:
+        return None
+    x, y = table[:, x_col], table[:, y_col]
+    keep = ~(np.isnan(x) | np.isnan(y))
+    return x[keep], y[keep]
+
+
+def raw_files(folder):
+    """
+    Raw files of a folder, one per sample name.
+
+    When a sample exists both as an original raw file and as a CSV produced by
+    convert_csv, the original is used. Order follows os.listdir, like tga_xy/dsc_xy.
+    """
+    chosen = {}
+    for fname in os.listdir(folder):
+        stem, ext = os.path.splitext(fname)
+        if ext.lower() not in RAW_EXTENSIONS:
+            continue
+        if stem not in chosen or chosen[stem].lower().endswith('.csv'):
+            chosen[stem] = fname
+    return [os.path.join(folder, fname) for fname in chosen.values()]
+
+
+def load_raw_xy(folder, modality, workers=0):
+    """
+    Read every recognised raw file of a folder straight to X/Y arrays.
+
+    A zip/tar archive can be given instead of a folder; its members are streamed
+    through archive_reading.load_archive_xy without extracting them. Files are decoded
+    in the calling process by default; workers > 1 decodes them in that many worker
+    processes (archive_reading.parallel_map), which needs the calling script's
+    top-level code under `if __name__ == "__main__":`.
+
+    Returns:
+        list: (sample_name, x, y) tuples; sample names are file names without extension.
+    """
+    from .archive_reading import _collect, _decode_member, load_archive_xy, parallel_map
+
+    if os.path.isfile(folder):
+        return load_archive_xy(folder, modality, workers=workers)
+
+    def jobs():
+        for file_path in raw_files(folder):
+            try:
+                with open(file_path, 'rb') as f:
+                    yield os.path.basename(file_path), f.read(), modality
+            except OSError as e:
+                print(f"Warning: Error processing {os.path.basename(file_path)}: {str(e)}")
+
+    return _collect(parallel_map(_decode_member, jobs(), workers))
+
+
+def raw_xy_frames(folder, modality):
+    """
+    Drop-in replacement for tga_xy/dsc_xy that reads raw files directly.
+
+    Returns:
+        list of pd.DataFrame: One DataFrame per file with 'X', 'Y' and 'sample' columns.
+    """
+    import pandas as pd
+
+    return [pd.DataFrame({'X': x, 'Y': y, 'sample': name}) for name, x, y in load_raw_xy(folder, modality)]
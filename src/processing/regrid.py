@@ -0,0 +1,137 @@
+# Re-gridding stored spectra onto a requested temperature window/resolution
+# Linear interpolation onto a new grid is a fixed sparse weight matrix with two
+# non-zeros per output point. The (index, weight) pairs are cached per
+# (source grid, target grid), so repeated requests for the same window are a
+# gather and a multiply-add on the whole matrix instead of one np.interp per row.
+
+from functools import lru_cache
+import numpy as np
+
+from .loading import DEFAULT_DATA_DIR, load_processed, x_grid
+
+# Conversions to and from the stored unit (°C)
+_TO_CELSIUS = {
+    'C': lambda t: t,
+    'K': lambda t: t - 273.15,
+    'F': lambda t: (t - 32.0) * 5.0 / 9.0,
+}
+_FROM_CELSIUS = {
+    'C': lambda t: t,
+    'K': lambda t: t + 273.15,
+    'F': lambda t: t * 9.0 / 5.0 + 32.0,
+}
+
+
+def _check_unit(unit):
+    unit = unit.upper().lstrip('°')
+    if unit not in _TO_CELSIUS:
+        raise ValueError("unit must be 'C', 'K' or 'F'")
+    return unit
+
+
+def target_grid(x_min, x_max, num_points=None, step=None, unit='C'):
+    """
+    Build a target grid in °C from a window given in any supported unit.
+
+    Args:
+        x_min, x_max (float): Window bounds in `unit`.
+        num_points (int, optional): Number of points spanning the whole window.
+        step (float, optional): Exact spacing in `unit`, used if num_points is not
+                                given; the grid starts at x_min and ends at the last
+                                step that does not pass x_max.
+        unit (str): 'C', 'K' or 'F'.
+
+    Returns:
+        np.ndarray: Grid in °C.
+    """
+    unit = _check_unit(unit)
+    if x_max <= x_min:
+        raise ValueError("x_max must be greater than x_min")
+    if num_points is None:
+        if step is None:
+            raise ValueError("Give either num_points or step")
+        if step <= 0:
+            raise ValueError("step must be positive")
+        num_points = int(np.floor((x_max - x_min) / step + 1e-9)) + 1
+        # Rounding can push the last step a hair past x_max
+        grid = np.minimum(x_min + step * np.arange(num_points, dtype=np.float64), x_max)
+    else:
+        grid = np.linspace(x_min, x_max, num_points)
+    return _TO_CELSIUS[unit](grid)
+
+
+@lru_cache(maxsize=64)
+def _cached_weights(src_bytes, dst_bytes):
+    src = np.frombuffer(src_bytes, dtype=np.float64)
+    dst = np.frombuffer(dst_bytes, dtype=np.float64)
+    # Bounds converted to another unit and back land a few ULPs off the stored ends;
+    # within the tolerance they count as inside and are clipped onto the end point
+    tol = 1e-9 * max(abs(src[0]), abs(src[-1]), src[-1] - src[0])
+    outside = (dst < src[0] - tol) | (dst > src[-1] + tol)
+    dst = np.clip(dst, src[0], src[-1])
+    left = np.clip(np.searchsorted(src, dst, side='right') - 1, 0, len(src) - 2)
+    span = src[left + 1] - src[left]
+    weight = np.where(span > 0, (dst - src[left]) / np.where(span > 0, span, 1.0), 0.0)
+    for array in (left, weight, outside):
+        array.setflags(write=False)
+    return left, weight, outside
+
+
+def interpolation_weights(x_src, x_dst):
+    """
+    Sparse linear-interpolation weights from a source grid to a target grid.
+
+    Returns (left, weight, outside) such that
+        y_dst = y_src[:, left] * (1 - weight) + y_src[:, left + 1] * weight
+    with target points outside the source range flagged in `outside`.
+    Results are cached on the exact grid values.
+    """
+    x_src = np.ascontiguousarray(x_src, dtype=np.float64)
+    x_dst = np.ascontiguousarray(x_dst, dtype=np.float64)
+    if x_src.ndim != 1 or len(x_src) < 2:
+        raise ValueError("Source grid must be 1D with at least 2 points")
+    return _cached_weights(x_src.tobytes(), x_dst.tobytes())
+
+
+def regrid(data, x_src, x_dst):
+    """
+    Linearly interpolate every row of data from x_src onto x_dst.
+
+    Points of x_dst outside the stored range are NaN (no extrapolation); points within
+    a relative 1e-9 of either end (e.g. after a unit round trip) take the end value.
+
+    Args:
+        data (np.ndarray): Matrix of shape (num_samples, len(x_src)).
+        x_src (np.ndarray): Grid of the stored data (°C, increasing).
+        x_dst (np.ndarray): Target grid (°C).
+
+    Returns:
+        np.ndarray: Matrix of shape (num_samples, len(x_dst)).
+    """
+    left, weight, outside = interpolation_weights(x_src, x_dst)
+    data = np.asarray(data, dtype=np.float64)
+    out = data[:, left] * (1.0 - weight) + data[:, left + 1] * weight
+    out[:, outside] = np.nan
+    return out
+
+
+def load_regridded(modality, x_min=None, x_max=None, num_points=None, step=None, unit='C',
+                   data_dir=DEFAULT_DATA_DIR):
+    """
+    Load a modality and re-grid it onto a requested temperature window.
+
+    Bounds default to the stored range and num_points to the stored resolution.
+
+    Returns:
+        tuple: (data, x, sample_names) where x is the grid expressed in `unit`.
+    """
+    unit = _check_unit(unit)
+    data, sample_names, metadata = load_processed(modality, data_dir)
+    x_src = x_grid(metadata, data.shape[1])
+    stored_min, stored_max = _FROM_CELSIUS[unit](x_src[0]), _FROM_CELSIUS[unit](x_src[-1])
+    if num_points is None and step is None:
+        num_points = data.shape[1]
+    x_dst = target_grid(stored_min if x_min is None else x_min,
+                        stored_max if x_max is None else x_max,
+                        num_points=num_points, step=step, unit=unit)
+    return regrid(data, x_src, x_dst), _FROM_CELSIUS[unit](x_dst), sample_names
@@ -0,0 +1,382 @@
+# Versioned, copy-on-write snapshots of the processed library
+# Every publish of a modality becomes an immutable version under
+# processed_data/<modality>/snapshots/:
+#
+#   chunks/<hash>.npy   rows of the matrix, written once and never modified
+#   meta/<hash>.npz     metadata, content-addressed like the chunks
+#   v000001.json ...    manifest of one version: sample names and, per row,
+#                       the chunk file and the row inside it
+#   CURRENT             number of the latest version, swapped with os.replace
+#   assembled/v000001.npy  contiguous copy of one version, written the first time
+#                       that version is memory-mapped (load_snapshot(mmap_mode='r'))
+#
+# Rows are identified by a hash of their values. A publish only writes chunks for
+# rows the previous version does not already hold; unchanged rows are referenced,
+# so a daily rebuild that changes a few samples costs a few rows on disk. Readers
+# resolve CURRENT once and then only touch immutable files, so a rebuild running
+# at the same time can never hand them a half-written library, and
+# load_snapshot(modality, version=...) pins an exact earlier version.
+#
+# CURRENT only moves forward from the version a publish was built on: it is
+# compared and swapped under a lock file, and a publish whose parent was replaced in
+# the meantime is rebuilt on the new CURRENT, so concurrent publishers never roll
+# it back or drop each other's rows.
+
+import hashlib
+import json
+import os
+import time
+import numpy as np
+from contextlib import contextmanager
+
+from .loading import DEFAULT_DATA_DIR, processed_paths, load_metadata
+
+CHUNK_ROWS = 256
+LOCK_TIMEOUT = 60.0
+
+
+def snapshot_dir(modality, data_dir=DEFAULT_DATA_DIR):
+    return os.path.join(processed_paths(modality, data_dir)['dir'], "snapshots")
+
+
+def _manifest_path(root, version):
+    return os.path.join(root, f"v{version:06d}.json")
+
+
+def _write_immutable(path, write):
+    """Write a content-addressed file once; an existing file already holds the same content."""
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def _current_lock(root, timeout=LOCK_TIMEOUT):
+    """Hold root/CURRENT.lock (created exclusively) while CURRENT is compared and swapped."""
+    path = os.path.join(root, "CURRENT.lock")
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{path} is still held; delete it if no publish is running")
+            time.sleep(0.01)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        yield
+    finally:
+        os.close(fd)
+        os.remove(path)
+
+
+def row_hashes(data, block_rows=CHUNK_ROWS):
+    """Hex digest of every row's float64 values (read block_rows rows at a time)."""
+    hashes = []
+    for start in range(0, data.shape[0], block_rows):
+        block = np.ascontiguousarray(data[start:start + block_rows], dtype=np.float64)
+        hashes.extend(hashlib.blake2b(row.tobytes(), digest_size=16).hexdigest() for row in block)
+    return hashes
+
+
+def _metadata_hash(metadata):
+    digest = hashlib.blake2b(digest_size=16)
+    for key in sorted(metadata):
+        value = np.asarray(metadata[key])
+        digest.update(f"{key}:{value.dtype.str}:{value.shape}:".encode())
+        digest.update(value.tobytes() if value.dtype != object else repr(value.tolist()).encode())
+    return digest.hexdigest()
+
+
+def current_version(modality, data_dir=DEFAULT_DATA_DIR):
+    """Latest published version number, or None if the modality has no snapshots."""
+    path = os.path.join(snapshot_dir(modality, data_dir), "CURRENT")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return int(f.read().strip())
+
+
+def read_manifest(modality, version=None, data_dir=DEFAULT_DATA_DIR):
+    """Manifest dict of a version (default: the current one)."""
+    version = current_version(modality, data_dir) if version is None else int(version)
+    if version is None:
+        raise FileNotFoundError(f"No snapshots for {modality} in {snapshot_dir(modality, data_dir)}")
+    with open(_manifest_path(snapshot_dir(modality, data_dir), version)) as f:
+        return json.load(f)
+
+
+def publish_snapshot(modality, data, sample_names, metadata, data_dir=DEFAULT_DATA_DIR, chunk_rows=CHUNK_ROWS):
+    """
+    Publish a new immutable version of a modality, sharing unchanged rows.
+
+    Rows already present in the current version (same values) are referenced; the
+    other rows are packed into new chunk files of up to chunk_rows rows. The manifest
+    is written under the next free version number and CURRENT is then swapped
+    atomically, but only if it still names the version the publish started from;
+    otherwise the publish is rebuilt on the new CURRENT and tried again. Publishing a
+    library identical to the current version is a no-op.
+
+    Args:
+        modality (str): Modality name, e.g. 'tga' or 'dsc'.
+        data (np.ndarray or str): Matrix (num_samples, num_points), or a .npy path.
+        sample_names (list of str): One name per row.
+        metadata (dict): Metadata to store with the version.
+        data_dir (str): Root of the processed data directory.
+        chunk_rows (int): Rows per new chunk file.
+
+    Returns:
+        int: The version number now current.
+    """
+    root = snapshot_dir(modality, data_dir)
+    if isinstance(data, str):
+        data = np.load(data, mmap_mode='r')
+    sample_names = [str(name) for name in sample_names]
+    metadata = dict(metadata)
+    metadata.update(num_samples=data.shape[0], num_points=data.shape[1], sample_names=sample_names)
+
+    hashes = row_hashes(data, chunk_rows)
+    meta_hash = _metadata_hash(metadata)
+    _write_immutable(os.path.join(root, "meta", f"{meta_hash}.npz"), lambda f: np.savez(f, **metadata))
+    written = {}  # rows this publish stored in chunks, kept across retries
+    while True:
+        parent = current_version(modality, data_dir)
+        known = {}
+        if parent is not None:
+            previous = read_manifest(modality, parent, data_dir)
+            if (previous['row_hashes'] == hashes and previous['sample_names'] == sample_names
+                    and previous['metadata'] == meta_hash):
+                return parent
+            known = dict(zip(previous['row_hashes'], previous['rows']))
+        known = {**written, **known}
+
+        # Copy-on-write: only rows held by neither the parent nor an earlier attempt are written
+        new_rows = []
+        for i, h in enumerate(hashes):
+            if h not in known:
+                known[h] = None
+                new_rows.append(i)
+        for start in range(0, len(new_rows), chunk_rows):
+            rows = new_rows[start:start + chunk_rows]
+            chunk = hashlib.blake2b(''.join(hashes[i] for i in rows).encode(), digest_size=16).hexdigest()
+            block = np.ascontiguousarray(data[rows], dtype=np.float64)
+            _write_immutable(os.path.join(root, "chunks", f"{chunk}.npy"), lambda f: np.save(f, block))
+            for offset, i in enumerate(rows):
+                known[hashes[i]] = written[hashes[i]] = [chunk, offset]
+
+        manifest = {
+            'modality': modality,
+            'parent': parent,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'shape': [int(data.shape[0]), int(data.shape[1])],
+            'sample_names': sample_names,
+            'row_hashes': hashes,
+            'rows': [known[h] for h in hashes],
+            'new_rows': len(new_rows),
+            'metadata': meta_hash,
+        }
+        version = _claim_version(root, manifest, (parent or 0) + 1)
+
+        # Compare and swap: CURRENT only advances from the parent this version was built on
+        with _current_lock(root):
+            if current_version(modality, data_dir) == parent:
+                current_tmp = os.path.join(root, f".CURRENT.tmp-{os.getpid()}")
+                with open(current_tmp, 'w') as f:
+                    f.write(f"{version}\n")
+                os.replace(current_tmp, os.path.join(root, "CURRENT"))
+                return version
+        # Another publish won the race: rebuild on top of it
+        os.remove(_manifest_path(root, version))
+
+
+def _claim_version(root, manifest, version):
+    """Write manifest under the first free version number >= version and return that number."""
+    os.makedirs(root, exist_ok=True)
+    tmp_path = os.path.join(root, f".manifest.tmp-{os.getpid()}")
+    while True:
+        manifest['version'] = version
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        try:
+            # Hard-linking fails if another writer took this version number first
+            os.link(tmp_path, _manifest_path(root, version))
+            break
+        except FileExistsError:
+            version += 1
+    os.remove(tmp_path)
+    return version
+
+
+def _assembled(root, manifest):
+    """Path of a contiguous .npy copy of a version's matrix, written chunk by chunk on first use."""
+    path = os.path.join(root, "assembled", f"v{manifest['version']:06d}.npy")
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}.npy"
+    matrix = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float64, shape=tuple(manifest['shape']))
+    by_chunk = {}
+    for out, (chunk, offset) in enumerate(manifest['rows']):
+        by_chunk.setdefault(chunk, ([], []))
+        by_chunk[chunk][0].append(out)
+        by_chunk[chunk][1].append(offset)
+    for chunk, (out, offsets) in by_chunk.items():
+        matrix[out] = np.load(os.path.join(root, "chunks", f"{chunk}.npy"), mmap_mode='r')[offsets]
+    matrix.flush()
+    del matrix
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_snapshot(modality, version=None, data_dir=DEFAULT_DATA_DIR, rows=None, mmap_mode=None):
+    """
+    Load one pinned version of a modality, like load_processed.
+
+    With mmap_mode the whole matrix is memory-mapped instead of gathered into memory:
+    straight from its chunk file when the version is one chunk in row order, otherwise
+    from a contiguous copy under snapshots/assembled/, written the first time the
+    version is mapped (and removed with it by prune_snapshots). Snapshot files are
+    immutable, so only the read-only modes 'r' and 'c' are accepted.
+
+    Args:
+        modality (str): Modality name.
+        version (int, optional): Version to read; defaults to CURRENT, resolved once.
+                                 Pass metadata['snapshot_version'] back in to keep
+                                 reading the same version while newer ones appear.
+        data_dir (str): Root of the processed data directory.
+        rows (array-like, optional): Row indices to load instead of the whole matrix
+                                     (always read into memory).
+        mmap_mode (str, optional): 'r' or 'c' to memory-map the whole matrix.
+
+    Returns:
+        tuple: (data, sample_names, metadata) with metadata['snapshot_version'] set.
+    """
+    if mmap_mode not in (None, 'r', 'c'):
+        raise ValueError(f"Snapshots are immutable; mmap_mode must be 'r' or 'c', not {mmap_mode!r}")
+    manifest = read_manifest(modality, version, data_dir)
+    root = snapshot_dir(modality, data_dir)
+    if mmap_mode is not None and rows is None:
+        chunks = {chunk for chunk, _ in manifest['rows']}
+        in_order = all(offset == i for i, (_, offset) in enumerate(manifest['rows']))
+        if len(chunks) == 1 and in_order:
+            data = np.load(os.path.join(root, "chunks", f"{chunks.pop()}.npy"), mmap_mode=mmap_mode)
+            data = data[:manifest['shape'][0]]
+        elif manifest['shape'][0] == 0:
+            data = np.empty(manifest['shape'])
+        else:
+            data = np.load(_assembled(root, manifest), mmap_mode=mmap_mode)
+        metadata = load_metadata(os.path.join(root, "meta", f"{manifest['metadata']}.npz"))
+        metadata['snapshot_version'] = manifest['version']
+        return data, list(manifest['sample_names']), metadata
+    selected = np.arange(manifest['shape'][0]) if rows is None else np.asarray(rows, dtype=np.intp)
+    refs = [manifest['rows'][i] for i in selected]
+    data = np.empty((len(selected), manifest['shape'][1]))
+    by_chunk = {}
+    for out, (chunk, offset) in enumerate(refs):
+        by_chunk.setdefault(chunk, ([], []))
+        by_chunk[chunk][0].append(out)
+        by_chunk[chunk][1].append(offset)
+    for chunk, (out, offsets) in by_chunk.items():
+        block = np.load(os.path.join(root, "chunks", f"{chunk}.npy"), mmap_mode='r')
+        data[out] = block[offsets]
+    metadata = load_metadata(os.path.join(root, "meta", f"{manifest['metadata']}.npz"))
+    metadata['snapshot_version'] = manifest['version']
+    sample_names = [manifest['sample_names'][i] for i in selected]
+    return data, sample_names, metadata
+
+
+def list_snapshots(modality, data_dir=DEFAULT_DATA_DIR):
+    """(version, created, num_samples, new_rows) of every stored version, oldest first."""
+    root = snapshot_dir(modality, data_dir)
+    if not os.path.isdir(root):
+        return []
+    versions = sorted(int(f[1:-5]) for f in os.listdir(root) if f.startswith('v') and f.endswith('.json'))
+    listing = []
+    for version in versions:
+        manifest = read_manifest(modality, version, data_dir)
+        listing.append((version, manifest['created'], manifest['shape'][0], manifest['new_rows']))
+    return listing
+
+
+def diff_snapshots(modality, old, new=None, data_dir=DEFAULT_DATA_DIR):
+    """
+    Compare two versions from their manifests alone (no data is read).
+
+    Returns:
+        dict: 'added', 'removed' and 'changed' sample names (new relative to old).
+    """
+    before = read_manifest(modality, old, data_dir)
+    after = read_manifest(modality, new, data_dir)
+    old_rows = dict(zip(before['sample_names'], before['row_hashes']))
+    new_rows = dict(zip(after['sample_names'], after['row_hashes']))
+    return {
+        'added': [n for n in new_rows if n not in old_rows],
+        'removed': [n for n in old_rows if n not in new_rows],
+        'changed': [n for n in new_rows if n in old_rows and new_rows[n] != old_rows[n]],
+    }
+
+
+def prune_snapshots(modality, keep=30, data_dir=DEFAULT_DATA_DIR):
+    """
+    Delete all but the newest keep versions and the chunks only they referenced.
+
+    The current version is always kept. A reader that already memory-mapped a
+    pruned chunk keeps its data (POSIX unlink semantics), but versions must not be
+    pruned while a reader may still open them.
+
+    Returns:
+        tuple: (versions removed, chunk files removed).
+    """
+    root = snapshot_dir(modality, data_dir)
+    versions = [v for v, *_ in list_snapshots(modality, data_dir)]
+    current = current_version(modality, data_dir)
+    kept = set(versions[-keep:]) | {current}
+    removed = [v for v in versions if v not in kept]
+    for version in removed:
+        os.remove(_manifest_path(root, version))
+        assembled = os.path.join(root, "assembled", f"v{version:06d}.npy")
+        if os.path.exists(assembled):
+            os.remove(assembled)
+
+    live_chunks, live_meta = set(), set()
+    for version in kept:
+        manifest = read_manifest(modality, version, data_dir)
+        live_chunks.update(chunk for chunk, _ in manifest['rows'])
+        live_meta.add(manifest['metadata'])
+    num_chunks = 0
+    for folder, live, ext in (("chunks", live_chunks, ".npy"), ("meta", live_meta, ".npz")):
+        path = os.path.join(root, folder)
+        for fname in os.listdir(path) if os.path.isdir(path) else []:
+            if fname.endswith(ext) and fname[:-len(ext)] not in live:
+                os.remove(os.path.join(path, fname))
+                num_chunks += folder == "chunks"
+    return removed, num_chunks
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="List, compare and prune processed-library snapshots")
+    parser.add_argument('modality')
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    parser.add_argument('--diff', nargs=2, type=int, metavar=('OLD', 'NEW'))
+    parser.add_argument('--prune', type=int, metavar='KEEP')
+    args = parser.parse_args()
+
+    if args.diff:
+        changes = diff_snapshots(args.modality, *args.diff, data_dir=args.data_dir)
+        for kind, names in changes.items():
+            print(f"{kind}: {len(names)}" + (f" ({', '.join(names)})" if names else ""))
+    elif args.prune is not None:
+        removed, num_chunks = prune_snapshots(args.modality, args.prune, args.data_dir)
+        print(f"Removed {len(removed)} version(s) and {num_chunks} chunk file(s)")
+    else:
+        current = current_version(args.modality, args.data_dir)
+        for version, created, num_samples, new_rows in list_snapshots(args.modality, args.data_dir):
+            marker = '*' if version == current else ' '
+            print(f"{marker} v{version:<6d} {created}  {num_samples} samples, {new_rows} new rows")
@@ -1,14 +1,16 @@
 # special cleaning functions for specific data modalities
 
 # TGA
+# pandas is imported inside the readers so that importing this module is cheap.
 import os
-import pandas as pd
 
 def tga_xy(tga_folder):
     """
     For each .csv file in the given TGA folder, extract and clean X and Y columns according to file type.
     Returns a list of cleaned DataFrames, one per file.
     """
+    import pandas as pd
+
     processed_dfs = []
     for fname in os.listdir(tga_folder):
         if fname.endswith('.csv'):
@@ -63,6 +65,8 @@ def dsc_xy(dsc_folder):
     For LDPE- files: skip 10 rows, X = col 1, Y = col 2 (after skip).
     Returns a list of cleaned DataFrames, one per file.
     """
+    import pandas as pd
+
     processed_dfs = []
     for fname in os.listdir(dsc_folder):
         if fname.endswith('.csv'):
@@ -0,0 +1,197 @@
+# FTIR and rheology modality pipelines
+# Both write the same processed layout as preprocessing.py (processed_data/<modality>/
+# with the interpolated matrix, metadata, sample names and index mapping), so every
+# loader and analysis works on four modalities instead of two.
+#
+#   ftir      : wavenumber (cm-1) vs absorbance. Spectra have tens of thousands of
+#               points, so the matrix is filled a chunk of samples at a time straight
+#               into a memory-mapped .npy file; memory stays bounded by chunk_rows
+#               rows whatever the size of the library.
+#   rheology  : frequency sweeps, angular frequency (rad/s) vs storage modulus. The
+#               sweeps are log-spaced and the moduli span decades, so curves are
+#               interpolated linearly in log10(x) (and log10(y)) onto a log-spaced grid.
+#
+#   python -m src.processing.spectral ftir raw_data/FTIR
+#   python -m src.processing.spectral rheology raw_data/Rheology
+
+import os
+import numpy as np
+
+from .loading import DEFAULT_DATA_DIR, processed_paths, save_processed
+from .normalization import ROW_WISE, normalize
+from .raw_reading import raw_files, raw_xy
+
+SPECTRAL_DEFAULTS = {
+    'ftir': {'trim': 'auto', 'num_points': None, 'normalization': 'none', 'x_scale': 'linear',
+             'log_y': False, 'x_unit': 'cm-1', 'y_label': 'Absorbance', 'data_type': 'FTIR'},
+    'rheology': {'trim': 'auto', 'num_points': 50, 'normalization': 'none', 'x_scale': 'log',
+                 'log_y': True, 'x_unit': 'rad/s', 'y_label': "Storage Modulus G' (Pa)", 'data_type': 'Rheology'},
+}
+
+
+def _forward(values, log):
+    return np.log10(values) if log else values
+
+
+def spectral_grid(x_min, x_max, num_points, x_scale='linear'):
+    """Ascending grid of num_points between x_min and x_max, log-spaced if x_scale is 'log'."""
+    if x_scale == 'log':
+        return np.geomspace(x_min, x_max, num_points)
+    return np.linspace(x_min, x_max, num_points)
+
+
+def interpolate_curve(x, y, grid, x_scale='linear', log_y=False):
+    """
+    Interpolate one raw curve onto grid.
+
+    Points are sorted by x (FTIR exports usually run from high to low wavenumber) and
+    duplicate x values keep their first occurrence. With x_scale='log' the interpolation
+    is linear in log10(x); with log_y it is also linear in log10(y), which follows
+    power-law segments of moduli exactly. Non-positive values cannot be logged and are
+    dropped.
+
+    Returns:
+        np.ndarray: Row of len(grid); NaN where the curve does not reach or has fewer
+                    than 2 usable points.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    usable = np.isfinite(x) & np.isfinite(y)
+    if x_scale == 'log':
+        usable &= x > 0
+    if log_y:
+        usable &= y > 0
+    x, first = np.unique(x[usable], return_index=True)
+    y = y[usable][first]
+    if len(x) < 2:
+        return np.full(len(grid), np.nan)
+    log_x = x_scale == 'log'
+    row = np.interp(_forward(grid, log_x), _forward(x, log_x), _forward(y, log_y), left=np.nan, right=np.nan)
+    return 10.0 ** row if log_y else row
+
+
+def _scan(files, modality, trim):
+    """First pass: x extent and point count of every usable file (curves are not kept)."""
+    extents = {}
+    for path in files:
+        fname = os.path.basename(path)
+        try:
+            xy = raw_xy(path, modality)
+        except (OSError, ValueError, ImportError) as e:
+            print(f"Warning: Error processing {fname}: {str(e)}")
+            continue
+        if xy is None:
+            continue
+        x = xy[0]
+        if trim != 'auto':
+            x = x[(x >= trim[0]) & (x <= trim[1])]
+        if len(x) >= 2:
+            extents[os.path.splitext(fname)[0]] = (path, float(x.min()), float(x.max()), len(x))
+    return extents
+
+
+def process_spectral(modality, raw_folder, trim=None, num_points=None, normalization=None,
+                     data_dir=DEFAULT_DATA_DIR, chunk_rows=64, verbose=True):
+    """
+    Parse, trim, interpolate, normalize and save an FTIR or rheology library.
+
+    Raw files are read twice: once for their x extents, which fix the common grid, and
+    once more a chunk of chunk_rows samples at a time to fill the matrix. Only one
+    chunk of raw curves and interpolated rows is in memory at any time; the matrix
+    itself is written through a memory map and renamed into place by save_processed.
+
+    Args:
+        modality (str): 'ftir' or 'rheology'.
+        raw_folder (str): Folder of raw instrument files.
+        trim: 'auto' (overlap of all samples) or (x_min, x_max); defaults to 'auto'.
+        num_points (int, optional): Grid points. FTIR defaults to the median native
+                                    point count over the grid range; rheology to 50.
+        normalization (str, optional): Row-wise scheme from normalization.ROW_WISE
+                                       (default 'none').
+        data_dir (str): Root of the processed data directory.
+        chunk_rows (int): Samples parsed and interpolated at once.
+        verbose (bool): Print progress.
+
+    Returns:
+        dict: The paths written (as processed_paths).
+    """
+    defaults = SPECTRAL_DEFAULTS[modality]
+    trim = defaults['trim'] if trim is None else trim
+    trim = trim if trim == 'auto' else [float(v) for v in trim]
+    normalization = defaults['normalization'] if normalization is None else normalization
+    if normalization not in ROW_WISE:
+        raise ValueError(f"{modality} is normalized chunk by chunk; normalization must be one of {ROW_WISE}")
+    x_scale, log_y = defaults['x_scale'], defaults['log_y']
+
+    extents = _scan(raw_files(raw_folder), modality, trim)
+    if not extents:
+        raise ValueError(f"No usable {modality.upper()} files in {raw_folder}")
+    names = sorted(extents)
+    x_min = max(extents[n][1] for n in names)
+    x_max = min(extents[n][2] for n in names)
+    if x_max <= x_min:
+        raise ValueError(f"No overlapping x range found for {modality.upper()} interpolation.")
+    if num_points is None:
+        num_points = defaults['num_points']
+    if num_points is None:
+        # Native resolution: points of each file that fall in the common range, assuming even sampling
+        native = [extents[n][3] * (x_max - x_min) / max(extents[n][2] - extents[n][1], 1e-12) for n in names]
+        num_points = max(2, int(round(np.median(native))))
+    grid = spectral_grid(x_min, x_max, int(num_points), x_scale)
+
+    paths = processed_paths(modality, data_dir)
+    os.makedirs(paths['dir'], exist_ok=True)
+    build_path = f"{paths['data']}.build-{os.getpid()}.npy"
+    matrix = np.lib.format.open_memmap(build_path, mode='w+', dtype=np.float64, shape=(len(names), len(grid)))
+    try:
+        for start in range(0, len(names), chunk_rows):
+            chunk = names[start:start + chunk_rows]
+            rows = np.empty((len(chunk), len(grid)))
+            for r, name in enumerate(chunk):
+                x, y = raw_xy(extents[name][0], modality)
+                rows[r] = interpolate_curve(x, y, grid, x_scale, log_y)
+            matrix[start:start + len(chunk)] = normalize(rows, normalization, x=grid)
+            if verbose:
+                print(f"{modality.upper()}: interpolated {start + len(chunk)}/{len(names)} samples")
+        matrix.flush()
+        del matrix
+
+        metadata = {
+            'x_range': [grid[0], grid[-1]],
+            'x_grid': grid,
+            'x_unit': defaults['x_unit'],
+            'x_scale': x_scale,
+            'y_label': defaults['y_label'],
+            'data_type': defaults['data_type'],
+            'normalization': normalization,
+            'interpolation_points': len(grid),
+        }
+        if trim != 'auto':
+            metadata['trim_range'] = trim
+        if log_y:
+            metadata['interpolation'] = 'log-log'
+        save_processed(modality, build_path, names, metadata, data_dir)
+    finally:
+        if os.path.exists(build_path):
+            os.remove(build_path)
+    if verbose:
+        print(f"{modality.upper()}: saved {len(names)} x {len(grid)} matrix "
+              f"({grid[0]:.4g}-{grid[-1]:.4g} {defaults['x_unit']}) to {paths['dir']}")
+    return paths
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="FTIR / rheology preprocessing into processed_data/")
+    parser.add_argument('modality', choices=sorted(SPECTRAL_DEFAULTS))
+    parser.add_argument('raw_folder')
+    parser.add_argument('--trim', nargs=2, type=float, metavar=('X_MIN', 'X_MAX'))
+    parser.add_argument('--num-points', type=int)
+    parser.add_argument('--normalization')
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    parser.add_argument('--chunk-rows', type=int, default=64)
+    args = parser.parse_args()
+
+    process_spectral(args.modality, args.raw_folder, trim=args.trim, num_points=args.num_points,
+                     normalization=args.normalization, data_dir=args.data_dir, chunk_rows=args.chunk_rows)
@@ -0,0 +1,235 @@
+# Raw-folder watcher: incremental ingestion of new instrument exports
+# Polls the raw TGA/DSC folders, waits until a burst of new files has gone quiet,
+# then pushes only the new (or re-exported) files through parse -> trim ->
+# interpolate -> normalize onto the grid already stored in processed_data/ and
+# publishes the updated modality with save_processed. Rows of other samples are untouched,
+# so a new sample is queryable a few seconds after it is exported.
+#
+#   python -m src.processing.watcher --tga raw_data/TGA --dsc raw_data/DSC
+#
+# Samples that do not cover the stored grid would shrink it for every sample; they
+# are reported and left for the next full preprocessing.py run.
+
+import json
+import os
+import time
+import numpy as np
+
+from .loading import DEFAULT_DATA_DIR, processed_paths, load_processed, save_processed, x_grid
+from .normalization import ROW_WISE, normalize, stored_normalization
+from .raw_reading import raw_files, raw_xy
+
+
+def _state_path(modality, data_dir):
+    return os.path.join(processed_paths(modality, data_dir)['dir'], f".{modality}_watcher_state.json")
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def curve_on_grid(x, y, grid, scheme='none'):
+    """
+    Trim, interpolate and normalize one raw curve onto an existing grid.
+
+    Duplicate x values keep their first occurrence, as in interprolate_data.
+
+    Returns:
+        np.ndarray or None: Row of len(grid), or None if the curve does not cover the
+                            grid (within half a grid step) or has fewer than 2 points.
+    """
+    x, first = np.unique(np.asarray(x, dtype=float), return_index=True)
+    y = np.asarray(y, dtype=float)[first]
+    tolerance = 0.5 * (grid[-1] - grid[0]) / max(len(grid) - 1, 1)
+    if len(x) < 2 or x[0] > grid[0] + tolerance or x[-1] < grid[-1] - tolerance:
+        return None
+    keep = (x >= grid[0] - tolerance) & (x <= grid[-1] + tolerance)
+    if keep.sum() < 2:
+        return None
+    row = np.interp(grid, x[keep], y[keep])
+    return normalize(row[None, :], scheme, x=grid)[0]
+
+
+class RawFolderWatcher:
+    """
+    Debounced micro-batch ingestion of one raw folder into one processed modality.
+
+    A file is ingested once its size/mtime have not changed and no other file in the
+    folder has appeared or changed for `debounce` seconds. Ingested file signatures
+    are kept in processed_data/<modality>/.<modality>_watcher_state.json so restarts
+    do not re-ingest old files.
+    """
+
+    def __init__(self, modality, raw_folder, data_dir=DEFAULT_DATA_DIR, debounce=3.0, on_publish=None):
+        self.modality = modality
+        self.raw_folder = raw_folder
+        self.data_dir = data_dir
+        self.debounce = debounce
+        self.on_publish = on_publish
+        self._pending = {}  # path -> signature seen at the last poll
+        self._last_change = None
+        self._ingested = self._load_state()
+
+    def _load_state(self):
+        path = _state_path(self.modality, self.data_dir)
+        if os.path.exists(path):
+            with open(path) as f:
+                return json.load(f)
+        # First run: everything already in the library counts as ingested
+        try:
+            _, names, _ = load_processed(self.modality, self.data_dir, mmap_mode='r')
+        except FileNotFoundError:
+            names = []
+        names = set(names)
+        return {os.path.basename(p): _signature(p) for p in raw_files(self.raw_folder)
+                if os.path.splitext(os.path.basename(p))[0] in names}
+
+    def _save_state(self):
+        path = _state_path(self.modality, self.data_dir)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._ingested, f)
+        os.replace(tmp_path, path)
+
+    def poll(self, now=None):
+        """
+        Check the folder once and ingest the pending batch if it has settled.
+
+        Returns:
+            list of str: Sample names added or updated by this poll.
+        """
+        now = time.monotonic() if now is None else now
+        for path in raw_files(self.raw_folder):
+            try:
+                signature = _signature(path)
+            except FileNotFoundError:
+                continue
+            if self._ingested.get(os.path.basename(path)) == signature:
+                continue
+            if self._pending.get(path) != signature:
+                self._pending[path] = signature
+                self._last_change = now
+        if not self._pending or now - self._last_change < self.debounce:
+            return []
+        batch, self._pending = self._pending, {}
+        return self.ingest(batch)
+
+    def ingest(self, batch):
+        """
+        Process {path: signature} as one micro-batch and publish the modality.
+
+        Files count as ingested only once the publish has succeeded; if it raises, the
+        batch is put back as pending and retried by the next poll.
+        """
+        try:
+            return self._ingest(batch)
+        except Exception:
+            self._pending = {**batch, **self._pending}
+            raise
+
+    def _ingest(self, batch):
+        data, names, metadata = load_processed(self.modality, self.data_dir)
+        grid = x_grid(metadata, data.shape[1])
+        scheme = stored_normalization(metadata)
+        if scheme not in ROW_WISE:
+            print(f"{self.modality.upper()}: '{scheme}' normalization depends on the whole library; "
+                  f"run preprocessing.py to add {len(batch)} new file(s)")
+            return []
+
+        rows = {name: i for i, name in enumerate(names)}
+        new_rows, new_names, updated = [], [], []
+        ingested = {}
+        for path, signature in sorted(batch.items()):
+            fname = os.path.basename(path)
+            sample = os.path.splitext(fname)[0]
+            try:
+                xy = raw_xy(path, self.modality)
+            except (OSError, ValueError, ImportError) as e:
+                print(f"Warning: Error processing {fname}: {e}")
+                continue
+            row = curve_on_grid(*xy, grid, scheme) if xy is not None else None
+            ingested[fname] = signature  # do not retry until the file changes again
+            if row is None:
+                print(f"{self.modality.upper()}: skipping {fname} - unrecognised, too short or does not "
+                      f"cover {grid[0]:.1f}-{grid[-1]:.1f} °C (needs a full preprocessing.py run)")
+                continue
+            if sample in rows:
+                data[rows[sample]] = row
+                updated.append(sample)
+            elif sample not in new_names:
+                new_rows.append(row)
+                new_names.append(sample)
+
+        if new_rows or updated:
+            if new_rows:
+                data = np.vstack([data, np.asarray(new_rows)])
+            save_processed(self.modality, data, names + new_names, metadata, self.data_dir)
+            print(f"{self.modality.upper()}: published {len(new_names)} new and {len(updated)} updated sample(s)")
+        self._ingested.update(ingested)
+        self._save_state()
+        if (new_rows or updated) and self.on_publish is not None:
+            self.on_publish(self.modality, new_names, updated)
+        return new_names + updated
+
+
+def refresh_derived(modality, new_names, updated, data_dir=DEFAULT_DATA_DIR):
+    """
+    Bring indexes that depend on the sample list up to date after a publish.
+
+    The cross-modality sample index is rebuilt. An existing kNN graph is extended
+    with the new samples, or rebuilt if existing rows were re-exported (see
+    update_knn_graph).
+    """
+    from .alignment import build_sample_index
+    from src.analysis.knn_graph import knn_graph_path, update_knn_graph
+
+    build_sample_index(data_dir=data_dir)
+    path = knn_graph_path(modality, data_dir)
+    if not os.path.exists(path):
+        return
+    with np.load(path) as npz:
+        k = int(npz['k'])
+    update_knn_graph(modality, k=k, data_dir=data_dir)
+
+
+def watch(folders, data_dir=DEFAULT_DATA_DIR, interval=1.0, debounce=3.0, refresh=True):
+    """
+    Poll raw folders forever, ingesting settled micro-batches.
+
+    Args:
+        folders (dict): modality -> raw folder, e.g. {'tga': 'raw_data/TGA'}.
+        data_dir (str): Root of the processed data directory (must already hold the
+                        modality, produced by preprocessing.py).
+        interval (float): Seconds between polls.
+        debounce (float): Quiet period before a burst of files is ingested.
+        refresh (bool): Update the sample index and kNN graphs after each publish.
+    """
+    on_publish = (lambda *published: refresh_derived(*published, data_dir=data_dir)) if refresh else None
+    watchers = [RawFolderWatcher(m, folder, data_dir, debounce, on_publish) for m, folder in folders.items()]
+    print(f"Watching {', '.join(folders.values())} (poll {interval}s, debounce {debounce}s)")
+    while True:
+        for watcher in watchers:
+            try:
+                watcher.poll()
+            except Exception as e:  # keep watching; the batch is retried on the next poll
+                print(f"Warning: {watcher.modality.upper()} ingest failed: {e}")
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ingest new raw TGA/DSC exports into processed_data/")
+    parser.add_argument('--tga', help="Raw TGA folder")
+    parser.add_argument('--dsc', help="Raw DSC folder")
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    parser.add_argument('--interval', type=float, default=1.0)
+    parser.add_argument('--debounce', type=float, default=3.0)
+    parser.add_argument('--no-refresh', action='store_true', help="Do not update sample index / kNN graphs")
+    args = parser.parse_args()
+
+    folders = {m: folder for m, folder in (('tga', args.tga), ('dsc', args.dsc)) if folder}
+    if not folders:
+        parser.error("give at least one of --tga/--dsc")
+    watch(folders, args.data_dir, args.interval, args.debounce, refresh=not args.no_refresh)
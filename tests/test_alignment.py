@@ -0,0 +1,52 @@
+# Cross-modality sample index: saved rows are used only while the names still match
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.processing import alignment
+from src.processing.alignment import build_sample_index, load_aligned
+from src.processing.loading import save_processed
+
+
+def _library(data_dir):
+    rng = np.random.default_rng(0)
+    tga, dsc = rng.random((3, 5)), rng.random((3, 4))
+    save_processed('tga', tga, ['a', 'b', 'c'], {'data_type': 'TGA'}, data_dir)
+    save_processed('dsc', dsc, ['b', 'c', 'd'], {'data_type': 'DSC'}, data_dir)
+    return tga, dsc
+
+
+def test_fresh_index_is_used_without_warning(tmp_path, capsys, monkeypatch):
+    data_dir = str(tmp_path)
+    tga, dsc = _library(data_dir)
+    build_sample_index(data_dir=data_dir)
+    capsys.readouterr()
+
+    def no_rebuild(*args):
+        raise AssertionError("index rebuilt")
+
+    monkeypatch.setattr(alignment, "_index_from_names", no_rebuild)
+    names, aligned = load_aligned(data_dir=data_dir)
+    assert names == ['b', 'c']
+    np.testing.assert_array_equal(aligned['tga'], tga[1:])
+    np.testing.assert_array_equal(aligned['dsc'], dsc[:2])
+    assert "Warning" not in capsys.readouterr().out
+
+
+def test_stale_index_is_rebuilt(tmp_path, capsys):
+    data_dir = str(tmp_path)
+    tga, dsc = _library(data_dir)
+    build_sample_index(data_dir=data_dir)
+    stale = open(alignment.sample_index_path(data_dir), 'rb').read()
+    # Republish TGA with the rows reversed, then put the old index back
+    save_processed('tga', tga[::-1], ['c', 'b', 'a'], {'data_type': 'TGA'}, data_dir)
+    with open(alignment.sample_index_path(data_dir), 'wb') as f:
+        f.write(stale)
+
+    names, aligned = load_aligned(data_dir=data_dir)
+    assert names == ['b', 'c']
+    np.testing.assert_array_equal(aligned['tga'], tga[1:])
+    assert "out of date for tga" in capsys.readouterr().out
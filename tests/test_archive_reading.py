@@ -0,0 +1,64 @@
+# Archive inputs: one pass over the archive, originals preferred over converted CSVs,
+# and the same samples whether decoded in this process or by workers
+
+import os
+import sys
+import tarfile
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.processing import archive_reading
+from src.processing.pipeline import _raw_sources, parse_files
+from src.processing.raw_reading import load_raw_xy
+
+
+def _tga_csv(offset):
+    return ("Sample,HDPE\na,b,c\nIndex,Temp,Weight\n"
+            + "".join(f"{i},{40 + i},{10.0 - i / 10 + offset:.2f}\n" for i in range(20)))
+
+
+@pytest.fixture
+def archive(tmp_path):
+    runs = tmp_path / "runs"
+    runs.mkdir()
+    for i in range(4):
+        (runs / f"HDPE-{i:02d}.csv").write_text(_tga_csv(i))
+    path = tmp_path / "runs.tar.gz"
+    with tarfile.open(path, "w:gz") as tf:
+        tf.add(runs, arcname="runs")
+    return str(path)
+
+
+def test_raw_sources_read_archive_once(archive, monkeypatch):
+    opened = []
+    real_open = tarfile.open
+
+    def counting_open(*args, **kwargs):
+        if kwargs.get('mode') == 'r|*':  # a full streaming pass (is_tarfile only sniffs the header)
+            opened.append(args)
+        return real_open(*args, **kwargs)
+
+    monkeypatch.setattr(archive_reading.tarfile, "open", counting_open)
+    names = [fname for fname, _ in _raw_sources(archive)]
+    assert names == [f"HDPE-{i:02d}.csv" for i in range(4)]
+    assert len(opened) == 1
+
+
+def test_parse_files_caches_and_workers_agree(archive, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    first = {f: (e['x'], e['y'], hit) for f, _, e, hit in parse_files(_raw_sources(archive), 'tga', cache_dir, 2)}
+    again = {f: (e['x'], e['y'], hit) for f, _, e, hit in parse_files(_raw_sources(archive), 'tga', cache_dir, 0)}
+    assert not any(hit for *_, hit in first.values()) and all(hit for *_, hit in again.values())
+    for fname, (x, y, _) in first.items():
+        np.testing.assert_array_equal(again[fname][0], x)
+        np.testing.assert_array_equal(again[fname][1], y)
+
+
+def test_load_raw_xy_workers(archive, tmp_path):
+    serial = {name: y for name, _, y in load_raw_xy(archive, 'tga')}
+    parallel = {name: y for name, _, y in load_raw_xy(archive, 'tga', workers=2)}
+    assert sorted(serial) == sorted(parallel) == [f"HDPE-{i:02d}" for i in range(4)]
+    for name, y in serial.items():
+        np.testing.assert_array_equal(parallel[name], y)
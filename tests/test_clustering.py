@@ -0,0 +1,39 @@
+# Cluster-ordered pairs: within-cluster pairs first, in leaf order, each pair exactly once
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.analysis.clustering import cluster_ordered_pairs, iter_cluster_ordered_pairs
+
+
+def _expected_within(labels, leaf_order):
+    pairs, seen = [], []
+    for leaf in leaf_order:
+        if labels[leaf] not in seen:
+            seen.append(labels[leaf])
+    for label in seen:
+        members = [leaf for leaf in leaf_order if labels[leaf] == label]
+        pairs += [sorted((a, b)) for k, a in enumerate(members) for b in members[k + 1:]]
+    return pairs
+
+
+def test_within_cluster_pairs_first_in_leaf_order():
+    rng = np.random.default_rng(0)
+    labels = rng.integers(0, 6, size=25)
+    labels[[3, 11, 17]] = [7, 8, 9]  # singletons
+    leaf_order = rng.permutation(25)
+
+    pairs = cluster_ordered_pairs(labels, leaf_order)
+    within = _expected_within(labels, leaf_order)
+    assert pairs[:len(within)].tolist() == within
+    assert np.all(labels[pairs[len(within):, 0]] != labels[pairs[len(within):, 1]])
+    assert len({tuple(p) for p in pairs.tolist()}) == len(pairs) == 25 * 24 // 2
+    assert np.all(pairs[:, 0] < pairs[:, 1])
+
+
+def test_all_singletons_and_small_blocks():
+    pairs = np.concatenate(list(iter_cluster_ordered_pairs(np.arange(6), block_size=4)))
+    assert len(pairs) == 15
@@ -0,0 +1,32 @@
+# Fusion scales: median over the whole matrix, NaN rows ignored, degenerate scales rejected
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.analysis.distances import distance_block, fused_distance_matrix, median_scale
+
+
+def test_median_scale_ignores_nan_rows_in_first_block():
+    data = np.random.default_rng(0).random((40, 5))
+    data[:3] = np.nan
+    full = distance_block(data[3:], data[3:])
+    expected = np.median(full[~np.eye(37, dtype=bool)])
+    assert median_scale(data, sample_rows=40) == pytest.approx(expected)
+
+    fused = fused_distance_matrix({'tga': data}, scales={'tga': 'median'}, block_size=4)
+    np.testing.assert_allclose(fused[5, 6], full[2, 3] / expected)
+
+
+def test_median_scale_samples_rows_across_matrix():
+    data = np.vstack([np.zeros((10, 4)), np.random.default_rng(1).random((290, 4)) + 5.0])
+    assert median_scale(data, sample_rows=32) > 0.1
+
+
+@pytest.mark.parametrize("data", [np.full((6, 4), np.nan), np.ones((6, 4))])
+def test_degenerate_median_scale_raises(data):
+    with pytest.raises(ValueError, match="explicit scale"):
+        fused_distance_matrix({'tga': data}, scales={'tga': 'median'})
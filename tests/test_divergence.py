@@ -0,0 +1,35 @@
+# Divergent windows: the streaming library-wide top-n matches the full per-pair table
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.analysis.divergence import divergent_regions, top_divergent_regions
+
+
+def _top(table, top_n):
+    table = table[table['start_index'] >= 0]
+    return np.sort(table['mean_abs_diff'])[::-1][:top_n]
+
+
+def test_streaming_top_n_matches_full_table():
+    data = np.random.default_rng(0).random((15, 40))
+    data[4, 10:13] = np.nan
+    full = divergent_regions(data, window=8, top_k=2)
+
+    top = top_divergent_regions(data, window=8, top_k=2, top_n=10, block_size=7)
+    assert len(top) == 10
+    np.testing.assert_allclose(top['mean_abs_diff'], _top(full, 10))
+    keys = ('idx1', 'idx2', 'start_index')
+    windows = set(zip(*(full[key].tolist() for key in keys)))
+    assert set(zip(*(top[key].tolist() for key in keys))) <= windows
+
+
+def test_streaming_top_n_with_explicit_pairs():
+    data = np.random.default_rng(1).random((8, 30))
+    pairs = [(0, 5), (2, 3), (6, 1)]
+    full = divergent_regions(data, pairs=pairs, window=5, top_k=3)
+    top = top_divergent_regions(data, pairs=pairs, window=5, top_k=3, top_n=100, block_size=2)
+    np.testing.assert_allclose(top['mean_abs_diff'], _top(full, 100))
@@ -0,0 +1,52 @@
+# kNN graph: inserting samples gives the same graph as a full rebuild
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.analysis.knn_graph import insert_samples, knn_graph, load_knn_graph, update_knn_graph
+from src.processing.loading import save_processed
+
+
+def _assert_same_graph(graph, expected):
+    np.testing.assert_array_equal(graph['indptr'], expected['indptr'])
+    np.testing.assert_array_equal(graph['indices'], expected['indices'])
+    np.testing.assert_allclose(graph['distances'], expected['distances'])
+
+
+def test_insert_matches_rebuild_and_leaves_input_unchanged():
+    data = np.random.default_rng(0).random((30, 8))
+    graph = knn_graph(data[:20], k=4, block_size=7)
+    before = {key: np.copy(value) for key, value in graph.items()}
+
+    inserted = insert_samples(graph, data, 20, block_size=7)
+
+    _assert_same_graph(inserted, knn_graph(data, k=4, block_size=7))
+    for key, value in before.items():
+        np.testing.assert_array_equal(graph[key], value)
+
+
+def test_update_matches_rows_by_name_and_hash(tmp_path, capsys):
+    data_dir = str(tmp_path)
+    rows = np.random.default_rng(1).random((12, 6))
+    names = [f"S{i:02d}" for i in range(12)]
+    old = [0, 2, 4, 6, 8, 10]
+    save_processed('tga', rows[old], [names[i] for i in old], {'data_type': 'TGA'}, data_dir)
+    update_knn_graph('tga', k=3, data_dir=data_dir, block_size=4)
+
+    # New samples land between the old ones in the sorted sample list
+    save_processed('tga', rows, names, {'data_type': 'TGA'}, data_dir)
+    capsys.readouterr()
+    graph = update_knn_graph('tga', k=3, data_dir=data_dir, block_size=4)
+    assert "inserting 6 new samples" in capsys.readouterr().out
+    _assert_same_graph(graph, knn_graph(rows, k=3))
+    assert load_knn_graph('tga', data_dir)['sample_names'] == names
+
+    # A changed row forces a rebuild
+    rows[5] += 1.0
+    save_processed('tga', rows, names, {'data_type': 'TGA'}, data_dir)
+    graph = update_knn_graph('tga', k=3, data_dir=data_dir, block_size=4)
+    assert "building kNN graph" in capsys.readouterr().out
+    _assert_same_graph(graph, knn_graph(rows, k=3))
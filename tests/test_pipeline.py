@@ -0,0 +1,58 @@
+# Stage cache: unchanged inputs are cache hits, a changed parameter re-runs only the stages after it
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.processing.loading import load_processed
+from src.processing.pipeline import run_pipeline
+
+pytest.importorskip("pandas")
+
+
+def _write_runs(folder, offsets):
+    for i, offset in enumerate(offsets):
+        with open(os.path.join(folder, f"HDPE-{i:02d}.csv"), "w") as f:
+            f.write("Sample,HDPE\na,b,c\nIndex,Temp,Weight\n")
+            f.write("".join(f"{k},{40 + k + offset},{10.0 - k / 10:.2f}\n" for k in range(30)))
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    _write_runs(str(raw), [0.0, 0.5, 1.0])
+    return str(raw), str(tmp_path / "processed"), str(tmp_path / "cache")
+
+
+def _run(dirs, **kwargs):
+    raw, data_dir, cache_dir = dirs
+    return run_pipeline('tga', raw, data_dir=data_dir, cache_dir=cache_dir, verbose=False, **kwargs)
+
+
+def test_rerun_is_fully_cached(dirs):
+    first = _run(dirs, num_points=50)
+    assert not any(first['cached'].values())
+    second = _run(dirs, num_points=50)
+    assert all(second['cached'].values())
+    np.testing.assert_array_equal(first['data'], second['data'])
+    data, names, metadata = load_processed('tga', dirs[1])
+    assert names == ['HDPE-00', 'HDPE-01', 'HDPE-02'] and metadata['pipeline_key'] == second['key']
+
+
+def test_changed_parameter_reruns_downstream_stages_only(dirs):
+    _run(dirs, num_points=50)
+    result = _run(dirs, num_points=80, save=False)
+    assert result['cached'] == {'parse': True, 'trim': True, 'interpolate': False, 'normalize': False}
+    assert result['data'].shape == (3, 80)
+
+
+def test_changed_file_is_parsed_again(dirs):
+    _run(dirs, num_points=50)
+    _write_runs(dirs[0], [0.0, 0.5, 2.0])
+    result = _run(dirs, num_points=50)
+    assert not result['cached']['parse'] and not result['cached']['trim']
+    assert not result['cached']['save']
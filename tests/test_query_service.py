@@ -0,0 +1,43 @@
+# Query service: neighbour counts are validated and reloads never serve stale cache entries
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.analysis.query_service import QueryLibrary
+from src.processing.loading import save_processed
+
+NAMES = ['HDPE-00', 'HDPE-01', 'LDPE-00', 'LDPE-01']
+
+
+@pytest.fixture
+def library(tmp_path):
+    data = np.arange(4.0)[:, None] * np.ones((4, 6))
+    save_processed('tga', data, NAMES, {'data_type': 'TGA'}, str(tmp_path))
+    return QueryLibrary(str(tmp_path))
+
+
+@pytest.mark.parametrize("k", [0, -1, "x"])
+def test_neighbours_rejects_bad_k(library, k):
+    with pytest.raises(ValueError):
+        library.query('neighbours', modality='tga', sample='HDPE-00', k=k)
+
+
+def test_neighbours_caps_k(library):
+    result = library.query('neighbours', modality='tga', sample='HDPE-00', k=100)
+    assert [r['sample'] for r in result] == NAMES[1:]
+
+
+def test_request_racing_a_reload_does_not_poison_the_cache(library, tmp_path):
+    key = (('modality', 'tga'), ('sample', 'HDPE-00'))
+    old_library, old_generation = library._library, library._generation
+    save_processed('tga', np.full((4, 6), 7.0), NAMES, {'data_type': 'TGA'}, str(tmp_path))
+    assert library.reload_if_changed()
+    # A request that started on the old library finishes after the cache was cleared
+    new_library, library._library = library._library, old_library
+    assert library._cached(old_generation, 'curve', key)['y'][0] == 0.0
+    library._library = new_library
+    assert library.query('curve', modality='tga', sample='HDPE-00')['y'][0] == 7.0
@@ -0,0 +1,47 @@
+# Direct raw reading must give the same X/Y as the CSV readers tga_xy / dsc_xy
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.processing.raw_reading import raw_xy_frames
+from src.processing.special_cleaning import tga_xy, dsc_xy
+
+pytest.importorskip("pandas")
+
+TGA_FILES = {
+    # Quoted numbers, as written by some instrument exports
+    "HDPE-quoted.csv": 'Sample,HDPE\n"a","b","c"\n"Index","t","Temp"\n'
+                       + "".join(f'"{i}","{40 + i}","{10.0 - i / 10:.1f}"\n' for i in range(20)),
+    # Blank line inside the header: skiprows counts raw lines
+    "LDPE-blank.csv": "Sample,LDPE\n\nIndex,t,Weight,Temp\n"
+                      + "".join(f"{i},{i},{10.0 - i / 10:.1f},{40 + i}\n" for i in range(20)),
+}
+DSC_FILES = {
+    "HDPE-quoted.csv": "".join(f'"{40 + i}","{0.5 + i / 100:.2f}"\n' for i in range(20)),
+    "LDPE-blank.csv": "Header\n\n" + "meta,1,2\n" * 8 + "".join(f"{i},{40 + i},{0.1 * i:.1f}\n" for i in range(20)),
+}
+
+
+def _write(folder, files):
+    for fname, text in files.items():
+        with open(os.path.join(folder, fname), "w") as f:
+            f.write(text)
+
+
+def _by_sample(dfs):
+    return {df["sample"].iloc[0]: (df["X"].to_numpy(float), df["Y"].to_numpy(float)) for df in dfs}
+
+
+@pytest.mark.parametrize("modality, files, reader", [("tga", TGA_FILES, tga_xy), ("dsc", DSC_FILES, dsc_xy)])
+def test_raw_xy_frames_matches_csv_readers(tmp_path, modality, files, reader):
+    _write(tmp_path, files)
+    expected = _by_sample(reader(str(tmp_path)))
+    got = _by_sample(raw_xy_frames(str(tmp_path), modality))
+    assert set(got) == set(expected) == {os.path.splitext(f)[0] for f in files}
+    for sample, (x, y) in expected.items():
+        np.testing.assert_array_equal(got[sample][0], x)
+        np.testing.assert_array_equal(got[sample][1], y)
@@ -0,0 +1,23 @@
+# Target grids honour the requested step exactly
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.processing.regrid import target_grid
+
+
+def test_step_grid_keeps_spacing():
+    grid = target_grid(25, 100, step=10)
+    np.testing.assert_allclose(np.diff(grid), 10.0)
+    assert grid[0] == 25.0 and grid[-1] == 95.0
+
+
+def test_step_grid_in_fahrenheit():
+    np.testing.assert_allclose(target_grid(77, 212, step=18, unit='F'), np.arange(25.0, 100.0, 10.0))
+
+
+def test_num_points_spans_window():
+    np.testing.assert_allclose(target_grid(25, 100, num_points=4), [25.0, 50.0, 75.0, 100.0])
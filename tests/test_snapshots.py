@@ -0,0 +1,85 @@
+# Snapshots: copy-on-write publish, pinned reads, pruning, memory-mapping and racing publishers
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.processing import snapshots
+from src.processing.loading import load_processed
+from src.processing.snapshots import (current_version, diff_snapshots, load_snapshot, prune_snapshots,
+                                      publish_snapshot, read_manifest, snapshot_dir)
+
+
+def _chunk_files(data_dir):
+    return sorted(os.listdir(os.path.join(snapshot_dir('tga', data_dir), "chunks")))
+
+
+@pytest.fixture
+def data():
+    return np.random.default_rng(0).random((6, 5))
+
+
+def test_publish_shares_unchanged_rows(tmp_path, data):
+    data_dir = str(tmp_path)
+    v1 = publish_snapshot('tga', data, list('abcdef'), {}, data_dir, chunk_rows=4)
+    assert publish_snapshot('tga', data, list('abcdef'), {}, data_dir, chunk_rows=4) == v1  # no-op
+    changed = data.copy()
+    changed[2] += 1.0
+    v2 = publish_snapshot('tga', changed, list('abcdef'), {}, data_dir, chunk_rows=4)
+    assert v2 == v1 + 1
+    assert read_manifest('tga', v2, data_dir)['new_rows'] == 1
+    assert len(_chunk_files(data_dir)) == 3
+    assert diff_snapshots('tga', v1, v2, data_dir) == {'added': [], 'removed': [], 'changed': ['c']}
+
+
+def test_pinned_version_and_prune(tmp_path, data):
+    data_dir = str(tmp_path)
+    v1 = publish_snapshot('tga', data, list('abcdef'), {}, data_dir)
+    v2 = publish_snapshot('tga', data[:3] + 1.0, list('abc'), {}, data_dir)
+    pinned, names, metadata = load_snapshot('tga', v1, data_dir)
+    np.testing.assert_array_equal(pinned, data)
+    assert names == list('abcdef') and metadata['snapshot_version'] == v1
+    current, names, _ = load_processed('tga', data_dir)
+    np.testing.assert_array_equal(current, data[:3] + 1.0)
+
+    removed, num_chunks = prune_snapshots('tga', keep=1, data_dir=data_dir)
+    assert removed == [v1] and num_chunks == 1
+    assert current_version('tga', data_dir) == v2
+    with pytest.raises(FileNotFoundError):
+        load_snapshot('tga', v1, data_dir)
+
+
+@pytest.mark.parametrize("chunk_rows", [8, 4])
+def test_mmap_mode_is_honoured(tmp_path, data, chunk_rows):
+    data_dir = str(tmp_path)
+    publish_snapshot('tga', data, list('abcdef'), {}, data_dir, chunk_rows=chunk_rows)
+    mapped, names, _ = load_processed('tga', data_dir, mmap_mode='r')
+    assert isinstance(mapped, np.memmap)
+    np.testing.assert_array_equal(mapped, data)
+    with pytest.raises(ValueError):
+        load_snapshot('tga', data_dir=data_dir, mmap_mode='r+')
+
+
+def test_racing_publish_does_not_roll_back_current(tmp_path, data, monkeypatch):
+    data_dir = str(tmp_path)
+    publish_snapshot('tga', data, list('abcdef'), {}, data_dir)
+    claim = snapshots._claim_version
+    raced = []
+
+    def claim_after_other_publish(root, manifest, version):
+        # Another publisher builds on the same parent and swaps CURRENT first
+        if not raced:
+            raced.append(True)
+            publish_snapshot('tga', data + 2.0, list('abcdef'), {}, data_dir)
+        return claim(root, manifest, version)
+
+    monkeypatch.setattr(snapshots, "_claim_version", claim_after_other_publish)
+    version = publish_snapshot('tga', data + 1.0, list('abcdef'), {}, data_dir)
+    assert version == current_version('tga', data_dir) == 3
+    manifest = read_manifest('tga', version, data_dir)
+    assert manifest['parent'] == 2
+    np.testing.assert_array_equal(load_snapshot('tga', data_dir=data_dir)[0], data + 1.0)
+    assert not os.path.exists(os.path.join(snapshot_dir('tga', data_dir), "CURRENT.lock"))
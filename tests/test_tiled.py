@@ -0,0 +1,56 @@
+# Tiled pairwise runner: complete tiles are skipped on resume and the assembled matrix is exact
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.analysis import tiled
+from src.analysis.tiled import assemble_pairwise, pair_stats_tile, run_tiled_pairwise, upper_triangle_tiles
+
+
+def _data_file(tmp_path, seed=0):
+    path = str(tmp_path / "data.npy")
+    np.save(path, np.random.default_rng(seed).random((10, 7)))
+    return path
+
+
+def _count_computed(monkeypatch):
+    computed = []
+    real = tiled.compute_tile
+
+    def counting(data, bi, bj, tile_size, output_dir):
+        computed.append((bi, bj))
+        return real(data, bi, bj, tile_size, output_dir)
+
+    monkeypatch.setattr(tiled, "compute_tile", counting)
+    return computed
+
+
+def test_resume_computes_only_missing_tiles(tmp_path, monkeypatch):
+    data_file, out = _data_file(tmp_path), str(tmp_path / "tiles")
+    computed = _count_computed(monkeypatch)
+    run_tiled_pairwise(data_file, out, tile_size=4, workers=0)
+    assert sorted(computed) == upper_triangle_tiles(10, 4)
+
+    # Simulate a run that stopped before its last tile
+    os.remove(os.path.join(out, "tile_00001_00002.npz"))
+    computed.clear()
+    run_tiled_pairwise(data_file, out, tile_size=4, workers=0)
+    assert computed == [(1, 2)]
+
+    data = np.load(data_file)
+    full = pair_stats_tile(data, data)
+    off_diagonal = ~np.eye(10, dtype=bool)
+    for stat in ('mean_abs_diff', 'max_abs_diff', 'mean_diff'):
+        np.testing.assert_allclose(assemble_pairwise(out, stat)[off_diagonal], full[stat][off_diagonal])
+
+
+def test_changed_input_discards_tiles(tmp_path, monkeypatch):
+    data_file, out = _data_file(tmp_path), str(tmp_path / "tiles")
+    run_tiled_pairwise(data_file, out, tile_size=4, workers=0)
+    np.save(data_file, np.random.default_rng(1).random((10, 7)))
+    computed = _count_computed(monkeypatch)
+    run_tiled_pairwise(data_file, out, tile_size=4, workers=0)
+    assert sorted(computed) == upper_triangle_tiles(10, 4)
@@ -0,0 +1,59 @@
+# Watcher micro-batches: new files are published, failed publishes are retried
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.processing import watcher
+from src.processing.loading import load_processed, save_processed
+
+GRID = np.linspace(40.0, 58.0, 10)
+
+
+def _tga_csv(path):
+    with open(path, "w") as f:
+        f.write("Sample,HDPE\na,b,c\nIndex,Temp,Weight\n")
+        f.write("".join(f"{i},{40 + i},{10.0 - i / 10:.2f}\n" for i in range(20)))
+
+
+@pytest.fixture
+def library(tmp_path):
+    raw, data_dir = tmp_path / "raw", str(tmp_path / "processed")
+    raw.mkdir()
+    metadata = {'x_grid': GRID, 'x_range': [GRID[0], GRID[-1]], 'normalization': 'none'}
+    save_processed('tga', np.zeros((1, len(GRID))), ['HDPE-00'], metadata, data_dir)
+    return raw, data_dir
+
+
+def test_poll_publishes_settled_batch(library):
+    raw, data_dir = library
+    w = watcher.RawFolderWatcher('tga', str(raw), data_dir, debounce=1.0)
+    _tga_csv(raw / "HDPE-01.csv")
+    assert w.poll(now=0.0) == []  # not settled yet
+    assert w.poll(now=2.0) == ['HDPE-01']
+    data, names, _ = load_processed('tga', data_dir)
+    assert names == ['HDPE-00', 'HDPE-01']
+    np.testing.assert_allclose(data[1], 10.0 - (GRID - 40) / 10)
+    assert w.poll(now=10.0) == []  # ingested files are not picked up again
+
+
+def test_failed_publish_is_retried(library, monkeypatch):
+    raw, data_dir = library
+    w = watcher.RawFolderWatcher('tga', str(raw), data_dir, debounce=1.0)
+    _tga_csv(raw / "HDPE-01.csv")
+    w.poll(now=0.0)
+
+    def failing_save(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(watcher, "save_processed", failing_save)
+    with pytest.raises(OSError):
+        w.poll(now=2.0)
+    assert 'HDPE-01.csv' not in w._ingested
+
+    monkeypatch.undo()
+    assert w.poll(now=3.0) == ['HDPE-01']
+    assert load_processed('tga', data_dir)[1] == ['HDPE-00', 'HDPE-01']